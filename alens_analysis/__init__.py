@@ -17,8 +17,14 @@ from .physical_scales import (
 
 from .colormaps import register_cmaps
 
+from .trajectory import Trajectory, as_trajectory
+from .bind_events import BindEventLog, add_bind_events
+
 from .controller_funcs import TYPE_FUNC_DICT, seed_analysis
 
+from .autocorr import fft_autocorr
+from .msd import fft_msd, unwrap_pbc_from_params
+
 from .rouse_mode_analysis import (
     get_rouse_modes_at_t,
     get_rouse_modes,
@@ -52,6 +58,7 @@ from .chromatin.chrom_analysis import (
     get_link_tension,
     get_link_tension_along_chain,
     get_sep_hist,
+    get_sep_stats,
     get_sep_dist_mat,
     get_overlap_arrs,
     autocorr_bead_pos,
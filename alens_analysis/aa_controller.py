@@ -19,6 +19,9 @@ import matplotlib.pyplot as plt
 from .colormaps import register_cmaps
 from .controller_funcs import TYPE_FUNC_DICT
 from .time_testing import run_time_testing
+from .raw_data_layout import RAW_DATA_LAYOUTS, RAW_FLOAT_DTYPES
+from .chromatin.contact_engine import (CONTACT_ENGINES, CONTACT_CUTOFF_SIGMAS,
+                                       CONTACT_MEMORY_BUDGET)
 # from .chrom_analysis import get_pos_kymo_data, get_pos_cond_data
 
 
@@ -74,6 +77,79 @@ def parse_args():
                         default=0,
                         help="Run aLENS in a directory one lower, collect the runtime statistics and put them in file located in the analysis directory. Takes in number of steps to run.")
 
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Number of processes used to parse frames when collecting raw data or stress.")
+
+    parser.add_argument("--frame_window", type=int, default=None,
+                        help="Maximum number of parsed frames held in memory when collecting\n"
+                        "with more than one worker (default: 4 x workers). With a chunked layout\n"
+                        "the writer also buffers one chunk of frames of every dataset as float64\n"
+                        "(up to 2 MiB per 256 objects and dataset), independent of this window.")
+
+    parser.add_argument("--layout", choices=RAW_DATA_LAYOUTS, default=None,
+                        help="Storage layout of raw data datasets when collecting.\n"
+                        " contiguous: one block per dataset (default)\n"
+                        " chunked: chunks of consecutive frames and bead windows\n"
+                        "   (default with --append)")
+
+    parser.add_argument("--follow", action='store_true',
+                        help="Keep collecting frames of a running simulation as they are completed\n"
+                        "and append them to the raw data file (implies --append).")
+
+    parser.add_argument("--poll_interval", type=float, default=30.,
+                        help="Seconds between checks for new frames with --follow.")
+
+    parser.add_argument("--max_idle", type=float, default=None,
+                        help="Stop following after this many seconds without new frames.")
+
+    parser.add_argument("--follow_contact", action='store_true',
+                        help="Update the contact kymograph and average contact matrix after\n"
+                        "every batch of frames collected with --follow.")
+
+    parser.add_argument("--append", action='store_true',
+                        help="Only collect frames written since the last collection and append\n"
+                        "them to the raw data file. New files are created with resizable datasets.")
+
+    parser.add_argument("--compression", choices=[None, 'gzip', 'lzf'], default=None,
+                        help="Compression filter of raw data datasets (needs --layout chunked).")
+
+    parser.add_argument("--compression_opts", type=int, default=None,
+                        help="Compression level for gzip (0-9, default: h5py default).")
+
+    parser.add_argument("--shuffle", action='store_true',
+                        help="Apply the shuffle filter to raw data datasets (needs --layout chunked).")
+
+    parser.add_argument("--float_dtype", choices=RAW_FLOAT_DTYPES, default='f4',
+                        help="Stored dtype of sylinder data and protein positions (default: f4).")
+
+    parser.add_argument("--split_proteins", action='store_true',
+                        help="Store protein gids, tags and bind IDs as int32 separately from\n"
+                        "protein positions.")
+
+    parser.add_argument("--bind_events", action='store_true',
+                        help="Also store protein binding as an event log of bind ID changes.")
+
+    parser.add_argument("--con_blocks", action='store_true',
+                        help="Also store the per-constraint arrays of ConBlock files in the raw data\n"
+                        "file (new ConBlock frames are added on every later collect).")
+
+    parser.add_argument("--contact_engine", choices=CONTACT_ENGINES, default='dense',
+                        help="Engine computing contact matrices with -A contact.\n"
+                        " dense: all bead pairs of every frame (default)\n"
+                        " sparse: only bead pairs closer than --contact_cutoff sigma\n"
+                        " batched: all bead pairs of batches of frames with torch")
+
+    parser.add_argument("--contact_cutoff", type=float, default=CONTACT_CUTOFF_SIGMAS,
+                        help="Cutoff of the sparse contact engine in units of sigma. Left out\n"
+                        "pairs have contact weights below exp(-cutoff^2 / 2).")
+
+    parser.add_argument("--contact_memory", type=float,
+                        default=CONTACT_MEMORY_BUDGET / 2**20,
+                        help="MiB of pair matrices of a frame batch of the batched contact engine.")
+
+    parser.add_argument("--contact_dtype", choices=RAW_FLOAT_DTYPES, default='f8',
+                        help="Computing dtype of the batched contact engine (default: f8).")
+
     parser.add_argument("-f ", "--force", action='store_true',
                         help="Force analysis to occur. Overwrite previous analysis done.")
 
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: autocorr.py
+Description: FFT autocorrelation of time series of beads, polymers and Rouse
+modes.
+"""
+
+import numpy as np
+import torch
+from scipy.fft import next_fast_len
+
+# Number of series (beads, modes, ...) transformed at once
+AUTOCORR_CHUNK = 256
+
+
+def fft_autocorr(arr, subtract_mean=False, sum_components=True,
+                 chunk_size=AUTOCORR_CHUNK, device='cpu'):
+    """Time averaged autocorrelation of many time series,
+    C(tau) = sum_t x(t) . x(t + tau) / (T - tau), in O(T log T).
+
+    Series are zero padded to at least 2T - 1 before the FFT so there is no
+    wraparound, i.e. the result is the same as the double loop over lags and
+    time origins and not a circular correlation.
+
+    Parameters
+    ----------
+    arr : ndarray or torch.Tensor
+        (series x [components x] T) array with time as the last axis, e.g.
+        beads x 3 x T positions. A single (T,) series is also accepted.
+    subtract_mean : bool, optional
+        Subtract the time average of every series (and component) first, by
+        default False
+    sum_components : bool, optional
+        Sum the correlation over the axes between the first and the last
+        (dot product of vectors), by default True
+    chunk_size : int, optional
+        Number of series transformed at once to bound memory, by default
+        AUTOCORR_CHUNK
+    device : str, optional
+        Torch device, by default 'cpu'
+
+    Returns
+    -------
+    ndarray or torch.Tensor
+        (series x [components x] T) autocorrelation of the type of arr
+    """
+    is_tensor = isinstance(arr, torch.Tensor)
+    tarr = arr if is_tensor else torch.from_numpy(np.asarray(arr))
+    is_single = tarr.dim() == 1
+    if is_single:
+        tarr = tarr[None, :]
+    if not tarr.is_floating_point():
+        tarr = tarr.double()
+    nsteps = tarr.shape[-1]
+    nfft = next_fast_len(2 * nsteps - 1, real=True)
+    n_origins = torch.arange(nsteps, 0, -1, device=device)
+    comp_dims = tuple(range(1, tarr.dim() - 1))
+
+    corr_list = []
+    for start in range(0, tarr.shape[0], chunk_size):
+        chunk = tarr[start:start + chunk_size].to(device)
+        if subtract_mean:
+            chunk = chunk - chunk.mean(dim=-1, keepdim=True)
+        f = torch.fft.rfft(chunk, n=nfft, dim=-1)
+        power_spec = f.real**2 + f.imag**2
+        if sum_components and comp_dims:
+            power_spec = power_spec.sum(dim=comp_dims)
+        corr = torch.fft.irfft(power_spec, n=nfft, dim=-1)[..., :nsteps]
+        corr_list += [(corr / n_origins).to(tarr.device)]
+    autocorr = torch.cat(corr_list)
+    if is_single:
+        autocorr = autocorr[0]
+    return autocorr if is_tensor else autocorr.numpy()
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented.")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: ascii_parse_bench.py
+Description: Compare the per-line object parser of ascii frame files against
+the bulk numpy parser used by convert_dat_to_hdf.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ..read_func import (read_dat_sylinder, read_dat_xlp,
+                         parse_sylinder_ascii, parse_protein_ascii)
+from ..frame_manifest import get_frame_files
+
+
+def write_test_frames(out_dir, nframes=10, nbeads=10000, nproteins=10000,
+                      seed=0):
+    """Write simple shuffled SylinderAscii/ProteinAscii files to benchmark
+    parsing when no simulation is given.
+
+    @param out_dir Directory to write frames to
+    @return: List of sylinder and protein file paths
+
+    """
+    rng = np.random.default_rng(seed)
+    syl_paths, xlp_paths = [], []
+    for f in range(nframes):
+        pos = rng.random((nbeads, 6))
+        lines = [f'{nbeads}\n', f'{f:g}\n']
+        for gid in rng.permutation(nbeads):
+            lines += ['C {} {:.6g} {:.6g} {:.6g} {:.6g} {:.6g} {:.6g} {:.6g} 0\n'.format(
+                gid, .0125, *pos[gid])]
+        lines += [f'L {i} {i+1}\n' for i in range(nbeads - 1)]
+        syl_paths += [out_dir / f'SylinderAscii_{f}.dat']
+        syl_paths[-1].write_text(''.join(lines))
+
+        pos = rng.random((nproteins, 6))
+        bind = rng.integers(-1, nbeads, (nproteins, 2))
+        lines = [f'{nproteins}\n', f'{f:g}\n']
+        for gid in rng.permutation(nproteins):
+            lines += ['P {} 0 {:.6g} {:.6g} {:.6g} {:.6g} {:.6g} {:.6g} {} {}\n'.format(
+                gid, *pos[gid], *bind[gid])]
+        xlp_paths += [out_dir / f'ProteinAscii_{f}.dat']
+        xlp_paths[-1].write_text(''.join(lines))
+    return syl_paths, xlp_paths
+
+
+def object_parse(syl_path, xlp_path):
+    """Frame parsing as done by the filament/protein object readers."""
+    syl_arr = np.asarray([fil.get_dat() for fil in read_dat_sylinder(syl_path)
+                          if (fil.fil_type == 'C' or fil.fil_type == 'S')],
+                         dtype='f8')
+    xlp_arr = np.asarray([p.get_dat() for p in read_dat_xlp(xlp_path)],
+                         dtype='f8')
+    return syl_arr, xlp_arr
+
+
+def bulk_parse(syl_path, xlp_path):
+    """Frame parsing with the whole-file numpy parser."""
+    with syl_path.open('rb') as sp:
+        _, syl_arr = parse_sylinder_ascii(sp.read())
+    with xlp_path.open('rb') as xp:
+        _, xlp_arr = parse_protein_ascii(xp.read())
+    return syl_arr, xlp_arr
+
+
+def run_bench(syl_paths, xlp_paths):
+    """Time both parsers on the same frames and check that they agree.
+
+    @param syl_paths List of SylinderAscii file paths
+    @param xlp_paths List of ProteinAscii file paths
+    @return: Dictionary of total seconds spent in each parser
+
+    """
+    timings = {}
+    results = {}
+    for name, func in (('object', object_parse), ('bulk', bulk_parse)):
+        t0 = time.perf_counter()
+        results[name] = [func(sp, xp) for sp, xp in zip(syl_paths, xlp_paths)]
+        timings[name] = time.perf_counter() - t0
+
+    for (syl_obj, xlp_obj), (syl_bulk, xlp_bulk) in zip(results['object'],
+                                                        results['bulk']):
+        if not (np.array_equal(syl_obj, syl_bulk)
+                and np.array_equal(xlp_obj, xlp_bulk)):
+            raise AssertionError('Bulk and object parsers disagree.')
+    return timings
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark ascii frame parsing used in convert_dat_to_hdf.')
+    parser.add_argument('-p', '--path', default=None,
+                        help='Seed directory with a result directory. If not '
+                        'given, test frames are generated.')
+    parser.add_argument('-n', '--nframes', type=int, default=10,
+                        help='Number of frames to parse.')
+    parser.add_argument('-b', '--nbeads', type=int, default=10000,
+                        help='Number of beads (and proteins) in generated frames.')
+    return parser.parse_args()
+
+
+def main():
+    opts = parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if opts.path is None:
+            syl_paths, xlp_paths = write_test_frames(
+                Path(tmp_dir), opts.nframes, opts.nbeads, opts.nbeads)
+        else:
+            result_dir = Path(opts.path) / 'result'
+            syl_paths = get_frame_files(
+                result_dir, 'SylinderAscii')[:opts.nframes]
+            xlp_paths = get_frame_files(
+                result_dir, 'ProteinAscii')[:opts.nframes]
+        timings = run_bench(syl_paths, xlp_paths)
+
+    nframes = len(syl_paths)
+    for name, sec in timings.items():
+        print(f"{name:>6} parser: {sec:.3g} s ({nframes / sec:.3g} frames/s)")
+    print(f"Speed up: {timings['object'] / timings['bulk']:.3g}x")
+
+
+##########################################
+if __name__ == "__main__":
+    main()
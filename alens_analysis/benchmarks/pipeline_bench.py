@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: pipeline_bench.py
+Description: Time raw data collection, stress collection and the per-seed
+analyses on synthetic simulations of several sizes and report frames/s, MB/s
+and peak memory as JSON. Collection stages can be timed for several numbers of
+parsing workers to measure the speedup of parallel collection.
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from queue import Empty
+
+import h5py
+import numpy as np
+
+from ..read_func import convert_dat_to_hdf, collect_stress_from_con_pvtp
+from ..chromatin.chrom_analysis import create_contact_hdf5, create_connect_hdf5
+from ..cluster_analysis import create_cluster_hdf5
+from .synthetic_sim import write_synthetic_sim
+
+STAGES = ('convert', 'stress', 'contact', 'connect', 'cluster')
+# Stages that parse frames with a pool of workers
+WORKER_STAGES = ('convert', 'stress')
+DEFAULT_SCALES = ('500x50', '2000x100')
+
+
+def get_peak_rss_mib():
+    """Peak resident memory of this process and its finished children."""
+    scale = 1. if sys.platform == 'darwin' else 2.**10
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) \
+        * scale / 2**20
+
+
+def run_stage(stage, seed_dir, workers, frame_window=None):
+    """!Run one stage of the pipeline on a synthetic simulation.
+
+    @param stage Name of stage in STAGES
+    @param seed_dir Seed directory of the simulation
+    @param workers Number of processes parsing frames
+    @param frame_window Maximum number of parsed frames held in memory
+    @return: Number of bytes of input data of the stage
+
+    """
+    analysis_dir = seed_dir / 'analysis'
+    raw_path = analysis_dir / 'raw_data.h5'
+    result_files = (seed_dir / 'result').glob('*/*')
+    if stage == 'convert':
+        convert_dat_to_hdf(raw_path, seed_dir, workers=workers,
+                           frame_window=frame_window)
+        return sum(fp.stat().st_size for fp in result_files
+                   if fp.name.startswith(('SylinderAscii', 'ProteinAscii')))
+    if stage == 'stress':
+        collect_stress_from_con_pvtp(analysis_dir / 'stress_data.h5',
+                                     seed_dir, workers=workers,
+                                     frame_window=frame_window)
+        return sum(fp.stat().st_size for fp in result_files
+                   if fp.name.startswith('ConBlock'))
+    if stage == 'contact':
+        create_contact_hdf5(raw_path, force=True)
+    elif stage == 'connect':
+        create_connect_hdf5(raw_path, force=True)
+    elif stage == 'cluster':
+        create_cluster_hdf5(raw_path, force=True, eps=.025, min_samples=20,
+                            verbose=False)
+    else:
+        raise ValueError(f'Unknown stage "{stage}". Options are {STAGES}.')
+    return raw_path.stat().st_size
+
+
+def _stage_process(stage, seed_dir, workers, frame_window, queue,
+                   start_method):
+    """Run a stage in a fresh process and report its time and memory."""
+    # Spawned processes default to spawning their own children, which would
+    # time importing the package in every parsing worker.
+    mp.set_start_method(start_method, force=True)
+    # Keep stdout free for the JSON report
+    sys.stdout = sys.stderr
+    try:
+        # Memory of the imported packages before the stage runs
+        baseline_rss = get_peak_rss_mib()
+        t0 = time.perf_counter()
+        nbytes = run_stage(stage, seed_dir, workers, frame_window)
+        queue.put({'seconds': time.perf_counter() - t0, 'input_bytes': nbytes,
+                   'peak_rss_MiB': get_peak_rss_mib(),
+                   'baseline_rss_MiB': baseline_rss, 'error': None})
+    except Exception as err:
+        queue.put({'error': f'{type(err).__name__}: {err}'})
+
+
+def time_stage(stage, seed_dir, nframes, workers=1, frame_window=None):
+    """Time a stage in its own (spawned) process so peak memory is that of the
+    stage alone.
+
+    Parameters
+    ----------
+    stage : str
+        Name of stage in STAGES
+    seed_dir : Path object
+        Seed directory of the simulation
+    nframes : int
+        Number of frames of the simulation
+    workers : int, optional
+        Number of processes parsing frames, by default 1
+    frame_window : int, optional
+        Maximum number of parsed frames held in memory, by default
+        4 * workers
+
+    Returns
+    -------
+    dict
+        Seconds, frames/s, MB/s of input data, peak RSS and RSS before the
+        stage ran in MiB and the error if the stage failed
+    """
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_stage_process,
+                       args=(stage, seed_dir, workers, frame_window, queue,
+                             mp.get_start_method()))
+    proc.start()
+    while True:
+        try:
+            result = queue.get(timeout=1.)
+            break
+        except Empty:
+            if not proc.is_alive():
+                result = {'error': f'Stage process died (exit code {proc.exitcode}).'}
+                break
+    proc.join()
+    result['stage'] = stage
+    if result['error'] is None:
+        sec = max(result['seconds'], 1e-9)
+        result['frames_per_s'] = nframes / sec
+        result['MB_per_s'] = result['input_bytes'] / 1e6 / sec
+    return result
+
+
+def parse_scale(scale):
+    """'<beads>x<frames>' scale string to (beads, frames)."""
+    nbeads, nframes = (int(val) for val in scale.lower().split('x'))
+    return nbeads, nframes
+
+
+def run_bench(scales=DEFAULT_SCALES, stages=STAGES, workers=(1,),
+              work_dir=None, frame_window=None):
+    """!Generate a synthetic simulation for every scale and time every stage.
+
+    Stages in WORKER_STAGES are timed once for every number of workers, with
+    the speedup relative to the first number of workers. The output of every
+    run of convert is checked to be identical to that of the first run.
+
+    @param scales List of '<beads>x<frames>' strings
+    @param stages Stages to run in order (later stages need 'convert')
+    @param workers Numbers of processes parsing frames
+    @param work_dir Directory to write simulations to, by default a temporary
+           directory that is removed afterwards
+    @param frame_window Maximum number of parsed frames held in memory
+    @return: Dictionary with environment information and list of results
+
+    """
+    report = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'h5py': h5py.version.version,
+        'hdf5': h5py.version.hdf5_version,
+        'platform': platform.platform(),
+        'cpu_count': mp.cpu_count(),
+        'workers': list(workers),
+        'frame_window': frame_window,
+        'results': [],
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base_dir = Path(tmp_dir if work_dir is None else work_dir)
+        for scale in scales:
+            nbeads, nframes = parse_scale(scale)
+            seed_dir = base_dir / f'sim_{nbeads}x{nframes}'
+            t0 = time.perf_counter()
+            nbytes = write_synthetic_sim(seed_dir, nbeads, nframes=nframes,
+                                         con_blocks='stress' in stages)
+            gen_time = time.perf_counter() - t0
+            (seed_dir / 'analysis').mkdir(exist_ok=True)
+            for stage in stages:
+                first = None
+                stage_workers = workers if stage in WORKER_STAGES else workers[:1]
+                for nworkers in stage_workers:
+                    result = time_stage(stage, seed_dir, nframes, nworkers,
+                                        frame_window)
+                    result.update({'scale': scale, 'nbeads': nbeads,
+                                   'nframes': nframes, 'workers': nworkers,
+                                   'generate_seconds': gen_time,
+                                   'output_MiB': {prefix: size / 2**20
+                                                  for prefix, size in nbytes.items()}})
+                    if stage == 'convert' and result['error'] is None:
+                        result['output_sha256'] = hashlib.sha256(
+                            (seed_dir / 'analysis' / 'raw_data.h5').read_bytes()
+                        ).hexdigest()
+                    if first is None:
+                        first = result
+                    elif result['error'] is None and first['error'] is None:
+                        result['speedup'] = first['seconds'] / result['seconds']
+                        if 'output_sha256' in result:
+                            result['same_output'] = (result['output_sha256']
+                                                     == first['output_sha256'])
+                    report['results'] += [result]
+                    label = (f"{nworkers:>3} worker(s)"
+                             if stage in WORKER_STAGES else ' ' * 13)
+                    print(f"{scale:>12} {stage:>8} {label}: " + (
+                        f"{result['seconds']:.4g} s, "
+                        f"{result['frames_per_s']:.4g} frames/s, "
+                        f"{result['MB_per_s']:.4g} MB/s, "
+                        f"{result['peak_rss_MiB']:.4g} MiB peak RSS"
+                        + (f", {result['speedup']:.3g}x speedup"
+                           if 'speedup' in result else '')
+                        + (', output differs!'
+                           if result.get('same_output') is False else '')
+                        if result['error'] is None else result['error']),
+                        file=sys.stderr)
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark collection and analysis on synthetic simulations.')
+    parser.add_argument('-s', '--scales', nargs='+', default=DEFAULT_SCALES,
+                        help='Simulation sizes as <beads>x<frames>.')
+    parser.add_argument('-S', '--stages', nargs='+', choices=STAGES,
+                        default=STAGES, help='Stages to time.')
+    parser.add_argument('-w', '--workers', type=int, nargs='+', default=[1],
+                        help='Numbers of processes parsing frames. Collection '
+                        'stages are timed for each, e.g. -w 1 4.')
+    parser.add_argument('--frame_window', type=int, default=None,
+                        help='Maximum number of parsed frames held in memory '
+                        '(default: 4 x workers).')
+    parser.add_argument('-o', '--output', type=Path, default=None,
+                        help='JSON file to write (default: stdout).')
+    parser.add_argument('-d', '--work_dir', type=Path, default=None,
+                        help='Keep generated simulations in this directory.')
+    return parser.parse_args()
+
+
+def main():
+    opts = parse_args()
+    report = run_bench(opts.scales, opts.stages, opts.workers, opts.work_dir,
+                       opts.frame_window)
+    if opts.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with opts.output.open('w') as out_file:
+            json.dump(report, out_file, indent=2)
+
+
+##########################################
+if __name__ == "__main__":
+    main()
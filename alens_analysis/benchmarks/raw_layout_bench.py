@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: raw_layout_bench.py
+Description: Compare read times of raw_data/sylinders for different storage
+layouts using the access patterns of the analysis functions.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+from ..raw_data_layout import relayout_raw_data
+
+LAYOUTS = {
+    'contiguous': dict(layout='contiguous'),
+    'chunked': dict(layout='chunked'),
+    'chunked+lzf': dict(layout='chunked', compression='lzf', shuffle=True),
+    'chunked+gzip': dict(layout='chunked', compression='gzip', shuffle=True),
+}
+
+
+def write_test_raw_data(fpath, nbeads=2000, nframes=2000, seed=0):
+    """Write a raw data file with a random walk bead chain so the benchmark
+    can be run without a simulation.
+
+    @param fpath Path of file to create
+    @param nbeads Number of beads
+    @param nframes Number of frames
+    @return: void
+
+    """
+    rng = np.random.default_rng(seed)
+    with h5py.File(fpath, 'w') as h5_data:
+        h5_data.create_dataset('time', data=np.arange(nframes, dtype='f8'))
+        sy_dset = h5_data.create_group('raw_data').create_dataset(
+            'sylinders', shape=(nbeads, 9, nframes), dtype='f4')
+        com = np.cumsum(rng.normal(0, .01, (nbeads, 3)), axis=0)
+        for frame in range(nframes):
+            com += rng.normal(0, .001, com.shape)
+            sy_dset[:, :, frame] = np.hstack((
+                np.arange(nbeads)[:, None], np.full((nbeads, 1), .0125),
+                com - .001, com + .001, np.zeros((nbeads, 1))))
+
+
+def get_access_patterns(shape, nreps=5, seed=0):
+    """Index expressions used by analysis functions to read sylinder data.
+
+    @param shape Shape of the sylinder dataset
+    @return: Dictionary of pattern name to list of index tuples
+
+    """
+    rng = np.random.default_rng(seed)
+    nbeads, _, nframes = shape
+    twin = max(1, nframes // 10)
+    bwin = max(1, nbeads // 10)
+    patterns = {
+        # create_contact_hdf5, get_pos_kymo_data, etc.
+        'full read': [np.s_[...]],
+        # start_ind:end_ind windows of connect/contact/cluster analyses
+        'time window': [np.s_[:, :, s:s + twin]
+                        for s in rng.integers(0, nframes - twin + 1, nreps)],
+        # start_bead:end_bead windows over the whole run
+        'bead window': [np.s_[s:s + bwin, :, :]
+                        for s in rng.integers(0, nbeads - bwin + 1, nreps)],
+        # Snapshots of a single frame
+        'single frame': [np.s_[:, :, s] for s in rng.integers(0, nframes, nreps)],
+    }
+    return patterns
+
+
+def time_reads(fpath, patterns):
+    """Time every access pattern on the sylinder dataset of a file."""
+    timings = {}
+    with h5py.File(fpath, 'r') as h5_data:
+        sy_dset = h5_data['raw_data/sylinders']
+        for name, ind_lst in patterns.items():
+            t0 = time.perf_counter()
+            for ind in ind_lst:
+                _ = sy_dset[ind]
+            timings[name] = (time.perf_counter() - t0) / len(ind_lst)
+    return timings
+
+
+def run_bench(raw_path, work_dir):
+    """Re-layout a raw data file in all benchmark layouts and time reads.
+
+    @param raw_path Existing raw data file
+    @param work_dir Directory for re-layed out copies
+    @return: Dictionary of layout name to file size and read timings
+
+    """
+    with h5py.File(raw_path, 'r') as h5_data:
+        patterns = get_access_patterns(h5_data['raw_data/sylinders'].shape)
+
+    results = {}
+    for name, layout_kwargs in LAYOUTS.items():
+        fpath = Path(work_dir) / f'raw_{name}.h5'
+        t0 = time.perf_counter()
+        relayout_raw_data(raw_path, fpath, **layout_kwargs)
+        write_time = time.perf_counter() - t0
+        results[name] = {'size MiB': fpath.stat().st_size / 2**20,
+                         'write': write_time,
+                         **time_reads(fpath, patterns)}
+        fpath.unlink()
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Benchmark raw data storage layouts.')
+    parser.add_argument('-f', '--file', type=Path, default=None,
+                        help='Existing raw_data.h5 file. If not given, a test file is generated.')
+    parser.add_argument('-b', '--nbeads', type=int, default=2000,
+                        help='Number of beads in generated file.')
+    parser.add_argument('-n', '--nframes', type=int, default=2000,
+                        help='Number of frames in generated file.')
+    return parser.parse_args()
+
+
+def main():
+    opts = parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_path = opts.file
+        if raw_path is None:
+            raw_path = Path(tmp_dir) / 'raw_data.h5'
+            write_test_raw_data(raw_path, opts.nbeads, opts.nframes)
+        results = run_bench(raw_path, tmp_dir)
+
+    columns = list(next(iter(results.values())).keys())
+    print(f"{'layout':>14}" + ''.join(f'{c:>14}' for c in columns))
+    for name, res in results.items():
+        print(f'{name:>14}' + ''.join(f'{res[c]:>14.4g}' for c in columns))
+    print("Times are in seconds (per read for access patterns).")
+
+
+##########################################
+if __name__ == "__main__":
+    main()
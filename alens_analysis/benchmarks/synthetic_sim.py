@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: synthetic_sim.py
+Description: Write synthetic aLENS output (result/result*-*/ ascii and
+ConBlock frames, RunConfig.yaml, ProteinConfig.yaml and run.log) of any size
+to test and benchmark collection and analysis without a simulation.
+"""
+
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import vtk
+import yaml
+from vtk.util import numpy_support as vn
+
+BEAD_DIAMETER = .025
+LINK_GAP = .002
+BOX_SIZE = 2.
+
+RUN_CONFIG = {
+    'rngSeed': 1234,
+    'simBoxLow': [-.5 * BOX_SIZE] * 3,
+    'simBoxHigh': [.5 * BOX_SIZE] * 3,
+    'simBoxPBC': [False, False, False],
+    'initPreSteps': 0,
+    'sylinderNumber': None,
+    'sylinderLength': .0,
+    'sylinderLengthSigma': 0,
+    'sylinderDiameter': BEAD_DIAMETER,
+    'sylinderFixed': False,
+    'linkKappa': 1000.,
+    'linkGap': LINK_GAP,
+    'extendLinkKappa': 1000.,
+    'extendLinkGap': LINK_GAP,
+    'KBT': .00411,
+    'viscosity': .01,
+    'dt': .0001,
+    'timeTotal': None,
+    'timeSnap': .01,
+    'sylinderColBuf': .3,
+    'conMaxIte': 2000,
+    'conResTol': 1e-5,
+    'conSolverChoice': 0,
+    'logLevel': 3,
+}
+
+PROTEIN_CONFIG = {
+    'KBT': .00411,
+    'KMC_filter': True,
+    'proteins': [{
+        'tag': 0,
+        'walkOff': True,
+        'fixedLocations': False,
+        'freeLength': .05,
+        'rc': .05,
+        'kappa': 100.,
+        'fstall': 1.,
+        'lambda': .5,
+        'vmax': [0., 0.],
+        'diffUnbound': 1.,
+        'lookupType': 1,
+        'lookupGrid': 256,
+        'Ka': [10., 10.],
+        'ko_s': [.1, .1],
+        'Ke': [10., 10.],
+        'ko_d': [.1, .1],
+        'number': None,
+    }],
+}
+
+
+class SyntheticChain():
+
+    """State of a bead-spring chain with crosslinking proteins that evolves
+    like a (very) coarse aLENS simulation: beads take Brownian steps, a
+    fraction of protein ends bind, unbind or hop every frame and only a few
+    bead pairs are in contact."""
+
+    def __init__(self, nbeads, nproteins, change_rate=.02, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.nbeads = nbeads
+        self.nproteins = nproteins
+        self.change_rate = change_rate
+        bond = self.rng.normal(size=(nbeads, 3))
+        bond *= (BEAD_DIAMETER + LINK_GAP) / \
+            np.linalg.norm(bond, axis=1)[:, None]
+        self.com = np.cumsum(bond, axis=0)
+        self.com -= self.com.mean(axis=0)
+        self.orient = self.rng.normal(size=(nbeads, 3))
+        self.orient /= np.linalg.norm(self.orient, axis=1)[:, None]
+        # Protein ends are unbound (-1), singly bound (end 1 bound) or
+        # crosslinking two beads
+        self.bind = np.full((nproteins, 2), -1, dtype=np.int64)
+        state = self.rng.random(nproteins)
+        single = state < .5
+        double = state < .25
+        self.bind[single, 0] = self.rng.integers(0, nbeads, single.sum())
+        self.bind[double, 1] = self.near_beads(self.bind[double, 0])
+        self.free_pos = self.rng.uniform(-.5, .5, (nproteins, 3))
+
+    def near_beads(self, beads, spread=20):
+        """Beads at most `spread` beads away along the chain."""
+        hop = self.rng.integers(-spread, spread + 1, beads.size)
+        return np.clip(beads + hop, 0, self.nbeads - 1)
+
+    def step(self):
+        """Advance the state by one frame."""
+        self.com += self.rng.normal(0, .002, self.com.shape)
+        self.orient += self.rng.normal(0, .05, self.orient.shape)
+        self.orient /= np.linalg.norm(self.orient, axis=1)[:, None]
+        self.free_pos += self.rng.normal(0, .01, self.free_pos.shape)
+
+        change = self.rng.random(self.bind.shape) < self.change_rate
+        unbind = change & (self.bind >= 0) & (self.rng.random(self.bind.shape) < .5)
+        # Second ends can only unbind before the first
+        self.bind[unbind[:, 1], 1] = -1
+        self.bind[unbind[:, 0] & (self.bind[:, 1] < 0), 0] = -1
+        bind0 = change[:, 0] & (self.bind[:, 0] < 0)
+        self.bind[bind0, 0] = self.rng.integers(0, self.nbeads, bind0.sum())
+        bind1 = change[:, 1] & (self.bind[:, 0] >= 0) & (self.bind[:, 1] < 0)
+        self.bind[bind1, 1] = self.near_beads(self.bind[bind1, 0])
+
+    def sylinder_arr(self):
+        """(beads x 9) data as in SylinderAscii files."""
+        half = .5 * 1e-4 * self.orient
+        return np.hstack((np.arange(self.nbeads)[:, None],
+                          np.full((self.nbeads, 1), .5 * BEAD_DIAMETER),
+                          self.com - half, self.com + half,
+                          np.zeros((self.nbeads, 1))))
+
+    def protein_arr(self):
+        """(proteins x 10) data as in ProteinAscii files."""
+        ends = np.stack([self.free_pos, self.free_pos], axis=1)
+        for e in range(2):
+            bound = self.bind[:, e] >= 0
+            ends[bound, e] = self.com[self.bind[bound, e]]
+        return np.hstack((np.arange(self.nproteins)[:, None],
+                          np.zeros((self.nproteins, 1)),
+                          ends.reshape(-1, 6), self.bind))
+
+    def constraints(self):
+        """Bilateral links between consecutive beads and collisions of a
+        few random bead pairs.
+
+        @return: (constraints x 2) gids and bilateral flags
+
+        """
+        links = np.stack([np.arange(self.nbeads - 1),
+                          np.arange(1, self.nbeads)], axis=1)
+        ncol = self.rng.poisson(.5 * self.nbeads)
+        cols = self.rng.integers(0, self.nbeads, (ncol, 2))
+        cols = cols[cols[:, 0] != cols[:, 1]]
+        gids = np.vstack((links, cols))
+        bilateral = np.r_[np.ones(len(links), dtype=np.int32),
+                          np.zeros(len(cols), dtype=np.int32)]
+        return gids, bilateral
+
+
+def format_sylinder_ascii(syl_arr, time, rng):
+    """Text of a SylinderAscii file with beads in shuffled (rank) order."""
+    lines = [f'{syl_arr.shape[0]}\n', f'{time:g}\n']
+    for row in syl_arr[rng.permutation(syl_arr.shape[0])]:
+        lines += ['{} {:d} {:.6g} {:.6g} {:.6g} {:.6g} {:.6g} {:.6g} {:.6g} {:d}\n'.format(
+            'S' if row[0] == 0 else 'C', int(row[0]), *row[1:8], int(row[8]))]
+    lines += [f'L {i} {i + 1}\n' for i in range(syl_arr.shape[0] - 1)]
+    return ''.join(lines)
+
+
+def format_protein_ascii(xlp_arr, time, rng):
+    """Text of a ProteinAscii file with proteins in shuffled (rank) order."""
+    lines = [f'{xlp_arr.shape[0]}\n', f'{time:g}\n']
+    for row in xlp_arr[rng.permutation(xlp_arr.shape[0])]:
+        lines += ['P {:d} {:d} {:.6g} {:.6g} {:.6g} {:.6g} {:.6g} {:.6g} {:d} {:d}\n'.format(
+            int(row[0]), int(row[1]), *row[2:8], int(row[8]), int(row[9]))]
+    return ''.join(lines)
+
+
+def write_con_block_pvtp(fpath, syl_arr, gids, bilateral, rng):
+    """!Write a ConBlock pvtp file (and its piece) with the arrays aLENS
+    writes for every constraint.
+
+    @param fpath Path of the pvtp file
+    @param syl_arr Sylinder data of the frame
+    @param gids (constraints x 2) gids of the constrained beads
+    @param bilateral Bilateral flag of every constraint
+    @return: void
+
+    """
+    ncon = gids.shape[0]
+    com = .5 * (syl_arr[:, 2:5] + syl_arr[:, 5:8])
+    pos_ij = com[gids.reshape(-1)]
+    norm_ij = np.repeat(pos_ij[1::2] - pos_ij[0::2], 2, axis=0)
+    norm_ij /= np.maximum(np.linalg.norm(norm_ij, axis=1), 1e-12)[:, None]
+
+    poly = vtk.vtkPolyData()
+    points = vtk.vtkPoints()
+    points.SetData(vn.numpy_to_vtk(pos_ij, deep=True))
+    poly.SetPoints(points)
+    lines = vtk.vtkCellArray()
+    # Constraint i is the line from point 2i to point 2i+1
+    lines.SetData(
+        vn.numpy_to_vtkIdTypeArray(np.arange(0, 2 * ncon + 1, 2), deep=True),
+        vn.numpy_to_vtkIdTypeArray(np.arange(2 * ncon), deep=True))
+    poly.SetLines(lines)
+
+    point_arrays = {'gid': gids.reshape(-1).astype(np.int32),
+                    'globalIndex': gids.reshape(-1).astype(np.int32),
+                    'posIJ': pos_ij, 'normIJ': norm_ij}
+    gamma = np.abs(rng.normal(0, 1e-3, ncon))
+    cell_arrays = {'oneSide': np.zeros(ncon, dtype=np.int32),
+                   'bilateral': bilateral,
+                   'delta0': rng.normal(0, 1e-4, ncon),
+                   'gamma': gamma,
+                   'kappa': np.where(bilateral == 1, RUN_CONFIG['linkKappa'], 0.),
+                   'Stress': rng.normal(0, 1e-4, (ncon, 9))}
+    for arrays, data in ((point_arrays, poly.GetPointData()),
+                         (cell_arrays, poly.GetCellData())):
+        for name, arr in arrays.items():
+            vtk_arr = vn.numpy_to_vtk(np.ascontiguousarray(arr), deep=True)
+            vtk_arr.SetName(name)
+            data.AddArray(vtk_arr)
+
+    writer = vtk.vtkXMLPPolyDataWriter()
+    writer.SetFileName(str(fpath))
+    writer.SetInputData(poly)
+    writer.SetNumberOfPieces(1)
+    writer.SetStartPiece(0)
+    writer.SetEndPiece(0)
+    writer.Write()
+
+
+def write_run_log(fpath, nsteps, start=datetime(2024, 1, 1), step_seconds=.05):
+    """Write a run.log with a time stamped line for every time step."""
+    lines = []
+    for step in range(nsteps + 1):
+        stamp = (start + timedelta(seconds=step * step_seconds)).strftime(
+            '%Y-%m-%d %H:%M:%S.%f')[:-3]
+        lines += [f'[{stamp}] [info] CurrentStep {step}\n']
+    Path(fpath).write_text(''.join(lines))
+
+
+def write_synthetic_sim(seed_dir, nbeads=1000, nproteins=None, nframes=100,
+                        frames_per_dir=50, con_blocks=True, change_rate=.02,
+                        seed=0):
+    """Write the output of a synthetic simulation.
+
+    Parameters
+    ----------
+    seed_dir : Path object
+        Seed directory to create
+    nbeads : int, optional
+        Number of beads of the chain, by default 1000
+    nproteins : int, optional
+        Number of proteins, by default the number of beads
+    nframes : int, optional
+        Number of frames, by default 100
+    frames_per_dir : int, optional
+        Number of frames per result/result*-*/ directory, by default 50
+    con_blocks : bool, optional
+        Also write ConBlock_*.pvtp files, by default True
+    change_rate : float, optional
+        Probability of a protein end to change its binding every frame, by
+        default .02
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    dict
+        Number of bytes written for every file prefix
+    """
+    seed_dir = Path(seed_dir)
+    result_dir = seed_dir / 'result'
+    result_dir.mkdir(parents=True, exist_ok=True)
+    nproteins = nbeads if nproteins is None else nproteins
+    chain = SyntheticChain(nbeads, nproteins, change_rate, seed)
+    rng = np.random.default_rng(seed + 1)
+    steps_per_snap = round(RUN_CONFIG['timeSnap'] / RUN_CONFIG['dt'])
+
+    run_config = dict(RUN_CONFIG, sylinderNumber=nbeads,
+                      timeTotal=nframes * RUN_CONFIG['timeSnap'])
+    with (seed_dir / 'RunConfig.yaml').open('w') as rc_file:
+        yaml.dump(run_config, rc_file)
+    protein_config = dict(PROTEIN_CONFIG)
+    protein_config['proteins'] = [dict(PROTEIN_CONFIG['proteins'][0],
+                                       number=nproteins)]
+    with (seed_dir / 'ProteinConfig.yaml').open('w') as pc_file:
+        yaml.dump(protein_config, pc_file)
+    write_run_log(seed_dir / 'run.log', nframes * steps_per_snap)
+
+    nbytes = {'SylinderAscii': 0, 'ProteinAscii': 0, 'ConBlock': 0}
+    for frame in range(nframes):
+        first = frame - frame % frames_per_dir
+        frame_dir = result_dir / f'result{first}-{first + frames_per_dir - 1}'
+        frame_dir.mkdir(exist_ok=True)
+        time = frame * RUN_CONFIG['timeSnap']
+        syl_arr = chain.sylinder_arr()
+
+        syl_path = frame_dir / f'SylinderAscii_{frame}.dat'
+        syl_path.write_text(format_sylinder_ascii(syl_arr, time, rng))
+        xlp_path = frame_dir / f'ProteinAscii_{frame}.dat'
+        xlp_path.write_text(format_protein_ascii(chain.protein_arr(), time, rng))
+        nbytes['SylinderAscii'] += syl_path.stat().st_size
+        nbytes['ProteinAscii'] += xlp_path.stat().st_size
+        if con_blocks:
+            con_path = frame_dir / f'ConBlock_{frame}.pvtp'
+            write_con_block_pvtp(con_path, syl_arr, *chain.constraints(), rng)
+            nbytes['ConBlock'] += sum(
+                fp.stat().st_size for fp in frame_dir.glob(f'ConBlock_{frame}[._]*'))
+        chain.step()
+    return nbytes
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Write synthetic aLENS output.')
+    parser.add_argument('seed_dir', type=Path, help='Seed directory to create.')
+    parser.add_argument('-b', '--nbeads', type=int, default=1000,
+                        help='Number of beads.')
+    parser.add_argument('-p', '--nproteins', type=int, default=None,
+                        help='Number of proteins (default: number of beads).')
+    parser.add_argument('-n', '--nframes', type=int, default=100,
+                        help='Number of frames.')
+    parser.add_argument('--frames_per_dir', type=int, default=50,
+                        help='Frames per result subdirectory.')
+    parser.add_argument('--no_con_blocks', action='store_true',
+                        help='Do not write ConBlock files.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+    return parser.parse_args()
+
+
+def main():
+    opts = parse_args()
+    nbytes = write_synthetic_sim(opts.seed_dir, opts.nbeads, opts.nproteins,
+                                 opts.nframes, opts.frames_per_dir,
+                                 not opts.no_con_blocks, seed=opts.seed)
+    for prefix, size in nbytes.items():
+        print(f"{prefix:>14}: {size / 2**20:.4g} MiB")
+
+
+##########################################
+if __name__ == "__main__":
+    main()
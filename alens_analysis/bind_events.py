@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: bind_events.py
+Description: Event-log storage of protein binding in raw_data.h5 files. Only
+changes of end bind IDs are stored along with periodic checkpoints of the full
+bound state.
+"""
+
+import h5py
+import numpy as np
+
+from .raw_data_layout import read_protein_bind_ids
+
+BIND_EVENTS_GRP = 'bind_events'
+# Frames between stored full bound states. Reconstructing a frame applies the
+# events of at most this many frames to a checkpoint.
+CHECKPOINT_INTERVAL = 100
+# Number of buffered events that triggers a write to the file
+EVENT_BUFFER_SIZE = 1 << 16
+
+# Columns of an event record
+EVENT_FIELDS = (('frame', np.int32), ('protein', np.int32), ('end', np.int8),
+                ('bind_id', np.int32), ('prev_bind_id', np.int32))
+
+
+class BindEventWriter():
+
+    """Encode the bind IDs of consecutive frames as change events.
+
+    The group holds one 1D dataset per event field sorted by frame,
+    `frame_offsets` such that the events of frame k are
+    [frame_offsets[k], frame_offsets[k + 1]) and `checkpoints`, the bound
+    state of every `checkpoint_interval`-th frame. All datasets grow with the
+    number of frames so the log can be appended to.
+    """
+
+    def __init__(self, grp):
+        self.grp = grp
+        self.interval = grp.attrs['checkpoint_interval']
+        self.nframes = grp['frame_offsets'].size - 1
+        self.n_events = int(grp['frame_offsets'][-1])
+        self.state = None
+        if self.nframes:
+            self.state = BindEventLog(grp).state_at(self.nframes - 1)
+        self.buf = []
+        self.nbuf = 0
+        self.offsets = []
+        self.checkpoints = []
+
+    @classmethod
+    def create(cls, h5_data, nproteins, checkpoint_interval=CHECKPOINT_INTERVAL):
+        """!Create an empty event log in a raw data file.
+
+        @param h5_data Raw data file opened for writing
+        @param nproteins Number of proteins
+        @param checkpoint_interval Frames between stored full bound states
+        @return: BindEventWriter of the new log
+
+        """
+        grp = h5_data.create_group(BIND_EVENTS_GRP)
+        grp.attrs['checkpoint_interval'] = checkpoint_interval
+        grp.attrs['nproteins'] = nproteins
+        for name, dtype in EVENT_FIELDS:
+            grp.create_dataset(name, shape=(0,), dtype=dtype,
+                               maxshape=(None,), chunks=(EVENT_BUFFER_SIZE,))
+        grp.create_dataset('frame_offsets', data=[0], dtype=np.int64,
+                           maxshape=(None,), chunks=(4096,))
+        grp.create_dataset('checkpoints', shape=(0, nproteins, 2),
+                           dtype=np.int32, maxshape=(None, nproteins, 2),
+                           chunks=(1, nproteins, 2))
+        return cls(grp)
+
+    def write(self, bind_ids):
+        """Add the (proteins x 2) bind IDs of the next frame."""
+        bind_ids = np.array(bind_ids, dtype=np.int32)
+        if self.state is not None:
+            prot_inds, end_inds = np.nonzero(bind_ids != self.state)
+            if prot_inds.size:
+                self.buf += [(np.full(prot_inds.size, self.nframes),
+                              prot_inds, end_inds,
+                              bind_ids[prot_inds, end_inds],
+                              self.state[prot_inds, end_inds])]
+                self.nbuf += prot_inds.size
+        if self.nframes % self.interval == 0:
+            self.checkpoints += [bind_ids]
+        self.offsets += [self.n_events + self.nbuf]
+        self.state = bind_ids
+        self.nframes += 1
+        if self.nbuf >= EVENT_BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Write buffered events, offsets and checkpoints to the file."""
+        if self.nbuf:
+            n_old = self.grp['frame'].size
+            for i, (name, dtype) in enumerate(EVENT_FIELDS):
+                dset = self.grp[name]
+                dset.resize((n_old + self.nbuf,))
+                dset[n_old:] = np.concatenate(
+                    [rec[i] for rec in self.buf]).astype(dtype)
+            self.n_events += self.nbuf
+            self.buf = []
+            self.nbuf = 0
+        for name, new in (('frame_offsets', self.offsets),
+                          ('checkpoints', self.checkpoints)):
+            if new:
+                dset = self.grp[name]
+                n_old = dset.shape[0]
+                dset.resize(n_old + len(new), axis=0)
+                dset[n_old:] = np.asarray(new)
+        self.offsets = []
+        self.checkpoints = []
+
+
+class BindEventLog():
+
+    """Read access to the binding event log of a raw data file."""
+
+    def __init__(self, h5_data):
+        """!Open the event log of a raw data file.
+
+        @param h5_data Open raw data file or its bind_events group
+
+        """
+        self.grp = (h5_data if isinstance(h5_data, h5py.Group)
+                    and 'frame_offsets' in h5_data
+                    else h5_data[BIND_EVENTS_GRP])
+        self.interval = self.grp.attrs['checkpoint_interval']
+        self.offsets = self.grp['frame_offsets'][...]
+        self.nframes = self.offsets.size - 1
+
+    def events(self, start=0, end=None, fields=None):
+        """Read the events of a range of frames in bulk.
+
+        Parameters
+        ----------
+        start : int, optional
+            First frame, by default 0
+        end : int, optional
+            Frame after the last one, by default the number of frames
+        fields : sequence of str, optional
+            Event fields to read, by default all of EVENT_FIELDS
+
+        Returns
+        -------
+        dict
+            Arrays of every field sorted by frame
+        """
+        start, end = slice(start, end).indices(self.nframes)[:2]
+        ev_slice = slice(self.offsets[start], self.offsets[max(start, end)])
+        if fields is None:
+            fields = [name for name, _ in EVENT_FIELDS]
+        return {name: self.grp[name][ev_slice] for name in fields}
+
+    def binding_events(self, start=0, end=None):
+        """Events where a protein end binds (possibly after unbinding from
+        another bead in the same frame interval)."""
+        ev = self.events(start, end)
+        mask = ev['bind_id'] >= 0
+        return {name: arr[mask] for name, arr in ev.items()}
+
+    def unbinding_events(self, start=0, end=None):
+        """Events where a protein end unbinds."""
+        ev = self.events(start, end)
+        mask = ev['bind_id'] < 0
+        return {name: arr[mask] for name, arr in ev.items()}
+
+    def state_at(self, frame):
+        """!Reconstruct the bound state of a frame from the closest checkpoint.
+
+        @param frame Frame index
+        @return: (proteins x 2) int32 bind IDs, -1 for unbound ends
+
+        """
+        frame = range(self.nframes)[frame]
+        check = frame // self.interval
+        state = self.grp['checkpoints'][check]
+        ev = self.events(check * self.interval + 1, frame + 1,
+                         ('protein', 'end', 'bind_id'))
+        # Only the last event of every protein end counts
+        keys = 2 * ev['protein'].astype(np.int64) + ev['end']
+        _, last = np.unique(keys[::-1], return_index=True)
+        last = keys.size - 1 - last
+        state[ev['protein'][last], ev['end'][last]] = ev['bind_id'][last]
+        return state
+
+    def iter_states(self, start=0, end=None):
+        """Yield the bound state of consecutive frames, applying the events of
+        one checkpoint interval at a time. Yielded arrays are updated in
+        place, copy them to keep them.
+
+        @param start First frame
+        @param end Frame after the last one
+        @return: Generator of (proteins x 2) int32 bind IDs
+
+        """
+        start, end = slice(start, end).indices(self.nframes)[:2]
+        if start >= end:
+            return
+        state = self.state_at(start)
+        yield state
+        for block_start in range(start + 1, end, self.interval):
+            block_end = min(block_start + self.interval, end)
+            ev = self.events(block_start, block_end,
+                             ('protein', 'end', 'bind_id'))
+            block_offsets = (self.offsets[block_start:block_end + 1]
+                             - self.offsets[block_start])
+            for k in range(block_end - block_start):
+                ev_slice = slice(block_offsets[k], block_offsets[k + 1])
+                state[ev['protein'][ev_slice], ev['end'][ev_slice]] = \
+                    ev['bind_id'][ev_slice]
+                yield state
+
+
+def has_bind_events(h5_data):
+    """Whether a raw data file holds a binding event log."""
+    return BIND_EVENTS_GRP in h5_data
+
+
+def add_bind_events(h5_data, checkpoint_interval=CHECKPOINT_INTERVAL,
+                    frame_block=CHECKPOINT_INTERVAL):
+    """!Build the binding event log of an existing raw data file from its
+    dense protein data, reading bind IDs a block of frames at a time.
+
+    @param h5_data Raw data file opened for writing
+    @param checkpoint_interval Frames between stored full bound states
+    @param frame_block Number of frames read at once
+    @return: BindEventLog of the new log
+
+    """
+    nframes = h5_data['raw_data/sylinders'].shape[-1]
+    nproteins = read_protein_bind_ids(h5_data, 0).shape[0]
+    writer = BindEventWriter.create(h5_data, nproteins, checkpoint_interval)
+    for start in range(0, nframes, frame_block):
+        bind_ids = read_protein_bind_ids(
+            h5_data, slice(start, min(start + frame_block, nframes)))
+        for k in range(bind_ids.shape[-1]):
+            writer.write(bind_ids[:, :, k])
+    writer.flush()
+    return BindEventLog(h5_data)
+
+
+def iter_bind_ids(h5_data, start=0, end=None, frame_block=CHECKPOINT_INTERVAL):
+    """!Yield the bind IDs of consecutive frames from the binding event log if
+    the file has one and from dense protein data otherwise.
+
+    @param h5_data Open raw data file
+    @param start First frame
+    @param end Frame after the last one
+    @param frame_block Number of frames read at once from dense data
+    @return: Generator of (proteins x 2) int bind IDs
+
+    """
+    if has_bind_events(h5_data):
+        yield from BindEventLog(h5_data).iter_states(start, end)
+        return
+    nframes = h5_data['raw_data/sylinders'].shape[-1]
+    start, end = slice(start, end).indices(nframes)[:2]
+    for block_start in range(start, end, frame_block):
+        bind_ids = read_protein_bind_ids(
+            h5_data, slice(block_start, min(block_start + frame_block, end)))
+        for k in range(bind_ids.shape[-1]):
+            yield bind_ids[:, :, k]
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented.")
@@ -25,12 +25,32 @@ from scipy.signal import savgol_filter
 from itertools import cycle
 
 from ..helpers import contiguous_regions, Timer
+from ..trajectory import Trajectory, as_trajectory
+from ..bind_events import iter_bind_ids
+from ..autocorr import fft_autocorr
+
+from .contact_engine import (
+    CONTACT_ENGINES,
+    CONTACT_CUTOFF_SIGMAS,
+    CONTACT_MEMORY_BUDGET,
+    get_near_pairs,
+    sparse_contact_analysis,
+    batched_contact_analysis,
+    write_sparse_mat,
+    read_contact_mat,
+)
+
+# Frames of positions read at once by streaming separation statistics
+SEP_FRAME_CHUNK = 64
 
 from .chrom_poly_stats import (
     get_connect_torch_smat,
     get_connect_smat,
     connect_autocorr,
     connect_diag_autocorr,
+    collect_connect_edges,
+    avg_connect_mat_from_edges,
+    connect_diag_autocorr_fft,
 )
 
 
@@ -48,23 +68,71 @@ def log_gauss_weighted_contact(sep_mat, sigma=0.020):
     return -np.power(sep_mat, 2) / (2.0 * (sigma * sigma)) / np.log(10)
 
 
-def get_link_energy_arrays(h5_data, write=False):
+def get_link_arrays(h5_data, ts_range=(0, None), bead_range=(0, None), link_ids=None):
+    """Read the radii and separation vectors of the beads joined by links of a
+    bead-spring chain. Only the radius and end position columns of the beads
+    and frames in the windows are read.
+
+    Parameters
+    ----------
+    h5_data : h5py.File or Trajectory
+        Raw data of the simulation
+    ts_range : tuple, optional
+        (start, end) frame indices, by default (0, None)
+    bead_range : tuple, optional
+        (start, end) bead indices, by default (0, None)
+    link_ids : sequence of ints, optional
+        Links to compute, where link i joins beads i and i+1 of the bead
+        window and negative ids count from the last link. By default all
+        links of the window.
+
+    Returns
+    -------
+    Trajectory, ndarray, ndarray
+        Trajectory window, summed radii of the two beads of every link
+        (links x frames) and vectors from the plus end of the first to the
+        minus end of the second bead (links x 3 x frames)
+    """
+    traj = as_trajectory(h5_data, ts_range, bead_range)
+    if link_ids is None:
+        radii = traj.radii
+        return traj, radii[1:] + radii[:-1], traj.link_vecs
+
+    n_links = traj.shape[0] - 1
+    link_ids = np.asarray(link_ids) % n_links
+    # Read the beads of all requested links in a single selection
+    bead_inds, inv = np.unique(
+        np.concatenate((link_ids, link_ids + 1)), return_inverse=True
+    )
+    bead_dat = traj.read_beads(bead_inds, slice(1, 8))
+    first, second = bead_dat[inv[: link_ids.size]], bead_dat[inv[link_ids.size :]]
+    rad_sum = second[:, 0, :] + first[:, 0, :]
+    sep_vec = second[:, 1:4, :] - first[:, 4:7, :]
+    return traj, rad_sum, sep_vec
+
+
+def get_link_energy_arrays(
+    h5_data, write=False, ts_range=(0, None), bead_range=(0, None), link_ids=None
+):
     """Get the mean, standard deviation, and expected energy of all links in
     a bead-spring chain
 
     @param h5_data HDF5 data file to analyze with all raw data about filaments
+                   or Trajectory
     @param write If true, will write data directly to the analysis group in
                  the h5_data file.
+    @param ts_range (start, end) frame indices to analyze
+    @param bead_range (start, end) bead indices to analyze
+    @param link_ids Links to analyze (see get_link_arrays)
     @return: TODO
 
     """
-    sy_dat = h5_data["raw_data"]["sylinders"][...]
-    params = yaml.safe_load(h5_data.attrs["RunConfig"])
+    traj, rad_sum, sep_vec = get_link_arrays(h5_data, ts_range, bead_range, link_ids)
+    params = traj.params
     k_spring = params["linkKappa"]
     kbt = params["KBT"]
 
-    rest_length = params["linkGap"] + sy_dat[1:, 1, :] + sy_dat[:-1, 1, :]
-    sep_vec = sy_dat[1:, 2:5, :] - sy_dat[:-1, 5:8, :]
+    rest_length = params["linkGap"] + rad_sum
 
     sep_mag = np.linalg.norm(sep_vec, axis=1)
 
@@ -75,28 +143,29 @@ def get_link_energy_arrays(h5_data, write=False):
         0.5 - 1.0 / (1.0 + (k_spring * rest_length[0, 0] * rest_length[0, 0] / kbt))
     )
     if write:
-        energy_dset = h5_data["analysis"].create_dataset(
-            "link_energy", data=np.stack(mean_energy, sem_energy)
+        energy_dset = traj.h5_data["analysis"].create_dataset(
+            "link_energy", data=np.stack((mean_energy, sem_energy))
         )
         energy_dset.attrs["nsylinders"] = energy_arr.shape[0]
     return mean_energy, sem_energy, kbt, expt_energy
 
 
-def get_link_tension(h5_data):
+def get_link_tension(h5_data, ts_range=(0, None), bead_range=(0, None), link_ids=None):
     """Get the force on a bead for every time step
 
     @param h5_data HDF5 data file to analyze with all raw data about filaments
-    @param write If true, will write data directly to the analysis group in
-                 the h5_data file.
+                   or Trajectory
+    @param ts_range (start, end) frame indices to analyze
+    @param bead_range (start, end) bead indices to analyze
+    @param link_ids Links to analyze (see get_link_arrays)
     @return: TODO
 
     """
-    sy_dat = h5_data["raw_data"]["sylinders"][...]
-    params = yaml.safe_load(h5_data.attrs["RunConfig"])
+    traj, rad_sum, sep_vec = get_link_arrays(h5_data, ts_range, bead_range, link_ids)
+    params = traj.params
     k_spring = params["extendLinkKappa"]
 
-    rest_length = params["extendLinkGap"] + sy_dat[1:, 1, :] + sy_dat[:-1, 1, :]
-    sep_vec = sy_dat[1:, 2:5, :] - sy_dat[:-1, 5:8, :]
+    rest_length = params["extendLinkGap"] + rad_sum
 
     sep_mag = np.linalg.norm(sep_vec, axis=1)
 
@@ -104,21 +173,25 @@ def get_link_tension(h5_data):
     return tension_arr
 
 
-def get_link_tension_along_chain(h5_data, vec=(1, 0, 0)):
+def get_link_tension_along_chain(
+    h5_data, vec=(1, 0, 0), ts_range=(0, None), bead_range=(0, None), link_ids=None
+):
     """Get the force on a bead for every time step projected along a vector
 
     @param h5_data HDF5 data file to analyze with all raw data about filaments
-    @param write If true, will write data directly to the analysis group in
-                 the h5_data file.
+                   or Trajectory
+    @param vec Vector to project tension onto
+    @param ts_range (start, end) frame indices to analyze
+    @param bead_range (start, end) bead indices to analyze
+    @param link_ids Links to analyze (see get_link_arrays)
     @return: TODO
     """
 
-    sy_dat = h5_data["raw_data"]["sylinders"][...]
-    params = yaml.safe_load(h5_data.attrs["RunConfig"])
+    traj, rad_sum, sep_vec = get_link_arrays(h5_data, ts_range, bead_range, link_ids)
+    params = traj.params
     k_spring = params["extendLinkKappa"]
 
-    rest_length = params["extendLinkGap"] + sy_dat[1:, 1, :] + sy_dat[:-1, 1, :]
-    sep_vec = sy_dat[1:, 2:5, :] - sy_dat[:-1, 5:8, :]
+    rest_length = params["extendLinkGap"] + rad_sum
     proj_vec = np.asarray(vec) / np.linalg.norm(vec)
     sep_mag = np.linalg.norm(sep_vec, axis=1)
     tension_arr = (k_spring * (1.0 - (rest_length / sep_mag)))[
@@ -148,19 +221,17 @@ def get_pos_kymo_data(
     time point in simulation.
 
 
-    @param h5_data Simulation hdf5 data
+    @param h5_data Simulation hdf5 data or Trajectory
     @return: TODO
 
     """
+    traj = as_trajectory(h5_data, ts_range, bead_range)
     # Get size of the system
-    params = yaml.safe_load(h5_data.attrs["RunConfig"])
+    params = traj.params
     sim_box_low = np.asarray(params["simBoxLow"])
     sim_box_high = np.asarray(params["simBoxHigh"])
     # Get center of mass of all beads for all times
-    sy_dat = h5_data["raw_data"]["sylinders"][
-        bead_range[0] : bead_range[1], :, ts_range[0] : ts_range[-1]
-    ]
-    com_arr = 0.5 * (sy_dat[:, 2:5, :] + sy_dat[:, 5:8, :])
+    com_arr = traj.com
     # Project bead positions onto unit vector from first to last bead
     proj_vec = com_arr[-1, :, 0] - com_arr[0, :, 0]
     proj_vec /= np.linalg.norm(proj_vec)
@@ -176,7 +247,7 @@ def get_pos_kymo_data(
 
     hist_arr = np.asarray(hist_arr).T
 
-    time_arr = h5_data["time"][ts_range[0] : ts_range[-1]]
+    time_arr = traj.time
     if analysis is not None:
         pos_kymo_dset = analysis.create_dataset("pos_kymo", data=hist_arr)
         pos_kymo_bin_edges = analysis.create_dataset(
@@ -297,10 +368,12 @@ def get_pos_cond_data(
     return cond_edge_coords, cond_num_arr
 
 
-def get_sep_hist(h5_data, nbins=100, ss_ind=0, write=False):
+def get_sep_hist(h5_data, nbins=100, ss_ind=0, write=False,
+                 frame_chunk=SEP_FRAME_CHUNK):
     """Returns a 2D histogram of bead separations vs time
 
     @param h5_data TODO
+    @param frame_chunk Number of frames of positions read at once
     @return: TODO
 
     """
@@ -308,16 +381,89 @@ def get_sep_hist(h5_data, nbins=100, ss_ind=0, write=False):
     hist_min = params["sylinderDiameter"] * 0.8
     hist_max = params["sylinderDiameter"] * 1.2
 
-    dist_hist = []
-    dist_mat = get_sep_dist_mat(h5_data, ss_ind)
+    sep_stats = get_sep_stats(
+        h5_data, (hist_min, hist_max), nbins, ss_ind=ss_ind, frame_chunk=frame_chunk
+    )
+    return list(sep_stats["hist"]), sep_stats["bin_edges"]
+
+
+def get_sep_stats(
+    h5_data,
+    hist_range,
+    nbins=100,
+    overlap_diam=None,
+    ss_ind=0,
+    end_ind=None,
+    bead_range=(0, None),
+    frame_chunk=SEP_FRAME_CHUNK,
+):
+    """Accumulate per frame statistics of bead pair separations, reading
+    positions a chunk of frames at a time and only visiting pairs within the
+    histogram range or overlap diameter. Memory is O(beads * frame_chunk +
+    near pairs) instead of the O(beads^2 * frames) of get_sep_dist_mat.
 
-    for i in range(dist_mat.shape[-1]):
-        hist, bin_edges = np.histogram(
-            dist_mat[:, :, i].flatten(), nbins, range=(hist_min, hist_max)
-        )
-        dist_hist += [hist * 0.5]
+    Parameters
+    ----------
+    h5_data : h5py.File or Trajectory
+        Raw data file
+    hist_range : (float, float)
+        Range of the separation histogram
+    nbins : int, optional
+        Number of histogram bins, by default 100
+    overlap_diam : float, optional
+        Pairs closer than this are overlapping (see get_overlap_arrs), by
+        default no overlap statistics
+    ss_ind : int, optional
+        First frame, by default 0
+    end_ind : int, optional
+        Frame after the last one, by default the last frame
+    bead_range : (int, int), optional
+        Range of beads, by default all
+    frame_chunk : int, optional
+        Number of frames of positions read at once, by default SEP_FRAME_CHUNK
 
-    return dist_hist, bin_edges
+    Returns
+    -------
+    dict
+        'hist' (frames x nbins) counts of bead pairs, 'bin_edges' and with
+        overlap_diam 'num_overlap', 'avg_overlap' (nan without overlaps) and
+        'min_overlap' (masked without overlaps) of every frame
+    """
+    hist_min, hist_max = hist_range
+    cutoff = hist_max if overlap_diam is None else max(hist_max, overlap_diam)
+    bin_edges = np.linspace(hist_min, hist_max, nbins + 1)
+    traj = as_trajectory(h5_data, (ss_ind, end_ind), bead_range)
+    n_time = traj.shape[1]
+    sep_stats = {"hist": np.zeros((n_time, nbins)), "bin_edges": bin_edges}
+    if overlap_diam is not None:
+        num_overlap = np.zeros(n_time)
+        overlap_sum = np.zeros(n_time)
+        min_overlap = np.ma.masked_all(n_time)
+
+    for start, com_arr in traj.iter_com(frame_chunk):
+        for k in range(com_arr.shape[-1]):
+            # Slightly larger search radius so pairs at the cutoff are kept
+            # independent of the rounding of the tree
+            _, _, sep = get_near_pairs(com_arr[:, :, k], cutoff * (1.0 + 1e-9))
+            sep_stats["hist"][start + k], _ = np.histogram(
+                sep, bin_edges, range=hist_range
+            )
+            if overlap_diam is None:
+                continue
+            overlap_sep = sep[sep < overlap_diam]
+            num_overlap[start + k] = overlap_sep.size
+            overlap_sum[start + k] = overlap_sep.sum()
+            # Coincident beads are not counted as in get_overlap_arrs
+            overlap_sep = overlap_sep[overlap_sep > 0]
+            if overlap_sep.size:
+                min_overlap[start + k] = overlap_sep.min()
+
+    if overlap_diam is not None:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sep_stats["avg_overlap"] = overlap_sum / num_overlap
+        sep_stats["num_overlap"] = num_overlap
+        sep_stats["min_overlap"] = min_overlap
+    return sep_stats
 
 
 def get_sep_dist_mat(h5_data, ss_ind=0, bead_range=None, write=False):
@@ -328,14 +474,12 @@ def get_sep_dist_mat(h5_data, ss_ind=0, bead_range=None, write=False):
     @return: TODO
 
     """
-    sy_dat = h5_data["raw_data"]["sylinders"][...]
-
-    com_arr = 0.5 * (sy_dat[:, 2:5, :] + sy_dat[:, 5:8, :])
-    if bead_range is not None:
-        com_arr = com_arr[bead_range[0] : bead_range[1]]
+    if bead_range is None:
+        bead_range = (0, None)
+    com_arr = as_trajectory(h5_data, (ss_ind, None), bead_range).com
 
     dist_mat = np.linalg.norm(
-        (com_arr[:, np.newaxis, :, ss_ind:] - com_arr[np.newaxis, :, :, ss_ind:]),
+        (com_arr[:, np.newaxis, :, :] - com_arr[np.newaxis, :, :, :]),
         axis=2,
     )
 
@@ -344,7 +488,8 @@ def get_sep_dist_mat(h5_data, ss_ind=0, bead_range=None, write=False):
 
 def get_overlap_arrs(dist_mat, sy_diam):
     """Returns a NxNxM matrix of NXN filaments distances over M time points
-    starting at ss_ind time point.
+    starting at ss_ind time point. get_sep_stats computes the same arrays
+    from a raw data file without the full distance matrix.
 
     @param h5_data TODO
     @return: TODO
@@ -375,17 +520,8 @@ def autocorr_bead_pos(com_arr, ignore_id=None):
 
     if ignore_id is not None:
         com_rel_arr = np.delete(com_rel_arr, ignore_id, axis=0)
-    nsteps = com_rel_arr.shape[-1]
-    nbeads = com_rel_arr.shape[0]
-    auto_corr = np.zeros((nbeads, nsteps))
-    for t in range(nsteps):
-        for j in range(nsteps - t):
-            auto_corr[:, t] += np.einsum(
-                "ij,ij->i", com_rel_arr[:, :, t + j], com_rel_arr[:, :, j]
-            )
-        auto_corr[:, t] /= nsteps - t
 
-    return auto_corr
+    return fft_autocorr(com_rel_arr)
 
 
 def distr_hists(pos_mat, free_frac_chain=0.5, rel_ind=0, nbins=100, hist_max=1.0):
@@ -529,7 +665,16 @@ def get_all_rog_stats(pos_mat, rel_ind=0):
 
 
 def get_contact_mat_analysis(
-    com_arr, sigma=0.02, avg_block_step=1, log=True, radius_arr=None, h5_obj=None
+    com_arr,
+    sigma=0.02,
+    avg_block_step=1,
+    log=True,
+    radius_arr=None,
+    h5_obj=None,
+    engine="dense",
+    cutoff_sigmas=CONTACT_CUTOFF_SIGMAS,
+    memory_budget=CONTACT_MEMORY_BUDGET,
+    float_dtype="f8",
 ):
     """Generate (and store if given an HDF5 directory) all analysis related to
     contact matrices related to chromatin. This is includes separation matrix at
@@ -550,34 +695,72 @@ def get_contact_mat_analysis(
         _description_, by default None
     analysis : _type_, optional
         _description_, by default None
+    engine : str, optional
+        'dense' computes all pairs of every frame, 'sparse' only pairs closer
+        than cutoff_sigmas * sigma (see contact_cutoff_error for the error)
+        and 'batched' all pairs of batches of frames with torch, by default
+        'dense'
+    cutoff_sigmas : float, optional
+        Cutoff of the sparse engine in units of sigma, by default
+        CONTACT_CUTOFF_SIGMAS
+    memory_budget : int, optional
+        Bytes of pair matrices of a frame batch of the batched engine, by
+        default CONTACT_MEMORY_BUDGET
+    float_dtype : str, optional
+        Computing dtype of the batched engine ('f4' or 'f8'), by default 'f8'
 
     Returns
     -------
     _type_
-        _description_
+        _description_. With the sparse engine the contact matrix is a
+        scipy.sparse.csr_matrix (stored as a group of CSR arrays) whose
+        missing entries are pairs never within the cutoff.
     """
     reduc_com_arr = com_arr[::avg_block_step, :, :]  # simple downsampling
     n_beads = reduc_com_arr.shape[0]
     n_time = reduc_com_arr.shape[-1]
-    avg_contact_mat = np.zeros((n_beads, n_beads))
-    contact_kymo = np.zeros((n_beads, n_time))
 
-    for i in range(reduc_com_arr.shape[-1]):
-        sep_mat = np.linalg.norm(
-            reduc_com_arr[:, np.newaxis, :, i] - reduc_com_arr[np.newaxis, :, :, i],
-            axis=2,
+    if engine == "sparse":
+        avg_contact_mat, contact_kymo = sparse_contact_analysis(
+            reduc_com_arr, sigma, cutoff_sigmas
+        )
+    elif engine == "batched":
+        avg_contact_mat, contact_kymo = batched_contact_analysis(
+            reduc_com_arr, sigma, memory_budget, float_dtype
+        )
+    elif engine == "dense":
+        avg_contact_mat = np.zeros((n_beads, n_beads))
+        contact_kymo = np.zeros((n_beads, n_time))
+
+        for i in range(reduc_com_arr.shape[-1]):
+            sep_mat = np.linalg.norm(
+                reduc_com_arr[:, np.newaxis, :, i] - reduc_com_arr[np.newaxis, :, :, i],
+                axis=2,
+            )
+            contact_mat = gauss_weighted_contact(sep_mat, sigma)
+            contact_kymo[:, i] = get_contact_kymo_data(contact_mat)
+            avg_contact_mat += contact_mat
+    else:
+        raise ValueError(
+            f'Unknown contact engine "{engine}". Options are {CONTACT_ENGINES}.'
         )
-        contact_mat = gauss_weighted_contact(sep_mat, sigma)
-        contact_kymo[:, i] = get_contact_kymo_data(contact_mat)
-        avg_contact_mat += contact_mat
 
     if log:
-        avg_contact_mat = np.log(avg_contact_mat)
+        if engine == "sparse":
+            avg_contact_mat.data = np.log(avg_contact_mat.data)
+        else:
+            avg_contact_mat = np.log(avg_contact_mat)
 
     if h5_obj is not None:
-        avg_contact_mat_dset = h5_obj.create_dataset(
-            "avg_contact_mat", data=avg_contact_mat
-        )
+        if engine == "sparse":
+            avg_contact_mat_dset = write_sparse_mat(
+                h5_obj, "avg_contact_mat", avg_contact_mat
+            )
+            avg_contact_mat_dset.attrs["cutoff_sigmas"] = cutoff_sigmas
+        else:
+            avg_contact_mat_dset = h5_obj.create_dataset(
+                "avg_contact_mat", data=avg_contact_mat
+            )
         avg_contact_mat_dset.attrs["sigma"] = sigma
         avg_contact_mat_dset.attrs["avg_block_step"] = avg_block_step
         avg_contact_mat_dset.attrs["log"] = log
@@ -643,18 +826,18 @@ def create_connect_hdf5(
     with h5py.File(h5_raw_path, "r") as h5_data:
         time_arr = h5_data["time"][start_ind:end_ind]
         lag_time_arr = time_arr - time_arr[0]
-        prot_dat = h5_data["raw_data/proteins"][:, :, start_ind:end_ind]
-        bead_num = h5_data["raw_data/sylinders"][...].shape[0]
-        connect_mat_list = []
+        bead_num = h5_data["raw_data/sylinders"].shape[0]
         # timer = Timer()
-        for i in range(time_arr.size):
-            connect_mat_list += [get_connect_torch_smat(prot_dat[:, :, i], bead_num)]
+        # Only the bind IDs of proteins are needed, taken from the binding
+        # event log if the file has one. Crosslinks of every frame are kept
+        # as flat matrix indices.
+        edges, offsets = collect_connect_edges(
+            iter_bind_ids(h5_data, start_ind, end_ind), bead_num
+        )
         # timer.log()
 
         # timer.milestone()
-        n = len(connect_mat_list)
-        avg_connect_mat = reduce(lambda x, y: x + y, connect_mat_list)
-        avg_connect_mat = avg_connect_mat.to_dense().numpy() / n
+        avg_connect_mat = avg_connect_mat_from_edges(edges, offsets, bead_num)
         # timer.log()
 
     with h5py.File(connect_path, "w") as h5_cnct:
@@ -663,13 +846,22 @@ def create_connect_hdf5(
         _ = h5_cnct.create_dataset("avg_connect_mat", data=avg_connect_mat)
 
         # timer.milestone()
-        ac_arr = connect_diag_autocorr(connect_mat_list[:])
+        ac_arr = connect_diag_autocorr_fft(edges, offsets, bead_num)
         _ = h5_cnct.create_dataset("autocorr", data=ac_arr)
         # timer.log()
 
 
 def create_contact_hdf5(
-    h5_raw_path, force=False, verbose=False, start_ind=0, end_ind=None
+    h5_raw_path,
+    force=False,
+    verbose=False,
+    start_ind=0,
+    end_ind=None,
+    traj=None,
+    engine="dense",
+    cutoff_sigmas=CONTACT_CUTOFF_SIGMAS,
+    memory_budget=CONTACT_MEMORY_BUDGET,
+    float_dtype="f8",
 ):
     """TODO: Docstring for create_contact_hdf5.
 
@@ -678,6 +870,11 @@ def create_contact_hdf5(
     @param verbos TODO
     @param start_ind TODO
     @param end_ind TODO
+    @param traj Trajectory of the raw data file to use instead of reading it
+    @param engine Contact engine of get_contact_mat_analysis
+    @param cutoff_sigmas Cutoff of the sparse engine in units of sigma
+    @param memory_budget Bytes of a frame batch of the batched engine
+    @param float_dtype Computing dtype of the batched engine
     @return: TODO
 
     """
@@ -691,14 +888,145 @@ def create_contact_hdf5(
         contact_path.unlink()
 
     # Run analysis
-    with h5py.File(h5_raw_path, "r") as h5_data:
-        time_arr = h5_data["time"][start_ind:end_ind]
-        sy_dat = h5_data["raw_data/sylinders"][:, :, start_ind:end_ind]
-        com_arr = 0.5 * (sy_dat[:, 2:5, :] + sy_dat[:, 5:8, :])
+    with as_trajectory(
+        h5_raw_path if traj is None else traj, ts_range=(start_ind, end_ind)
+    ) as traj_win:
+        time_arr = traj_win.time
+        com_arr = traj_win.com
 
     with h5py.File(contact_path, "w") as h5_contact:
         _ = h5_contact.create_dataset("time", data=time_arr)
-        _ = get_contact_mat_analysis(com_arr, h5_obj=h5_contact)
+        _ = get_contact_mat_analysis(
+            com_arr,
+            h5_obj=h5_contact,
+            engine=engine,
+            cutoff_sigmas=cutoff_sigmas,
+            memory_budget=memory_budget,
+            float_dtype=float_dtype,
+        )
+
+
+def append_to_frame_dset(h5_obj, name, arr):
+    """Append data along the last (time) axis of a dataset. Datasets created
+    with a fixed size are replaced once by a resizable copy.
+
+    @param h5_obj HDF5 group holding the dataset
+    @param name Name of the dataset
+    @param arr Data to append
+    @return: Dataset
+
+    """
+    dset = h5_obj[name]
+    n_old = dset.shape[-1]
+    if dset.maxshape[-1] is not None:
+        attrs = dict(dset.attrs)
+        old_data = dset[...]
+        del h5_obj[name]
+        dset = h5_obj.create_dataset(
+            name, data=old_data, maxshape=old_data.shape[:-1] + (None,),
+            chunks=True)
+        for key, val in attrs.items():
+            dset.attrs[key] = val
+    dset.resize(n_old + arr.shape[-1], axis=dset.ndim - 1)
+    dset[..., n_old:] = arr
+    return dset
+
+
+def update_contact_hdf5(
+    h5_raw_path,
+    verbose=False,
+    traj=None,
+    engine="dense",
+    cutoff_sigmas=CONTACT_CUTOFF_SIGMAS,
+    memory_budget=CONTACT_MEMORY_BUDGET,
+    float_dtype="f8",
+):
+    """Extend the contact kymograph and average contact matrix of
+    contact_analysis.h5 with frames appended to the raw data file since it was
+    made. Only the new frames are read and analyzed. If the contact file does
+    not exist, it is created.
+
+    @param h5_raw_path Path to raw data file
+    @param verbose Print number of frames added
+    @param traj Trajectory of the raw data file to use instead of reading it
+    @param engine Contact engine of get_contact_mat_analysis. Files made by
+           the sparse engine are always extended with it, dense files with
+           the dense engine unless 'batched' is given.
+    @param cutoff_sigmas Cutoff of the sparse engine of new files (existing
+           files keep their cutoff)
+    @param memory_budget Bytes of a frame batch of the batched engine
+    @param float_dtype Computing dtype of the batched engine
+    @return: Number of frames added
+
+    """
+    contact_path = h5_raw_path.parent / f"contact_analysis.h5"
+    if not contact_path.exists():
+        create_contact_hdf5(
+            h5_raw_path,
+            traj=traj,
+            engine=engine,
+            cutoff_sigmas=cutoff_sigmas,
+            memory_budget=memory_budget,
+            float_dtype=float_dtype,
+        )
+        with h5py.File(contact_path, "r") as h5_contact:
+            return h5_contact["time"].size
+
+    with h5py.File(contact_path, "a") as h5_contact:
+        contact_time = h5_contact["time"]
+        avg_contact_mat_dset = h5_contact["avg_contact_mat"]
+        attrs = dict(avg_contact_mat_dset.attrs)
+        sigma = attrs["sigma"]
+        avg_block_step = attrs["avg_block_step"]
+        log = attrs["log"]
+        # Contact matrices stored as groups were made by the sparse engine
+        is_sparse = isinstance(avg_contact_mat_dset, h5py.Group)
+        if is_sparse:
+            engine = "sparse"
+        elif engine != "batched":
+            engine = "dense"
+        cutoff_sigmas = attrs.get("cutoff_sigmas", cutoff_sigmas)
+
+        with as_trajectory(h5_raw_path if traj is None else traj) as traj_all:
+            # Contact files may start at a later frame (start_ind)
+            start_ind = np.searchsorted(traj_all.time, contact_time[0])
+            traj_win = traj_all.window(ts_range=(start_ind + contact_time.size, None))
+            time_arr = traj_win.time
+            if time_arr.size == 0:
+                return 0
+            com_arr = traj_win.com
+
+        contact_sum, contact_kymo = get_contact_mat_analysis(
+            com_arr, sigma, avg_block_step, log=False, engine=engine,
+            cutoff_sigmas=cutoff_sigmas, memory_budget=memory_budget,
+            float_dtype=float_dtype)
+        # Stored matrix is the (log of the) sum over all frames
+        if is_sparse:
+            old_sum = read_contact_mat(h5_contact, dense=False)
+            if log:
+                old_sum.data = np.exp(old_sum.data)
+            new_sum = (old_sum + contact_sum).tocsr()
+            if log:
+                new_sum.data = np.log(new_sum.data)
+            del h5_contact["avg_contact_mat"]
+            avg_contact_mat_dset = write_sparse_mat(
+                h5_contact, "avg_contact_mat", new_sum)
+            for key, val in attrs.items():
+                if key not in ("format", "shape"):
+                    avg_contact_mat_dset.attrs[key] = val
+        else:
+            old_sum = avg_contact_mat_dset[...]
+            if log:
+                old_sum = np.exp(old_sum)
+            new_sum = old_sum + contact_sum
+            avg_contact_mat_dset[...] = np.log(new_sum) if log else new_sum
+
+        append_to_frame_dset(h5_contact, "time", time_arr)
+        append_to_frame_dset(h5_contact, "contact_kymo", contact_kymo)
+
+    if verbose:
+        print(f"Added {time_arr.size} frames to {contact_path.name}.")
+    return time_arr.size
 
 
 ##########################################
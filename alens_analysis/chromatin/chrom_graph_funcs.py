@@ -51,6 +51,8 @@ from .chrom_analysis import (
     get_contact_cond_data,
 )
 
+from ..trajectory import as_trajectory
+
 from .chrom_condensate_analysis import (
     get_max_and_total_cond_size,
     gen_condensate_track_info,
@@ -61,11 +63,14 @@ from .chrom_condensate_analysis import (
 def make_all_condensate_graphs(h5_data, opts, overwrite=False):
     """TODO: Docstring for make_all_condensate_graphs.
 
-    @param h5_path TODO
+    @param h5_data Raw data file opened for writing or a Trajectory of one
     @param **kwargs TODO
     @return: TODO
 
     """
+    # Every graph below reads bead data through the same trajectory
+    traj = as_trajectory(h5_data)
+    h5_data = traj.h5_data
     cond_sty = {
         "axes.titlesize": 20,
         "axes.labelsize": 24,
@@ -93,8 +98,7 @@ def make_all_condensate_graphs(h5_data, opts, overwrite=False):
     analysis_grp.attrs["timestep_range"] = [ss_ind, end_ind]
 
     # Basic data
-    sy_dat = h5_data["raw_data"]["sylinders"][start_bead:end_bead, :, ss_ind:end_ind]
-    com_arr = 0.5 * (sy_dat[:, 2:5, :] + sy_dat[:, 5:8, :])
+    com_arr = traj.window((ss_ind, end_ind), (start_bead, end_bead)).com
     nbeads = com_arr.shape[0]
 
     # Make combined position kymo graph and condensate graph
@@ -102,7 +106,7 @@ def make_all_condensate_graphs(h5_data, opts, overwrite=False):
 
     if "pos_kymo" not in analysis_grp.keys():
         time_arr, cond_hist_arr, bin_edges = get_pos_kymo_data(
-            h5_data,
+            traj,
             ts_range=(ss_ind, end_ind),
             bead_range=(start_bead, end_bead),
             bins=200,
@@ -270,10 +274,10 @@ def make_all_condensate_graphs(h5_data, opts, overwrite=False):
 
     plt.rcParams["image.cmap"] = "coolwarm"
     # Make tension kymograph
-    fig6, ax6 = make_tension_kymo(h5_data, ss_ind, end_ind, time_win=201)
+    fig6, ax6 = make_tension_kymo(traj, ss_ind, end_ind, time_win=201)
     fig6.savefig(opts.analysis_dir / f"tension_kymo.png")
 
-    fig7, ax7 = make_tension_hists(h5_data, ss_ind, end_ind)
+    fig7, ax7 = make_tension_hists(traj, ss_ind, end_ind)
     fig7.savefig(opts.analysis_dir / f"tension_hists.png")
 
 
@@ -537,7 +541,7 @@ def make_tension_kymo(h5_data, ss_ind, end_ind, time_win=1001):
 
     """
     time_arr = h5_data["time"][ss_ind:end_ind]
-    tension_arr = get_link_tension(h5_data)[:, ss_ind:end_ind]
+    tension_arr = get_link_tension(h5_data, ts_range=(ss_ind, end_ind))
     tension_arr = savgol_filter(tension_arr, time_win, 3, axis=-1)
     fig, ax = plt.subplots(
         figsize=(10, 8),
@@ -560,10 +564,9 @@ def make_tension_hists(h5_data, ss_ind, end_ind):
     fig, axarr = plt.subplots(2, 2, sharex=True, sharey=True, figsize=(16, 14))
     time_arr = h5_data["time"][ss_ind:-1]
 
-    tension_arr0 = get_link_tension(h5_data)[0, ss_ind:end_ind]
-    tension_arr1 = get_link_tension(h5_data)[1, ss_ind:end_ind]
-    tension_arr_1 = get_link_tension(h5_data)[-1, ss_ind:end_ind]
-    tension_arr_2 = get_link_tension(h5_data)[-2, ss_ind:end_ind]
+    tension_arr0, tension_arr1, tension_arr_1, tension_arr_2 = get_link_tension(
+        h5_data, ts_range=(ss_ind, end_ind), link_ids=(0, 1, -1, -2)
+    )
 
     _ = axarr[0, 0].hist(tension_arr0, bins=60)
     _ = axarr[0, 0].axvline(
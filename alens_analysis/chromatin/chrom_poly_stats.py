@@ -17,12 +17,23 @@ import scipy.stats as stats
 from scipy.signal import savgol_filter
 from scipy.sparse import csr_matrix, coo_matrix
 from scipy import fftpack
+from scipy.fft import rfft, irfft, next_fast_len
 import torch
 
 import numpy as np
 
 import alens_analysis as aa
 from alens_analysis.helpers import gen_id
+from alens_analysis.autocorr import fft_autocorr
+from alens_analysis.msd import fft_msd
+from alens_analysis.chromatin.contact_engine import (CONTACT_MEMORY_BUDGET,
+                                                     get_near_pairs)
+
+# Bytes of the time series and transforms of the connection matrix entries
+# processed at once by connect_edge_autocorr
+CONNECT_MEMORY_BUDGET = 1 << 28
+# Bytes of the tiles of bead pairs of pair_sep_autocorr
+PAIR_MEMORY_BUDGET = 1 << 28
 
 
 def avg_dist_from_poly_com(com_arr, device='cpu'):
@@ -34,40 +45,148 @@ def avg_dist_from_poly_com(com_arr, device='cpu'):
 
 
 def poly_bead_msd(com_arr, device='cpu'):
-    tcom_arr = torch.from_numpy(com_arr).to(device)
-    tcom_arr -= tcom_arr.mean(axis=0)
-    n = com_arr.shape[0]
-    Ttot = com_arr.shape[-1]
-    msd = torch.zeros(Ttot, device=device)
-    for i in range(1, Ttot):
-        tdiff_mat = tcom_arr[:, :, i:] - tcom_arr[:, :, :-i]
-        msd[i] = torch.einsum('ijk,ijk->', tdiff_mat, tdiff_mat)/((Ttot-i)*n)
-
-    return msd
+    """Time averaged MSD of beads relative to the polymer center of mass
+    (see fft_msd)."""
+    rel_com_arr = com_arr - com_arr.mean(axis=0)
+    msd = fft_msd(rel_com_arr, device=device)
+    return torch.from_numpy(msd).to(device)
 
 
 def dist_vs_idx_dist(com_arr, device='cpu'):
-    tcom_arr = torch.from_numpy(com_arr).to(device)
-    sep_mat = torch.norm(
-        tcom_arr[:, None, :] - tcom_arr[None, :, :], dim=2)
-    avg_dist_arr = torch.zeros((sep_mat.shape[0]-1))
-    # avg_dist_sem_arr = torch.zeros((sep_mat.shape[0]))
-    for i in range(1, sep_mat.shape[0]):
-        diag = torch.diagonal(sep_mat, i)
-        avg_dist_arr[i-1] = diag.mean()
-    #     avg_dist_sem_arr[i] = stats.sem(diag)
-    return avg_dist_arr
+    """Mean distance vs index distance 1..N-1 of a single (N x 3) frame
+    (see dist_vs_idx_dist_batch)."""
+    per_frame = dist_vs_idx_dist_batch(com_arr[:, :, None], device=device)[2]
+    return torch.from_numpy(per_frame[:, 0]).float()
+
 
 def contact_vs_idx_dist(com_arr, contact_thresh, device='cpu'):
-    tcom_arr = torch.from_numpy(com_arr).to(device)
-    sep_mat = torch.norm(
-        tcom_arr[:, None, :] - tcom_arr[None, :, :], dim=2)
-    contact_mat = (sep_mat < contact_thresh).float()
-    avg_cont_arr = torch.zeros((sep_mat.shape[0]-1))
-    for i in range(1, contact_mat.shape[0]):
-        diag = torch.diagonal(contact_mat, i)
-        avg_cont_arr[i-1] = diag.mean()
-    return avg_cont_arr
+    """Contact probability vs index distance 1..N-1 of a single (N x 3)
+    frame (see contact_vs_idx_dist_batch)."""
+    per_frame = contact_vs_idx_dist_batch(com_arr[:, :, None], contact_thresh,
+                                          device=device)[2]
+    return torch.from_numpy(per_frame[:, 0]).float()
+
+
+def _idx_dist_stats(idx_dist_sums, n_beads):
+    """Per frame means, time average and SEM over frames from (N x T) sums
+    over pairs of every index distance."""
+    per_frame = idx_dist_sums[1:] / np.arange(n_beads - 1, 0, -1)[:, None]
+    n_frames = per_frame.shape[-1]
+    sem = (per_frame.std(axis=-1, ddof=1) / np.sqrt(n_frames) if n_frames > 1
+           else np.full(n_beads - 1, np.nan))
+    return per_frame.mean(axis=-1), sem, per_frame
+
+
+def _batched_idx_dist_sums(com_arr, pair_func, memory_budget, device):
+    """!Sum a function of the separations of all pairs i < j over index
+    distance j - i for batches of frames at once. Every index distance is
+    reduced from strided differences of positions, so no (N x N) matrices or
+    pair index arrays are built.
+
+    @param com_arr (N x 3 x T) positions
+    @param pair_func Maps (frames x pairs) separations to values
+    @param memory_budget Bytes of temporary arrays of a batch
+    @param device Torch device
+    @return: (N x T) sums, row 0 (index distance 0) is empty
+
+    """
+    n_beads, _, n_steps = com_arr.shape
+    # Differences (3 values), separations and reduced values of the pairs of
+    # one index distance of every frame
+    frame_bytes = 5 * n_beads * 8
+    if memory_budget < frame_bytes:
+        raise ValueError(f'Memory budget of {memory_budget} bytes is below '
+                         f'the {frame_bytes} bytes of a single frame.')
+    batch = int(min(memory_budget // frame_bytes, n_steps))
+    tcom_arr = torch.from_numpy(np.ascontiguousarray(
+        np.moveaxis(com_arr, -1, 0), dtype=np.float64)).to(device)
+    sums = np.zeros((n_beads, n_steps))
+    with torch.no_grad():
+        for start in range(0, n_steps, batch):
+            pos = tcom_arr[start:start + batch]
+            batch_sums = torch.zeros((n_beads, pos.shape[0]),
+                                     dtype=torch.float64, device=device)
+            for idx_dist in range(1, n_beads):
+                sep = (pos[:, idx_dist:] - pos[:, :-idx_dist]).norm(dim=-1)
+                batch_sums[idx_dist] = pair_func(sep).sum(dim=-1)
+            sums[:, start:start + batch] = batch_sums.cpu().numpy()
+    return sums
+
+
+def dist_vs_idx_dist_batch(com_arr, memory_budget=CONTACT_MEMORY_BUDGET,
+                           device='cpu'):
+    """Mean distance between beads as a function of their index distance
+    for all frames, reducing all diagonals of batches of frames at once.
+
+    Parameters
+    ----------
+    com_arr : NxDxT ndarray
+        Positions of beads
+    memory_budget : int, optional
+        Bytes of temporary arrays of a batch of frames (about 40 per bead and
+        frame), by default CONTACT_MEMORY_BUDGET
+    device : str, optional
+        Torch device, by default 'cpu'
+
+    Returns
+    -------
+    (ndarray, ndarray, ndarray)
+        Time averaged mean distance of index distances 1..N-1, its standard
+        error over frames and the (N-1 x T) mean distance of every frame
+    """
+    sums = _batched_idx_dist_sums(com_arr, lambda sep: sep, memory_budget,
+                                  device)
+    return _idx_dist_stats(sums, com_arr.shape[0])
+
+
+def contact_vs_idx_dist_batch(com_arr, contact_thresh, method='dense',
+                              memory_budget=CONTACT_MEMORY_BUDGET,
+                              device='cpu'):
+    """Contact probability P(s) of beads as a function of their index
+    distance s for all frames.
+
+    Parameters
+    ----------
+    com_arr : NxDxT ndarray
+        Positions of beads
+    contact_thresh : float
+        Beads closer than this are in contact
+    method : str, optional
+        'dense' reduces all pairs of batches of frames at once, 'sparse' only
+        visits pairs closer than contact_thresh (KD-tree) which is faster for
+        long chains, by default 'dense'
+    memory_budget : int, optional
+        Bytes of temporary arrays of a batch of frames of the dense method
+        (about 40 per bead and frame), by default CONTACT_MEMORY_BUDGET
+    device : str, optional
+        Torch device of the dense method, by default 'cpu'
+
+    Returns
+    -------
+    (ndarray, ndarray, ndarray)
+        Time averaged contact probability of index distances 1..N-1, its
+        standard error over frames and the (N-1 x T) contact probability of
+        every frame
+    """
+    n_beads, _, n_steps = com_arr.shape
+    if method == 'dense':
+        sums = _batched_idx_dist_sums(
+            com_arr, lambda sep: (sep < contact_thresh).double(),
+            memory_budget, device)
+    elif method == 'sparse':
+        sums = np.zeros((n_beads, n_steps))
+        for k in range(n_steps):
+            inds_i, inds_j, sep = get_near_pairs(com_arr[:, :, k],
+                                                 contact_thresh)
+            # The KD-tree keeps pairs at the threshold, the dense method not
+            in_contact = sep < contact_thresh
+            sums[:, k] = np.bincount(inds_j[in_contact] - inds_i[in_contact],
+                                     minlength=n_beads)
+    else:
+        raise ValueError(
+            f"Unknown method \"{method}\". Options are 'dense' and 'sparse'.")
+    return _idx_dist_stats(sums, n_beads)
+
 
 # def dist_vs_idx_dist_time_avg(com_arr):
 #     sep_mat = np.linalg.norm(com_arr[:, np.newaxis, :] - com_arr[np.newaxis, :, :], axis=2)
@@ -97,74 +216,167 @@ def poly_autocorr(com_arr, device='cpu'):
 
 
 def poly_autocorr_fast(com_arr, device='cpu'):
+    """FFT version of poly_autocorr (see fft_autocorr)."""
     tcom_arr = torch.from_numpy(com_arr).to(device)
     pol_com = tcom_arr.mean(dim=0).to(device)
-    nsteps = tcom_arr.shape[-1]
-
-    # Compute the FFT and then (from that) the auto-correlation function
-    f = torch.fft.fftn(tcom_arr-pol_com, dim=[-1], norm='forward')
-    power_spec = torch.einsum('ijk,ijk->ik', f, torch.conj(f))
-    autocorr = torch.fft.ifftn(
-        power_spec, norm='forward', dim=[-1])[:, :nsteps].real
+    autocorr = fft_autocorr(tcom_arr-pol_com, device=device)
     return autocorr.mean(dim=0)
 
 
 def poly_dist_autocorr_fast(com_arr, device='cpu'):
     tcom_arr = torch.from_numpy(com_arr).to(device)
     pol_com = tcom_arr.mean(dim=0).to(device)
-    nsteps = tcom_arr.shape[-1]
     tcom_dist = torch.norm(tcom_arr-pol_com, dim=1)
-
-    # Compute the FFT and then (from that) the auto-correlation function
-    f = torch.fft.fftn(tcom_dist, dim=[-1], norm='forward')
-    power_spec = torch.einsum('ik,ik->ik', f, torch.conj(f))
-    autocorr = torch.fft.ifftn(
-        power_spec, norm='forward', dim=[-1])[:, :nsteps].real
+    autocorr = fft_autocorr(tcom_dist, device=device)
     return autocorr.mean(dim=0)
 
 
 def sep_autocorr(com_arr, device='cpu'):
-    tcom_arr = torch.from_numpy(com_arr).to(device)
-    tsep_mat = (tcom_arr[:, None, :, :] -
-                tcom_arr[None, :, :, :]).norm(dim=2).to(device)
-    n = tsep_mat.shape[0]
-    Ttot = tsep_mat.shape[-1]
-    tcorr_d = torch.zeros(tsep_mat.shape[-1], device=device)
-    avg_tsep_mat = tsep_mat.mean(dim=(0, 1)).to(device)
-    avg_sep = avg_tsep_mat.mean()
-    for i in range(1, tsep_mat.shape[-1]):
-        tcorr_d[i] = ((tsep_mat[:, :, i:] - avg_tsep_mat[i:]) * (tsep_mat[:,
-                                                                          :, :-i]-avg_tsep_mat[:-i])).sum()/(n*n*avg_sep*avg_sep*(Ttot-i))
-
-    return tcorr_d
+    """Autocorrelation of bead pair separations (all ordered pairs including
+    self pairs) relative to the pair average of every frame, normalized by
+    the squared mean separation. Computed by pair_sep_autocorr in tiles of
+    bead pairs. The value at lag 0 is left 0."""
+    n = com_arr.shape[0]
+    sep_stats = pair_sep_autocorr(com_arr, subtract_mean='frame',
+                                  device=device)
+    frame_mean = sep_stats['frame_mean']
+    avg_sep = frame_mean.mean()
+    # Distinct pairs count twice, self pairs have separation 0
+    corr_sum = (n * (n - 1) * sep_stats['pair_avg']
+                + n * fft_autocorr(frame_mean))
+    tcorr_d = torch.from_numpy(corr_sum / (n * n * avg_sep * avg_sep))
+    tcorr_d[0] = 0
+    return tcorr_d.to(device)
 
 
 def sep_autocorr_fast(com_arr, device='cpu'):
-    # Create necessary matrices for analysis
-    tcom_arr = torch.from_numpy(com_arr).to(device)
-    nsteps = tcom_arr.shape[-1]
-    tsep_mat = (tcom_arr[:, None, :, :] -
-                tcom_arr[None, :, :, :]).norm(dim=2).to(device)
+    """(N x N x T) autocorrelation of every bead pair separation (see
+    fft_autocorr), computed in tiles of bead pairs. Use pair_sep_autocorr
+    with an HDF5 group to keep the result out of memory."""
+    n = com_arr.shape[0]
+    autocorr = np.zeros((n, n, com_arr.shape[-1]))
+    pair_sep_autocorr(com_arr, pair_out=autocorr, device=device)
+    return torch.from_numpy(autocorr).to(device)
 
-    # Transform into frequency-space
-    f = torch.fft.fftn(tsep_mat, dim=[-1], norm='forward')
 
-    # Clean up large arrays to prevent running out of memory
-    del tcom_arr
-    del tsep_mat
-    torch.cuda.empty_cache() if device == 'cuda' else gc.collect()
+def get_pair_block_size(n_beads, n_steps, memory_budget=PAIR_MEMORY_BUDGET):
+    """!Side length of square tiles of bead pairs whose separation series and
+    transforms fit in a memory budget (about 16 doubles per pair and frame).
 
-    # Power spectrum is the product separation matrs Fourier transform
-    power_spec = torch.einsum('ijk,ijk->ijk', f, torch.conj(f))
+    @param n_beads Number of beads
+    @param n_steps Number of frames
+    @param memory_budget Bytes available for a tile
+    @return: Beads per tile side (at least 1)
 
-    # Transform back into time-space
-    autocorr = torch.fft.ifftn(
-        power_spec, norm='forward', dim=[-1])[:, :, :nsteps].real
+    """
+    block = int(np.sqrt(memory_budget / (16 * 8 * n_steps)))
+    return int(np.clip(block, 1, n_beads))
+
+
+def iter_pair_sep_tiles(tcom_arr, block):
+    """Yield bead ranges and (block x block x T) separations of every tile
+    of bead pairs with i block <= j block."""
+    n = tcom_arr.shape[0]
+    for i0 in range(0, n, block):
+        i1 = min(i0 + block, n)
+        for j0 in range(i0, n, block):
+            j1 = min(j0 + block, n)
+            yield (i0, i1), (j0, j1), (tcom_arr[i0:i1, None] -
+                                       tcom_arr[None, j0:j1]).norm(dim=2)
+
+
+def pair_sep_autocorr(com_arr, subtract_mean=None,
+                      memory_budget=PAIR_MEMORY_BUDGET, h5_obj=None,
+                      dset_name='pair_sep_autocorr', pair_out=None,
+                      device='cpu'):
+    """Autocorrelation of the separation of every bead pair, computed in
+    tiles of bead pairs so memory is bounded by memory_budget instead of
+    growing as N^2 T. Only reductions are kept in memory; per pair results
+    can be written to a chunked HDF5 dataset.
 
-    # Clean up power spectrum to prevent running out of memory
-    del power_spec
-    torch.cuda.empty_cache() if device == 'cuda' else gc.collect()
-    return autocorr
+    Parameters
+    ----------
+    com_arr : NxDxT ndarray
+        Positions of beads
+    subtract_mean : str, optional
+        None: raw separations, 'pair': subtract the time average of every
+        pair, 'frame': subtract the average over all (ordered, including
+        self) pairs of every frame, which needs an extra pass over the tiles.
+        By default None
+    memory_budget : int, optional
+        Bytes of a tile, by default PAIR_MEMORY_BUDGET
+    h5_obj : h5py.Group, optional
+        Group to write the (N x N x T) per pair autocorrelation to, by
+        default not written
+    dset_name : str, optional
+        Name of the per pair dataset, by default 'pair_sep_autocorr'
+    pair_out : ndarray, optional
+        (N x N x T) array to write per pair results to instead
+    device : str, optional
+        Torch device, by default 'cpu'
+
+    Returns
+    -------
+    dict
+        'pair_avg' (T,) average over distinct pairs, 'diag_avg' (N x T)
+        average over pairs of every index distance |i - j| (row 0 is nan) and
+        'frame_mean' (T,) pair averaged separation of every frame if
+        subtract_mean is 'frame'
+    """
+    n, _, n_steps = com_arr.shape
+    tcom_arr = torch.from_numpy(np.asarray(com_arr, dtype=np.float64)).to(device)
+    block = get_pair_block_size(n, n_steps, memory_budget)
+    sep_stats = {}
+
+    frame_mean = None
+    if subtract_mean == 'frame':
+        sep_sum = torch.zeros(n_steps, dtype=torch.float64, device=device)
+        for (i0, i1), (j0, j1), tsep in iter_pair_sep_tiles(tcom_arr, block):
+            # Tiles above the diagonal stand for their mirror image as well
+            sep_sum += tsep.sum(dim=(0, 1)) * (1 if i0 == j0 else 2)
+        frame_mean = sep_sum / (n * n)
+        sep_stats['frame_mean'] = frame_mean.cpu().numpy()
+    elif subtract_mean not in (None, 'pair'):
+        raise ValueError(f'Unknown subtract_mean "{subtract_mean}". '
+                         "Options are None, 'pair' and 'frame'.")
+
+    dset = None
+    if h5_obj is not None:
+        chunk_side = int(np.clip(np.sqrt(2**20 / (8 * n_steps)), 1, n))
+        dset = h5_obj.create_dataset(dset_name, shape=(n, n, n_steps),
+                                     dtype=np.float64,
+                                     chunks=(chunk_side, chunk_side, n_steps))
+        dset.attrs['subtract_mean'] = str(subtract_mean)
+
+    diag_sum = np.zeros((n, n_steps))
+    for (i0, i1), (j0, j1), tsep in iter_pair_sep_tiles(tcom_arr, block):
+        if frame_mean is not None:
+            tsep -= frame_mean
+        tile_corr = fft_autocorr(
+            tsep.reshape(-1, n_steps), subtract_mean=(subtract_mean == 'pair'),
+            chunk_size=tsep.shape[0] * tsep.shape[1],
+            device=device).cpu().numpy().reshape(i1 - i0, j1 - j0, n_steps)
+        del tsep
+        for out in (dset, pair_out):
+            if out is not None:
+                out[i0:i1, j0:j1] = tile_corr
+                if i0 != j0:
+                    out[j0:j1, i0:i1] = tile_corr.transpose(1, 0, 2)
+        # Reduce distinct pairs (i < j) by index distance
+        dist = (np.arange(j0, j1)[None, :] - np.arange(i0, i1)[:, None])
+        upper = dist > 0
+        dist_mat = csr_matrix((np.ones(upper.sum()),
+                               (dist[upper], np.nonzero(upper.ravel())[0])),
+                              shape=(n, dist.size))
+        diag_sum += dist_mat @ tile_corr.reshape(-1, n_steps)
+
+    # Number of distinct pairs of every index distance
+    n_dist = np.arange(n, 0, -1, dtype=float)
+    with np.errstate(invalid='ignore'):
+        sep_stats['diag_avg'] = diag_sum / np.where(
+            np.arange(n) == 0, np.nan, n_dist)[:, None]
+    sep_stats['pair_avg'] = diag_sum.sum(axis=0) / max(n * (n - 1) / 2, 1)
+    return sep_stats
 
 
 def power_spec(com_arr, dt, device='cpu'):
@@ -286,12 +498,16 @@ def real_poly_response_func(iresp_arr):
 
 
 def get_connect_smat(prot_arr, bead_num):
+    """Sparse matrix of crosslinks between beads. The last two columns of
+    prot_arr are the end bind IDs, so either full protein data of a frame or
+    only its bind IDs (read_protein_bind_ids) can be passed."""
     xlinks = (prot_arr[:, -1] >= 0)
     xlink_coords = prot_arr[xlinks][:, -2:].astype(int)
     data = np.ones((xlink_coords.shape[0]))
     return csr_matrix((data, (xlink_coords[:, 0], xlink_coords[:, 1])), shape=[bead_num, bead_num])
 
 def get_connect_torch_smat(prot_arr, bead_num, device='cpu'):
+    """Torch CSR version of get_connect_smat."""
     xlinks = (prot_arr[:, -1] >= 0)
     xlink_coords = prot_arr[xlinks][:, -2:].astype(int)
     data = np.ones((xlink_coords.shape[0]))
@@ -301,40 +517,206 @@ def get_connect_torch_smat(prot_arr, bead_num, device='cpu'):
     return tmp.to_sparse_csr()
 
 
+def get_connect_edges(prot_arr, bead_num):
+    """!Crosslinks of a frame as a compact edge list instead of a matrix.
+
+    @param prot_arr Protein data or bind IDs of a frame (see get_connect_smat)
+    @param bead_num Number of beads
+    @return: int64 flat index (end0 bead * bead_num + end1 bead) of the
+             matrix entry of every crosslink with both ends bound
+
+    """
+    bind_ids = np.asarray(prot_arr)[:, -2:].astype(np.int64)
+    bind_ids = bind_ids[(bind_ids >= 0).all(axis=1)]
+    return bind_ids[:, 0] * bead_num + bind_ids[:, 1]
+
+
+def collect_connect_edges(prot_arr_iter, bead_num):
+    """!Concatenate the edge lists of consecutive frames.
+
+    @param prot_arr_iter Iterable of protein data or bind IDs of every frame
+    @param bead_num Number of beads
+    @return: Flat matrix indices of the crosslinks of all frames and the
+             offsets such that frame k holds edges[offsets[k]:offsets[k+1]]
+
+    """
+    edge_list = [get_connect_edges(prot_arr, bead_num)
+                 for prot_arr in prot_arr_iter]
+    offsets = np.zeros(len(edge_list) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([edges.size for edges in edge_list])
+    edges = (np.concatenate(edge_list) if edge_list
+             else np.zeros(0, dtype=np.int64))
+    return edges, offsets
+
+
+def avg_connect_mat_from_edges(edges, offsets, bead_num):
+    """Average over frames of the crosslink matrices of get_connect_smat from
+    edge lists of collect_connect_edges, counted with one bincount."""
+    nframes = offsets.size - 1
+    counts = np.bincount(edges, minlength=bead_num * bead_num)
+    return counts.reshape(bead_num, bead_num) / nframes
+
+
+def connect_mats_to_edges(connect_mat_list):
+    """!Edge lists of a list of connection matrices (scipy sparse, torch
+    sparse or dense).
+
+    @param connect_mat_list Connection matrix of every frame
+    @return: Flat matrix indices and values of the nonzero entries of all
+             frames, frame offsets (see collect_connect_edges) and the number
+             of beads
+
+    """
+    edge_list, weight_list = [], []
+    for mat in connect_mat_list:
+        if isinstance(mat, torch.Tensor):
+            mat = (mat.to_sparse() if mat.layout == torch.strided
+                   else mat.to_sparse_coo()).coalesce()
+            rows, cols = mat.indices().cpu().numpy()
+            vals = mat.values().cpu().numpy()
+        else:
+            mat = coo_matrix(mat)
+            mat.sum_duplicates()
+            rows, cols, vals = mat.row, mat.col, mat.data
+        edge_list += [rows.astype(np.int64) * mat.shape[1] + cols]
+        weight_list += [vals.astype(np.float64)]
+    offsets = np.zeros(len(edge_list) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([edges.size for edges in edge_list])
+    return (np.concatenate(edge_list), np.concatenate(weight_list), offsets,
+            connect_mat_list[0].shape[0])
+
+
+def get_connect_key_chunk(n_keys, n_steps, memory_budget=CONNECT_MEMORY_BUDGET):
+    """!Number of connection matrix entries whose time series and transforms
+    fit in a memory budget. Every entry holds its series of n_steps doubles
+    and about 4 doubles per frame of the zero padded FFT length (spectrum,
+    power spectrum and inverse transform).
+
+    @param n_keys Number of matrix entries
+    @param n_steps Number of frames
+    @param memory_budget Bytes available for a chunk of entries
+    @return: Entries per chunk (at least 1)
+
+    """
+    nfft = next_fast_len(2 * n_steps - 1, real=True)
+    key_bytes = (n_steps + 4 * nfft) * 8
+    return int(np.clip(memory_budget // key_bytes, 1, max(n_keys, 1)))
+
+
+def connect_edge_autocorr(edges, offsets, group_func, n_groups, weights=None,
+                          memory_budget=CONNECT_MEMORY_BUDGET):
+    """Autocorrelation of connection matrices summed over groups of matrix
+    entries, sum_t sum_(i,j in group) M_t[i,j] M_(t+tau)[i,j] / (T - tau).
+
+    Every matrix entry occupied in any frame becomes a time series whose
+    autocorrelation is computed with a zero padded FFT (Wiener-Khinchin), so
+    the cost is O(entries * T log T) instead of O(T^2) matrix products.
+    Entries are processed in chunks that fit in memory_budget.
+
+    Parameters
+    ----------
+    edges : ndarray of int
+        Flat matrix index of every connection of all frames
+    offsets : ndarray of int
+        Frame k holds edges[offsets[k]:offsets[k+1]]
+    group_func : callable
+        Maps flat matrix indices to (group index, weight) arrays. Entries
+        with a negative group index are left out.
+    n_groups : int
+        Number of groups
+    weights : ndarray, optional
+        Value of every connection, by default 1
+    memory_budget : int, optional
+        Bytes of the series and transforms of a chunk of matrix entries (see
+        get_connect_key_chunk), by default CONNECT_MEMORY_BUDGET
+
+    Returns
+    -------
+    ndarray
+        (T x n_groups) autocorrelation
+    """
+    n_steps = offsets.size - 1
+    nfft = next_fast_len(2 * n_steps - 1, real=True)
+    autocorr_arr = np.zeros((n_steps, n_groups))
+    keys, key_inds = np.unique(edges, return_inverse=True)
+    key_inds = key_inds.reshape(-1)
+    frame_inds = np.repeat(np.arange(n_steps), np.diff(offsets))
+    if weights is None:
+        weights = np.ones(edges.size)
+    # Connections sorted by matrix entry so every chunk is a contiguous range
+    order = np.argsort(key_inds, kind='stable')
+    key_chunk = get_connect_key_chunk(keys.size, n_steps, memory_budget)
+    chunk_starts = np.arange(0, keys.size, key_chunk)
+    bounds = np.searchsorted(key_inds[order],
+                             np.append(chunk_starts, keys.size))
+    for c, k0 in enumerate(chunk_starts):
+        k1 = min(k0 + key_chunk, keys.size)
+        sel = order[bounds[c]:bounds[c + 1]]
+        series = np.bincount((key_inds[sel] - k0) * n_steps + frame_inds[sel],
+                             weights=weights[sel],
+                             minlength=(k1 - k0) * n_steps
+                             ).reshape(k1 - k0, n_steps)
+        spec = rfft(series, n=nfft, axis=1)
+        key_autocorr = irfft(spec.real**2 + spec.imag**2, n=nfft,
+                             axis=1)[:, :n_steps]
+        group_inds, group_weights = group_func(keys[k0:k1])
+        in_group = group_inds >= 0
+        group_mat = csr_matrix(
+            (group_weights[in_group],
+             (group_inds[in_group], np.nonzero(in_group)[0])),
+            shape=(n_groups, k1 - k0))
+        autocorr_arr += (group_mat @ key_autocorr).T
+    return autocorr_arr / (n_steps - np.arange(n_steps))[:, np.newaxis]
+
+
+def connect_diag_autocorr_fft(edges, offsets, bead_num, weights=None,
+                              memory_budget=CONNECT_MEMORY_BUDGET):
+    """!Autocorrelation of connections per genomic distance |i - j| from
+    edge lists. Matches connect_diag_autocorr, including its double count of
+    the main diagonal (d = 0).
+
+    @param edges Flat matrix indices of collect_connect_edges
+    @param offsets Frame offsets of collect_connect_edges
+    @param bead_num Number of beads
+    @param weights Value of every connection, by default 1
+    @param memory_budget Bytes of a chunk of matrix entries
+    @return: (T x bead_num) autocorrelation
+
+    """
+    def diag_groups(keys):
+        dist = np.abs(keys // bead_num - keys % bead_num)
+        return dist, np.where(dist == 0, 2., 1.)
+    return connect_edge_autocorr(edges, offsets, diag_groups, bead_num,
+                                 weights, memory_budget)
+
+
 def connect_autocorr(connect_mat_list):
-    n = len(connect_mat_list)
-    autocorr_arr = np.zeros(n)
-    for i in range(n):
-        for j in range(n-i):
-            autocorr_arr[i] += connect_mat_list[j].multiply(
-                connect_mat_list[j+i]).sum()
-        autocorr_arr[i] /= float(n-i)
-    return autocorr_arr
+    """Autocorrelation of all connections, computed by connect_edge_autocorr."""
+    edges, weights, offsets, _ = connect_mats_to_edges(connect_mat_list)
+    return connect_edge_autocorr(
+        edges, offsets, lambda keys: (np.zeros(keys.size, dtype=int),
+                                      np.ones(keys.size)),
+        1, weights)[:, 0]
+
 
 def connect_section_autocorr(connect_mat_list, range_list):
-    n = len(connect_mat_list)
-    autocorr_arr = np.zeros(n)
-    for i in range(n):
-        for j in range(n-i):
-            connect_comb = connect_mat_list[j].multiply(
-                connect_mat_list[j+i]).to_dense()
-            for k in range(range_list[0], range_list[1]):
-                autocorr_arr[i] += connect_comb.diagonal(k).sum()
-        autocorr_arr[i] /= float(n-i)
-    return autocorr_arr
+    """Autocorrelation of connections on the diagonals j - i in
+    [range_list[0], range_list[1]), computed by connect_edge_autocorr."""
+    edges, weights, offsets, bead_num = connect_mats_to_edges(
+        connect_mat_list)
 
-def connect_diag_autocorr(connect_mat_list):
-    n_steps = len(connect_mat_list) 
-    n_beads =  connect_mat_list[0].shape[0] 
-    autocorr_arr = np.zeros((n_steps, n_beads))
-    for tau in range(n_steps):
-        for t in range(n_steps-tau):
-            connect_comb = connect_mat_list[t].multiply(
-                connect_mat_list[t+tau]).to_dense()
-            for d in range(n_beads):
-                autocorr_arr[tau, d] += connect_comb.diagonal(d).sum()
-                autocorr_arr[tau, d] += connect_comb.diagonal(-d).sum()
-        autocorr_arr[tau] /= float(n_steps-tau)
-    return autocorr_arr
+    def section_groups(keys):
+        diag = keys % bead_num - keys // bead_num
+        in_range = (diag >= range_list[0]) & (diag < range_list[1])
+        return np.where(in_range, 0, -1), np.ones(keys.size)
+    return connect_edge_autocorr(edges, offsets, section_groups, 1,
+                                 weights)[:, 0]
 
 
+def connect_diag_autocorr(connect_mat_list):
+    """Autocorrelation of connections per genomic distance of a list of
+    connection matrices (see connect_diag_autocorr_fft). The main diagonal
+    is counted twice."""
+    edges, weights, offsets, bead_num = connect_mats_to_edges(
+        connect_mat_list)
+    return connect_diag_autocorr_fft(edges, offsets, bead_num, weights)
@@ -24,6 +24,7 @@ from ..read_func import (read_dat_sylinder,
                          get_file_number,
                          get_png_number,
                          count_fils)
+from ..frame_manifest import get_frame_files
 
 
 SQRT2 = np.sqrt(2)
@@ -126,8 +127,8 @@ def hic_animation(opts):
         opts.params['time_step'] = run_params['timeSnap']
 
     result_dir = opts.result_dir
-    fil_dat_paths = sorted(result_dir.glob("**/SylinderAscii*.dat"),
-                           key=get_file_number)[::opts.params['n_graph']]
+    fil_dat_paths = get_frame_files(
+        result_dir, 'SylinderAscii')[::opts.params['n_graph']]
     png_paths = sorted(result_dir.glob("PNG/*.png"),
                        key=get_png_number)[::opts.params['n_graph']]
 
@@ -219,8 +220,8 @@ def hic_only_animation(opts):
         opts.params['time_step'] = run_params['timeSnap']
 
     result_dir = opts.result_dir
-    fil_dat_paths = sorted(result_dir.glob("**/SylinderAscii*.dat"),
-                           key=get_file_number)[::opts.params['n_graph']]
+    fil_dat_paths = get_frame_files(
+        result_dir, 'SylinderAscii')[::opts.params['n_graph']]
 
     # print(png_paths)
     init_mutable = [True]
@@ -24,6 +24,7 @@ from sklearn.cluster import OPTICS  # , MeanShift, estimate_bandwidth, DBSCAN
 # import scipy.stats as stats
 # from scipy.signal import savgol_filter
 from alens_analysis.helpers import gen_id
+from alens_analysis.trajectory import as_trajectory
 
 
 class Cluster:
@@ -324,12 +325,13 @@ def identify_spatial_clusters(
 
 
 def collect_cluster_data(
-    run_path, ss_ind=1, end_ind=None, start_bead=0, end_bead=None, **kwargs
+    run_path, ss_ind=1, end_ind=None, start_bead=0, end_bead=None, traj=None, **kwargs
 ):
     # Get bead position information
-    with h5py.File(next(run_path.glob("analysis/raw*.h5")), "r") as h5_data:
-        sy_dat = h5_data["raw_data/sylinders"][start_bead:end_bead, :, ss_ind:end_ind]
-        com_arr = 0.5 * (sy_dat[:, 2:5, :] + sy_dat[:, 5:8, :])
+    if traj is None:
+        traj = next(run_path.glob("analysis/raw*.h5"))
+    with as_trajectory(traj, (ss_ind, end_ind), (start_bead, end_bead)) as traj_win:
+        com_arr = traj_win.com
 
     # Get cluster information
     h5_clust_file = next(run_path.glob("analysis/cluster*.h5"))
@@ -394,6 +396,7 @@ def create_cluster_hdf5(
     start_bead=0,
     end_bead=None,
     force=True,
+    traj=None,
     **kwargs,
 ):
     # Create path for cluster data file
@@ -408,11 +411,14 @@ def create_cluster_hdf5(
 
     # Load analysis data to get particle positions for cluster algorithms
     id_gen = gen_id()
-    with h5py.File(anal_file_path, "r+") as h5_data:
-        time_arr = h5_data["time"][ss_ind:end_ind]
+    with as_trajectory(
+        anal_file_path if traj is None else traj,
+        (ss_ind, end_ind),
+        (start_bead, end_bead),
+    ) as traj_win:
+        time_arr = traj_win.time
         print(time_arr.shape)
-        sy_dat = h5_data["raw_data/sylinders"][start_bead:end_bead, :, ss_ind:end_ind]
-        com_arr = 0.5 * (sy_dat[:, 2:5, :] + sy_dat[:, 5:8, :])
+        com_arr = traj_win.com
 
     # Write cluster and write out data
     with h5py.File(clust_path, "w") as h5_clust:
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: con_block_data.py
+Description: Ragged storage of the per-constraint data of ConBlock_*.pvtp
+files in raw_data.h5. Constraints of all frames are concatenated into flat
+datasets indexed by frame offsets.
+"""
+
+import numpy as np
+
+from .frame_manifest import get_frame_files
+from .read_func import (read_con_block_arrays, iter_pool_map, get_file_number,
+                        get_pvtp_nbytes)
+
+CON_BLOCKS_GRP = 'con_blocks'
+# Arrays of ConBlock files stored by default. Point arrays (one value per
+# constraint end) are stored as (constraints x 2 [x components]).
+CON_BLOCK_ARRAYS = ('gid', 'posIJ', 'normIJ', 'Stress', 'bilateral', 'gamma')
+# Number of buffered constraints that triggers a write to the file
+CON_BUFFER_SIZE = 1 << 18
+CON_CHUNK_SIZE = 1 << 14
+
+
+def read_con_block_frame(fpath, arrays=CON_BLOCK_ARRAYS):
+    """!Read the selected arrays of one ConBlock file for ragged storage.
+
+    @param fpath ConBlock_*.pvtp file path
+    @param arrays Names of cell or point arrays to read
+    @return: Dictionary of per-constraint arrays including 'ends'
+             (constraints x 2 x 3) and the number of bytes read from the
+             pvtp file and its pieces
+
+    """
+    con_arrays = read_con_block_arrays(fpath, cell_arrays=arrays,
+                                       point_arrays=arrays)
+    frame = {'ends': np.stack([con_arrays['end0'], con_arrays['end1']],
+                              axis=1)}
+    for name in arrays:
+        if name in con_arrays:
+            frame[name] = con_arrays[name]
+        elif name + '0' in con_arrays:
+            frame[name] = np.stack([con_arrays[name + '0'],
+                                    con_arrays[name + '1']], axis=1)
+        else:
+            raise KeyError(f'ConBlock file {fpath} has no array "{name}".')
+    return frame, get_pvtp_nbytes(fpath)
+
+
+class ConBlockWriter():
+
+    """Append frames of per-constraint arrays to the ragged datasets of a
+    con_blocks group, writing buffered constraints of many frames at once."""
+
+    def __init__(self, grp):
+        self.grp = grp
+        self.names = [name for name in grp if name not in
+                      ('frame_offsets', 'frame_number')]
+        self.n_cons = int(grp['frame_offsets'][-1])
+        self.buf = {name: [] for name in self.names}
+        self.nbuf = 0
+        self.offsets = []
+        self.frame_nums = []
+
+    @classmethod
+    def create(cls, h5_data, first_frame):
+        """!Create the con_blocks group with datasets shaped like the arrays
+        of a first frame.
+
+        @param h5_data Raw data file opened for writing
+        @param first_frame Dictionary of per-constraint arrays of a frame
+        @return: ConBlockWriter of the new group
+
+        """
+        grp = h5_data.create_group(CON_BLOCKS_GRP)
+        for name, arr in first_frame.items():
+            grp.create_dataset(name, shape=(0,) + arr.shape[1:],
+                               dtype=arr.dtype,
+                               maxshape=(None,) + arr.shape[1:],
+                               chunks=(CON_CHUNK_SIZE,) + arr.shape[1:])
+        grp.create_dataset('frame_offsets', data=[0], dtype=np.int64,
+                           maxshape=(None,), chunks=(4096,))
+        grp.create_dataset('frame_number', shape=(0,), dtype=np.int64,
+                           maxshape=(None,), chunks=(4096,))
+        return cls(grp)
+
+    def write(self, frame, frame_num):
+        """Add the per-constraint arrays of the next frame."""
+        for name in self.names:
+            self.buf[name] += [frame[name]]
+        self.nbuf += frame['ends'].shape[0]
+        self.offsets += [self.n_cons + self.nbuf]
+        self.frame_nums += [frame_num]
+        if self.nbuf >= CON_BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Write buffered frames to the file."""
+        if self.nbuf:
+            for name in self.names:
+                dset = self.grp[name]
+                dset.resize(self.n_cons + self.nbuf, axis=0)
+                dset[self.n_cons:] = np.concatenate(self.buf[name])
+                self.buf[name] = []
+            self.n_cons += self.nbuf
+            self.nbuf = 0
+        for name, new in (('frame_offsets', self.offsets),
+                          ('frame_number', self.frame_nums)):
+            if new:
+                dset = self.grp[name]
+                n_old = dset.shape[0]
+                dset.resize(n_old + len(new), axis=0)
+                dset[n_old:] = new
+        self.offsets = []
+        self.frame_nums = []
+
+
+class ConBlockData():
+
+    """Read access to the ragged constraint data of a raw data file. Reading
+    a frame only touches the constraints of that frame."""
+
+    def __init__(self, h5_data):
+        self.grp = h5_data[CON_BLOCKS_GRP]
+        self.offsets = self.grp['frame_offsets'][...]
+        self.frame_number = self.grp['frame_number'][...]
+        self.names = [name for name in self.grp if name not in
+                      ('frame_offsets', 'frame_number')]
+
+    def __len__(self):
+        return self.offsets.size - 1
+
+    def frame(self, k, arrays=None):
+        """!Read the constraints of a single frame.
+
+        @param k Frame index
+        @param arrays Names of arrays to read, by default all
+        @return: Dictionary of per-constraint arrays
+
+        """
+        k = range(len(self))[k]
+        cons = slice(self.offsets[k], self.offsets[k + 1])
+        return {name: self.grp[name][cons]
+                for name in (self.names if arrays is None else arrays)}
+
+    def frames(self, start=0, end=None, arrays=None):
+        """!Read the constraints of a range of frames in one read per array.
+
+        @param start First frame
+        @param end Frame after the last one
+        @param arrays Names of arrays to read, by default all
+        @return: Dictionary of concatenated per-constraint arrays and the
+                 offsets of every frame relative to the first constraint
+
+        """
+        start, end = slice(start, end).indices(len(self))[:2]
+        end = max(start, end)
+        cons = slice(self.offsets[start], self.offsets[end])
+        offsets = self.offsets[start:end + 1] - self.offsets[start]
+        return ({name: self.grp[name][cons]
+                 for name in (self.names if arrays is None else arrays)},
+                offsets)
+
+
+def collect_con_blocks_to_hdf(h5_data, result_dir, arrays=CON_BLOCK_ARRAYS,
+                              workers=1, frame_window=None):
+    """Store the constraint arrays of ConBlock files in the con_blocks group
+    of a raw data file. If the group exists, only frames after the last
+    stored one are added.
+
+    Parameters
+    ----------
+    h5_data : h5py.File
+        Raw data file opened for writing
+    result_dir : Path object
+        Result directory of the simulation
+    arrays : sequence of str, optional
+        Cell or point arrays to store, by default CON_BLOCK_ARRAYS. Ignored
+        when appending to an existing group.
+    workers : int, optional
+        Number of processes parsing ConBlock files, by default 1
+    frame_window : int, optional
+        Maximum number of parsed frames waiting to be written, by default
+        4 * workers
+
+    Returns
+    -------
+    (int, list)
+        Number of added frames and bytes read from the files of every frame
+    """
+    con_paths = get_frame_files(result_dir, 'ConBlock', 'pvtp')
+    writer = None
+    if CON_BLOCKS_GRP in h5_data:
+        writer = ConBlockWriter(h5_data[CON_BLOCKS_GRP])
+        arrays = [name for name in writer.names if name != 'ends']
+        frame_nums = h5_data[CON_BLOCKS_GRP]['frame_number']
+        if frame_nums.size:
+            con_paths = [fp for fp in con_paths
+                         if get_file_number(fp) > frame_nums[-1]]
+
+    frame_nbytes = []
+    try:
+        for fp, (frame, nbytes) in zip(con_paths, iter_pool_map(
+                read_con_block_frame, ((fp, tuple(arrays)) for fp in con_paths),
+                workers, frame_window)):
+            if writer is None:
+                writer = ConBlockWriter.create(h5_data, frame)
+            writer.write(frame, get_file_number(fp))
+            frame_nbytes += [nbytes]
+    finally:
+        if writer is not None:
+            writer.flush()
+    return len(frame_nbytes), frame_nbytes
+
+
+def sum_con_stress(con_data, start=0, end=None):
+    """!Sum the stress of bilateral and collision constraints of every frame
+    from ragged constraint data instead of ConBlock files.
+
+    @param con_data ConBlockData of a raw data file
+    @param start First frame
+    @param end Frame after the last one
+    @return: Bilateral and collision (3 x 3 x frames) stress
+
+    """
+    cons, offsets = con_data.frames(start, end, ('Stress', 'bilateral'))
+    stress = cons['Stress'].reshape(-1, 9)
+    bilat_flag = cons['bilateral'].reshape(-1)
+    nframes = offsets.size - 1
+    frame_inds = np.repeat(np.arange(nframes), np.diff(offsets))
+    sums = []
+    for mask in (bilat_flag == 1, bilat_flag == 0):
+        sums += [np.stack([np.bincount(frame_inds[mask],
+                                       weights=stress[mask, i],
+                                       minlength=nframes)
+                           for i in range(9)]).reshape(3, 3, nframes)]
+    return sums[0], sums[1]
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented.")
@@ -12,16 +12,23 @@ import time
 import shutil
 
 from datetime import datetime
+from functools import partial
 from .chromatin.chrom_graph_funcs import (make_all_condensate_graphs)
 from .chromatin.chrom_seed_scan_graph_funcs import (
     make_all_seed_scan_condensate_graphs)
-from .read_func import convert_dat_to_hdf, collect_stress_from_con_pvtp
+from .read_func import (convert_dat_to_hdf, append_dat_to_hdf,
+                        collect_stress_from_con_pvtp, print_read_stats)
+from .con_block_data import collect_con_blocks_to_hdf
 from .chromatin.hic_animation import hic_animation, hic_only_animation
 from .min_animation import min_animation
 from .result_to_pvd import make_pvd_files
 from .runlog_funcs import get_walltime
 from .cluster_analysis import create_cluster_hdf5
-from .chromatin.chrom_analysis import create_connect_hdf5, create_contact_hdf5
+from .chromatin.chrom_analysis import (create_connect_hdf5, create_contact_hdf5,
+                                      update_contact_hdf5)
+from .chromatin.contact_engine import (CONTACT_CUTOFF_SIGMAS,
+                                       CONTACT_MEMORY_BUDGET)
+from .follow_funcs import follow_dat_to_hdf
 
 MOVIE_DICT = {
     'hic': hic_animation,
@@ -30,6 +37,28 @@ MOVIE_DICT = {
 }
 
 
+def collect_con_blocks(h5_raw_path, opts):
+    """!Store (new) ConBlock constraints in the raw data file
+
+    @param h5_raw_path Path to raw data file
+    @param opts Parsed command line options
+    @return: void
+
+    """
+    result_dir = opts.path / 'result'
+    if not result_dir.exists():
+        print(f"No result directory in {opts.path}, not storing ConBlock data.")
+        return
+    t0 = time.time()
+    with h5py.File(h5_raw_path, 'a') as h5_data:
+        n_con, con_nbytes = collect_con_blocks_to_hdf(
+            h5_data, result_dir, workers=opts.workers,
+            frame_window=opts.frame_window)
+    t1 = time.time()
+    print(f"Stored constraints of {n_con} ConBlock frames in {t1 - t0} seconds.")
+    print_read_stats(con_nbytes, t1 - t0)
+
+
 def make_seed_graphs(opts):
     """TODO: Docstring for make_graphs.
 
@@ -89,17 +118,50 @@ def seed_analysis(opts):
             f"Too many raw files. Please look in {str(opts.analysis_dir.resolve())} and choose one.")
         return
 
+    # Contact engine options shared by -A contact and --follow_contact
+    contact_kwargs = {
+        'engine': getattr(opts, 'contact_engine', 'dense'),
+        'cutoff_sigmas': getattr(opts, 'contact_cutoff', CONTACT_CUTOFF_SIGMAS),
+        'memory_budget': int(getattr(opts, 'contact_memory',
+                                     CONTACT_MEMORY_BUDGET / 2**20) * 2**20),
+        'float_dtype': getattr(opts, 'contact_dtype', 'f8')}
+
     if getattr(opts, 'analysis', None) == 'collect':
         t0 = time.time()
         print(f'raw_data')
-        convert_dat_to_hdf(h5_raw_path, opts.path)
+        layout_kwargs = {'compression': opts.compression,
+                         'compression_opts': opts.compression_opts,
+                         'shuffle': opts.shuffle,
+                         'float_dtype': opts.float_dtype,
+                         'split_proteins': opts.split_proteins,
+                         'bind_events': opts.bind_events}
+        if opts.layout is not None:
+            layout_kwargs['layout'] = opts.layout
+        if opts.follow:
+            on_new_frames = (partial(update_contact_hdf5, **contact_kwargs)
+                             if opts.follow_contact else None)
+            follow_dat_to_hdf(h5_raw_path, opts.path,
+                              poll_interval=opts.poll_interval,
+                              max_idle=opts.max_idle, workers=opts.workers,
+                              frame_window=opts.frame_window,
+                              on_new_frames=on_new_frames, **layout_kwargs)
+        elif opts.append:
+            append_dat_to_hdf(h5_raw_path, opts.path, workers=opts.workers,
+                              frame_window=opts.frame_window, **layout_kwargs)
+        else:
+            convert_dat_to_hdf(h5_raw_path, opts.path, workers=opts.workers,
+                               frame_window=opts.frame_window, **layout_kwargs)
+        if opts.con_blocks:
+            collect_con_blocks(h5_raw_path, opts)
         print(f" HDF5 raw created in {time.time() - t0}")
 
     if getattr(opts, 'analysis', None) == 'stress':
         h5_stress_path = opts.analysis_dir / f'stress_data.h5'
         t0 = time.time()
         print(f'stress_{opts.path.stem}')
-        collect_stress_from_con_pvtp(h5_stress_path, opts.path)
+        collect_stress_from_con_pvtp(h5_stress_path, opts.path,
+                                     workers=opts.workers,
+                                     frame_window=opts.frame_window)
         print(f" HDF5 stress created in {time.time() - t0}")
 
     if getattr(opts, 'analysis', None) == 'cluster':
@@ -123,7 +185,7 @@ def seed_analysis(opts):
     if getattr(opts, 'analysis', None) == 'contact':
         t0 = time.time()
         create_contact_hdf5(h5_raw_path, force=opts.force,
-                            verbose=opts.verbose)
+                            verbose=opts.verbose, **contact_kwargs)
         print(f" HDF5 contact file created in {time.time() - t0}")
 
     if getattr(opts, 'movie', None):
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: follow_funcs.py
+Description: Follow a running aLENS simulation and append newly completed
+frames to its raw data file.
+"""
+
+import os
+import re
+import time
+from pathlib import Path
+
+import h5py
+
+from .read_func import append_dat_to_hdf
+
+RESULT_DIR_REG = re.compile(r'^result(\d+)-(\d+)$')
+FRAME_FILE_REG = re.compile(r'^(SylinderAscii|ProteinAscii)_(\d+)\.dat$')
+
+
+class ResultDirWatcher():
+
+    """Find newly completed SylinderAscii/ProteinAscii pairs in the
+    result/result*-*/ directories of a running simulation.
+
+    Only directories that can hold frames after `last_frame` are listed. After
+    that, a poll lists the result directory and a subdirectory only when its
+    mtime changed, so the cost of a poll scales with the number of new files
+    instead of the total number of output files.
+
+    A frame is complete when both of its files exist and either a later
+    sylinder frame has been written or neither file changed size since the
+    previous poll.
+    """
+
+    def __init__(self, result_dir, last_frame=-1):
+        self.result_dir = Path(result_dir)
+        self.last_frame = last_frame
+        self.dir_mtimes = {}
+        # Frame number -> {'SylinderAscii': (path, size), ...}
+        self.pending = {}
+        self.prev_sizes = {}
+        self.result_mtime = None
+
+    def _scan_result_dir(self):
+        """Add result subdirectories that may hold frames after last_frame."""
+        mtime = self.result_dir.stat().st_mtime_ns
+        if mtime == self.result_mtime:
+            return
+        self.result_mtime = mtime
+        with os.scandir(self.result_dir) as entries:
+            for entry in entries:
+                if not entry.is_dir() or entry.name in self.dir_mtimes:
+                    continue
+                match = RESULT_DIR_REG.match(entry.name)
+                if match and int(match.group(2)) <= self.last_frame:
+                    continue
+                self.dir_mtimes[entry.name] = None
+
+    def _scan_frame_dir(self, dir_name):
+        """List a result subdirectory if it changed since the last poll."""
+        dir_path = self.result_dir / dir_name
+        mtime = dir_path.stat().st_mtime_ns
+        if mtime == self.dir_mtimes[dir_name]:
+            return
+        self.dir_mtimes[dir_name] = mtime
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                match = FRAME_FILE_REG.match(entry.name)
+                if match is None or int(match.group(2)) <= self.last_frame:
+                    continue
+                self.pending.setdefault(int(match.group(2)), {})[
+                    match.group(1)] = Path(entry.path)
+
+    def poll(self):
+        """Get the frames completed since the last poll.
+
+        @return: Lists of sylinder paths, protein paths and frame numbers
+                 sorted by frame number
+
+        """
+        self._scan_result_dir()
+        for dir_name in list(self.dir_mtimes):
+            self._scan_frame_dir(dir_name)
+
+        syl_nums = [num for num, files in self.pending.items()
+                    if 'SylinderAscii' in files]
+        newest_syl = max(syl_nums, default=-1)
+        sizes = {}
+        complete = []
+        for num in sorted(self.pending):
+            files = self.pending[num]
+            if len(files) < 2:
+                break
+            sizes[num] = tuple(files[key].stat().st_size
+                               for key in ('SylinderAscii', 'ProteinAscii'))
+            if not (num < newest_syl
+                    or (0 not in sizes[num]
+                        and sizes[num] == self.prev_sizes.get(num))):
+                break
+            complete += [num]
+        self.prev_sizes = sizes
+
+        syl_paths, xlp_paths = [], []
+        for num in complete:
+            files = self.pending.pop(num)
+            syl_paths += [files['SylinderAscii']]
+            xlp_paths += [files['ProteinAscii']]
+        if complete:
+            self.last_frame = complete[-1]
+        return syl_paths, xlp_paths, complete
+
+
+def follow_dat_to_hdf(fname="raw_data.h5", path=Path('.'), poll_interval=30.,
+                      max_idle=None, workers=1, frame_window=None,
+                      on_new_frames=None, **layout_kwargs):
+    """Collect all frames written so far and keep appending frames as a
+    running simulation completes them. Frames already on disk go through the
+    same completeness check as later ones (see ResultDirWatcher), so a frame
+    the simulation is still writing is never collected.
+
+    Parameters
+    ----------
+    fname : str, optional
+        Name of the raw data file, by default "raw_data.h5"
+    path : Path object, optional
+        The seed directory of the simulation, by default Path('.')
+    poll_interval : float, optional
+        Seconds between polls of the result directory, by default 30
+    max_idle : float, optional
+        Stop after this many seconds without new frames, by default None
+        (follow until interrupted)
+    workers : int, optional
+        Number of processes parsing frames, by default 1
+    frame_window : int, optional
+        Maximum number of parsed frames waiting to be written, by default
+        4 * workers
+    on_new_frames : callable, optional
+        Called with the raw data file name after every batch of appended
+        frames, e.g. to update contact analysis, by default None
+    **layout_kwargs
+        Layout options used when the raw data file is created (see
+        append_dat_to_hdf)
+
+    Returns
+    -------
+    int
+        Number of frames in the raw data file
+
+    Raises
+    ------
+    OSError
+        If the simulation has no result directory.
+    """
+    result_dir = path / 'result'
+    if not result_dir.exists():
+        raise OSError(f'Can only follow result directories, not found in {path}.')
+
+    last_frame = -1
+    if Path(fname).exists():
+        with h5py.File(fname, 'r') as h5_data:
+            # Files without frame numbers are caught up from the first frame
+            # and get them in append_dat_to_hdf
+            if 'frame_number' in h5_data and h5_data['frame_number'].size:
+                last_frame = h5_data['frame_number'][-1]
+
+    watcher = ResultDirWatcher(result_dir, last_frame)
+    last_new = time.time()
+    try:
+        while True:
+            syl_paths, xlp_paths, frame_nums = watcher.poll()
+            if frame_nums:
+                # Creates the file with the first complete frames and checks
+                # the RunConfig of an existing one
+                append_dat_to_hdf(fname, path, workers, frame_window,
+                                  frame_paths=(syl_paths, xlp_paths),
+                                  **layout_kwargs)
+                print(f"Collected frames {frame_nums[0]}-{frame_nums[-1]} "
+                      f"into {fname}.")
+                if on_new_frames is not None:
+                    on_new_frames(fname)
+                last_new = time.time()
+            elif max_idle is not None and time.time() - last_new > max_idle:
+                print(f"No new frames for {max_idle} seconds. Stopping.")
+                break
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("Stopped following.")
+
+    if not Path(fname).exists():
+        return 0
+    with h5py.File(fname, 'r') as h5_data:
+        return h5_data['time'].size
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented.")
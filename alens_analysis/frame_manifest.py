@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: frame_manifest.py
+Description: Cached listing of the frame files in the result directory of a
+simulation, stored in analysis/frame_manifest.json.
+"""
+
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+MANIFEST_NAME = 'frame_manifest.json'
+MANIFEST_VERSION = 2
+# Coarsest directory mtime resolution expected (FAT has 2 s). Entries added in
+# the same mtime tick as a listing do not change the mtime, so listings made
+# within this time of the mtime are checked by their number of entries.
+MTIME_RESOLUTION_NS = 2 * 10**9
+
+# <Prefix>_<frame number>.<ext>, e.g. SylinderAscii_100.dat
+FRAME_FILE_REG = re.compile(r'^([A-Za-z]+)_(\d+)\.(\w+)$')
+# Glob patterns that get_frame_files can answer, e.g.
+# './result*-*/Sylinder_*.pvtp', '**/SylinderAscii*.dat' or, from the seed
+# directory, 'result/result*/SylinderAscii_*.dat'
+FRAME_GLOB_REG = re.compile(
+    r'^(\./)?((?:[^*/]+/)*)(?:result\*(?:-\*)?|\*\*)/([A-Za-z]+)_?\*\.(\w+)$')
+
+
+def count_dir_entries(dir_path):
+    """!Number of entries of a directory without a stat of each entry."""
+    with os.scandir(dir_path) as entries:
+        return sum(1 for _ in entries)
+
+
+def scan_frame_dir(dir_path):
+    """!List the frame files of a single result subdirectory.
+
+    @param dir_path Path to result subdirectory
+    @return: Dictionary of '<Prefix>.<ext>' to lists of
+             [frame number, file name, size, mtime_ns] and the number of
+             entries of the directory
+
+    """
+    files = {}
+    count = 0
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            count += 1
+            match = FRAME_FILE_REG.match(entry.name)
+            if match is None or not entry.is_file():
+                continue
+            stat = entry.stat()
+            files.setdefault(f'{match.group(1)}.{match.group(3)}', []).append(
+                [int(match.group(2)), entry.name, stat.st_size,
+                 stat.st_mtime_ns])
+    return files, count
+
+
+class FrameManifest():
+
+    """Frame number, path, size and mtime of every frame file in the
+    subdirectories of a result directory.
+
+    The manifest is validated with one stat per directory. Only directories
+    whose mtime changed since the manifest was written are listed again, so
+    discovering frames of a finished run does not list any files. A directory
+    listed within MTIME_RESOLUTION_NS of its mtime may have gained entries
+    without a new mtime, so its entries are counted until a check is made
+    after that time. Sizes and mtimes are those of the last listing of a
+    directory.
+    """
+
+    def __init__(self, result_dir, manifest_path=None):
+        self.result_dir = Path(result_dir)
+        if manifest_path is None:
+            # Resolve first so a result_dir of '.' still maps to the seed's
+            # analysis directory and not to result/analysis
+            manifest_path = (self.result_dir.resolve().parent / 'analysis'
+                             / MANIFEST_NAME)
+        self.manifest_path = Path(manifest_path)
+        # mtime, number of entries and time of the last listing
+        self.result_info = {'mtime': None, 'count': None, 'listed_ns': None}
+        self.dirs = {}
+        self.changed = False
+        self.load()
+
+    def load(self):
+        """Read the stored manifest if there is a readable one."""
+        try:
+            with self.manifest_path.open('r') as mf:
+                manifest = json.load(mf)
+        except (OSError, ValueError):
+            return
+        if (manifest.get('version') != MANIFEST_VERSION
+                or manifest.get('result_dir') != str(self.result_dir.resolve())):
+            return
+        self.result_info = manifest['result_info']
+        self.dirs = manifest['dirs']
+
+    def is_listing_valid(self, dir_path, info, mtime):
+        """!Whether the stored listing of a directory is still complete.
+
+        @param dir_path Path to the directory
+        @param info Dictionary with the mtime, number of entries and time of
+               the last listing of the directory
+        @param mtime Current mtime of the directory
+        @return: False if the directory has to be listed again
+
+        """
+        if mtime != info['mtime']:
+            return False
+        if info['listed_ns'] - mtime > MTIME_RESOLUTION_NS:
+            return True
+        if count_dir_entries(dir_path) != info['count']:
+            return False
+        # Nothing was added in the tick of the listing and later additions
+        # change the mtime, so the listing no longer needs to be counted
+        now_ns = time.time_ns()
+        if now_ns - mtime > MTIME_RESOLUTION_NS:
+            info['listed_ns'] = now_ns
+            self.changed = True
+        return True
+
+    def update(self):
+        """Bring the manifest up to date with the result directory.
+
+        @return: True if anything changed
+
+        """
+        result_mtime = self.result_dir.stat().st_mtime_ns
+        if not self.is_listing_valid(self.result_dir, self.result_info,
+                                     result_mtime):
+            # Subdirectories were added or removed
+            listed_ns = time.time_ns()
+            with os.scandir(self.result_dir) as entries:
+                entry_list = list(entries)
+                dir_names = {entry.name for entry in entry_list
+                             if entry.is_dir() and entry.name != 'PNG'}
+            for name in set(self.dirs) - dir_names:
+                del self.dirs[name]
+            for name in dir_names - set(self.dirs):
+                self.dirs[name] = {'mtime': None, 'count': None,
+                                   'listed_ns': None, 'files': {}}
+            self.result_info = {'mtime': result_mtime,
+                                'count': len(entry_list),
+                                'listed_ns': listed_ns}
+            self.changed = True
+
+        for name, dir_info in self.dirs.items():
+            dir_path = self.result_dir / name
+            mtime = dir_path.stat().st_mtime_ns
+            if self.is_listing_valid(dir_path, dir_info, mtime):
+                continue
+            dir_info['listed_ns'] = time.time_ns()
+            dir_info['files'], dir_info['count'] = scan_frame_dir(dir_path)
+            dir_info['mtime'] = mtime
+            self.changed = True
+        return self.changed
+
+    def save(self):
+        """Write the manifest if it changed. Failing to write (e.g. read-only
+        simulation directories) is not an error."""
+        if not self.changed:
+            return
+        manifest = {'version': MANIFEST_VERSION,
+                    'result_dir': str(self.result_dir.resolve()),
+                    'result_info': self.result_info,
+                    'dirs': self.dirs}
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        try:
+            self.manifest_path.parent.mkdir(exist_ok=True)
+            with tmp_path.open('w') as mf:
+                json.dump(manifest, mf)
+            os.replace(tmp_path, self.manifest_path)
+            self.changed = False
+        except OSError:
+            pass
+
+    def get_entries(self, prefix, ext='dat'):
+        """!Get the manifest entries of one output type sorted by frame number.
+
+        @param prefix File prefix, e.g. 'SylinderAscii'
+        @param ext File extension, e.g. 'dat'
+        @return: List of (frame number, path relative to result directory,
+                 size, mtime_ns) tuples
+
+        """
+        key = f'{prefix}.{ext}'
+        entries = [(num, f'{dir_name}/{name}', size, mtime)
+                   for dir_name, dir_info in self.dirs.items()
+                   for num, name, size, mtime in dir_info['files'].get(key, [])]
+        entries.sort()
+        return entries
+
+
+def get_frame_manifest(result_dir, manifest_path=None):
+    """!Load, validate and store the frame manifest of a result directory.
+
+    @param result_dir Result directory of a simulation
+    @param manifest_path Manifest file, by default analysis/frame_manifest.json
+           next to the result directory
+    @return: Up to date FrameManifest
+
+    """
+    manifest = FrameManifest(result_dir, manifest_path)
+    manifest.update()
+    manifest.save()
+    return manifest
+
+
+def get_frame_files(result_dir, prefix, ext='dat'):
+    """!Get the frame-number sorted paths of one output type using the frame
+    manifest instead of a recursive glob.
+
+    @param result_dir Result directory of a simulation
+    @param prefix File prefix, e.g. 'SylinderAscii'
+    @param ext File extension, e.g. 'dat'
+    @return: List of Paths
+
+    """
+    result_dir = Path(result_dir)
+    manifest = get_frame_manifest(result_dir)
+    return [result_dir / rel_path
+            for _, rel_path, _, _ in manifest.get_entries(prefix, ext)]
+
+
+def glob_frame_files(pattern, result_dir='.'):
+    """!Answer a frame file glob pattern from the frame manifest.
+
+    @param pattern Glob pattern relative to the result directory, e.g.
+           'result*-*/SylinderAscii_*.dat', or to a parent of it, e.g.
+           'result/result*-*/SylinderAscii_*.dat'
+    @param result_dir Directory the pattern is relative to
+    @return: Sorted list of path strings formatted like glob.glob would
+             return them or None if the pattern is not a frame file pattern
+
+    """
+    match = FRAME_GLOB_REG.match(str(pattern))
+    if match is None:
+        return None
+    dot, parent, prefix, ext = match.groups()
+    manifest = get_frame_manifest(Path(result_dir) / parent)
+    return [f'{dot or ""}{parent}{rel_path}'
+            for _, rel_path, _, _ in manifest.get_entries(prefix, ext)]
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented.")
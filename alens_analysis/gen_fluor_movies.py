@@ -18,6 +18,8 @@ import yaml
 from numba import jit, vectorize
 import argparse
 
+from alens_analysis.frame_manifest import get_frame_files
+
 rng = np.random.default_rng()  # initialize generator instance
 
 SQRT2 = np.sqrt(2)
@@ -185,8 +187,7 @@ def main(opts):
     sim_box = np.asarray(run_params['simBoxHigh'])
 
     result_dir = Path(".")
-    fil_dat_paths = sorted(result_dir.glob("**/SylinderAscii*.dat"),
-                           key=get_file_number)
+    fil_dat_paths = get_frame_files(result_dir, 'SylinderAscii')
 
     rng = np.random.default_rng()
     nfils = count_fils(fil_dat_paths[0])
@@ -9,6 +9,7 @@ import Util.alens as am
 from mpi4py import MPI
 from alens_analysis.PySTKFMM import Stk3DFMM, DArray, KERNEL
 from alens_analysis.PrintVTKData import Frame
+from alens_analysis.frame_manifest import get_frame_files
 # %%
 
 # cubic mesh has (mesh+1) points in each direction
@@ -211,12 +212,9 @@ print(trg_coord.chunk.shape)
 print(trg_value.chunk.shape)
 
 
-syl_vtk_files = list(wrk_dir.glob('./result*-*/Sylinder_*.pvtp'))
-prot_vtk_files = list(wrk_dir.glob('./result*-*/Protein_*.pvtp'))
-con_vtk_files = list(wrk_dir.glob('./result*-*/ConBlock_*.pvtp'))
-syl_vtk_files.sort(key=getFrameNumber_lambda)
-prot_vtk_files.sort(key=getFrameNumber_lambda)
-con_vtk_files.sort(key=getFrameNumber_lambda)
+syl_vtk_files = get_frame_files(wrk_dir, 'Sylinder', 'pvtp')
+prot_vtk_files = get_frame_files(wrk_dir, 'Protein', 'pvtp')
+con_vtk_files = get_frame_files(wrk_dir, 'ConBlock', 'pvtp')
 
 folder = wrk_dir / f'flow{mesh}'
 try:
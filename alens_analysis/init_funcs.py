@@ -17,6 +17,8 @@ import zipfile
 import re
 from glob import glob
 from .read_func import get_file_number
+from .zip_frames import get_zip_frame_paths
+from .frame_manifest import get_frame_files
 
 
 def get_file_number(f):
@@ -37,39 +39,20 @@ def get_ascii_files(run_dir):
         result_dir = run_dir / 'result'
         is_zip = False
     elif (run_dir / 'result.zip').exists():
-        result_zip = zipfile.ZipFile(run_dir / 'result.zip')
-        result_path = zipfile.Path(run_dir / 'result.zip')
         is_zip = True
     else:
         raise FileNotFoundError(
             f'Could not find result directory or zipfile in {run_dir}.')
 
     if is_zip:
-        sy_reg = re.compile(r'.*SylinderAscii.*.dat')
-        syl_ascii_files = [
-            result_path /
-            syl_path for syl_path in list(
-                filter(sy_reg.search, result_zip.namelist()))]
-
-        prot_reg = re.compile(r'.*ProteinAscii.*.dat')
-        prot_ascii_files = [
-            result_path /
-            prot_path for prot_path in list(
-                filter(
-                    sy_reg.search,
-                    result_zip.namelist()))]
+        # Frame index built from one read of the central directory
+        syl_ascii_files, prot_ascii_files = get_zip_frame_paths(
+            run_dir / 'result.zip')
 
     else:
-        result_dirs = [d for d in result_dir.iterdir() if d.is_dir()
-                       and d.name != 'PNG']
-        syl_ascii_files = []
-        prot_ascii_files = []
-        for rdir in result_dirs:
-            syl_ascii_files += list(rdir.glob('SylinderAscii_*.dat'))
-            prot_ascii_files += list(rdir.glob('ProteinAscii_*.dat'))
-
-    syl_ascii_files.sort(key=get_file_number)
-    prot_ascii_files.sort(key=get_file_number)
+        # Sorted listings from the frame manifest in analysis/
+        syl_ascii_files = get_frame_files(result_dir, 'SylinderAscii')
+        prot_ascii_files = get_frame_files(result_dir, 'ProteinAscii')
 
     if len(syl_ascii_files) != len(prot_ascii_files):
         raise AssertionError(
@@ -105,16 +88,8 @@ def get_last_ascii_files(run_dir):
         last_prot_file = result_path / max(list(filter(prot_reg.search, result_zip.namelist())),
                                            key=get_file_number)
     else:
-        result_dirs = [d for d in result_dir.iterdir() if d.is_dir()
-                       and d.name != 'PNG']
-        large_result_dir = max(
-            result_dirs, key=lambda x: int(re.findall(r'[0-9]+', x.name)[-1]))
-        # Within this folder, find the last SylinderAscii_#.dat
-        last_syl_file = max(large_result_dir.glob('SylinderAscii_*.dat'),
-                            key=get_file_number)
-
-        last_prot_file = max(large_result_dir.glob('ProteinAscii_*.dat'),
-                             key=get_file_number)
+        last_syl_file = get_frame_files(result_dir, 'SylinderAscii')[-1]
+        last_prot_file = get_frame_files(result_dir, 'ProteinAscii')[-1]
 
     syl_snap_num = get_file_number(last_syl_file)
     prot_snap_num = get_file_number(last_prot_file)
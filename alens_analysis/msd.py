@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: msd.py
+Description: Mean squared displacements of beads, polymers, clusters and
+condensates in O(T log T) and unwrapping of periodic trajectories.
+"""
+
+import numpy as np
+import torch
+
+from .autocorr import fft_autocorr, AUTOCORR_CHUNK
+
+MSD_AVERAGES = ('time', 'ensemble', 'particle')
+
+
+def unwrap_pbc(pos_arr, box_low, box_high, pbc=(True, True, True)):
+    """!Remove the jumps of positions wrapped into a periodic box, assuming
+    nothing moves more than half a box length between frames.
+
+    @param pos_arr (particles x 3 x T) positions (or (3 x T))
+    @param box_low Lower corner of the simulation box
+    @param box_high Upper corner of the simulation box
+    @param pbc Whether each axis is periodic
+    @return: Unwrapped positions
+
+    """
+    pos_arr = np.asarray(pos_arr)
+    box = (np.asarray(box_high, dtype=float)
+           - np.asarray(box_low, dtype=float))[:, np.newaxis]
+    periodic = np.asarray(pbc, dtype=bool)
+    jumps = np.diff(pos_arr, axis=-1)
+    shifts = np.zeros(jumps.shape)
+    shifts[..., periodic, :] = -np.round(
+        jumps[..., periodic, :] / box[periodic]) * box[periodic]
+    unwrapped = np.array(pos_arr, dtype=float)
+    unwrapped[..., 1:] += np.cumsum(shifts, axis=-1)
+    return unwrapped
+
+
+def unwrap_pbc_from_params(pos_arr, params):
+    """!Unwrap positions with the box of a run's RunConfig parameters
+    (e.g. Trajectory.params). Runs without simBoxPBC are returned as is.
+
+    @param pos_arr (particles x 3 x T) positions
+    @param params RunConfig dictionary
+    @return: Unwrapped positions
+
+    """
+    pbc = params.get('simBoxPBC', (False, False, False))
+    if not np.any(pbc):
+        return np.asarray(pos_arr)
+    return unwrap_pbc(pos_arr, params['simBoxLow'], params['simBoxHigh'], pbc)
+
+
+def log_lags(nsteps, num=50):
+    """!Unique, logarithmically spaced lag indices including 0.
+
+    @param nsteps Number of frames
+    @param num Maximum number of lags
+    @return: Increasing int array of lags below nsteps
+
+    """
+    return np.unique(np.concatenate(
+        [[0], np.geomspace(1, nsteps - 1, num - 1).astype(int)]))
+
+
+def fft_msd(arr, average='time', lags=None, sum_components=True,
+            chunk_size=AUTOCORR_CHUNK, device='cpu'):
+    """Mean squared displacement of many particles.
+
+    Time averaged MSDs use the FFT algorithm MSD(m) = S1(m) - 2 S2(m), where
+    S2 is the autocorrelation of fft_autocorr and
+    S1(m) = sum_(t < T - m) (x(t)^2 + x(t + m)^2) / (T - m) comes from prefix
+    sums, so the cost is O(T log T) per particle instead of O(T^2).
+
+    Parameters
+    ----------
+    arr : ndarray
+        (particles x [components x] T) positions with time as the last axis,
+        or a single (T,) series. Periodic trajectories must be unwrapped
+        first (see unwrap_pbc_from_params).
+    average : str, optional
+        'time': time averaged and then averaged over particles (T,),
+        'particle': time averaged for every particle (particles x T),
+        'ensemble': displacement from the first frame averaged over particles
+        (T,), by default 'time'
+    lags : array of int, optional
+        Lag indices to return (e.g. log_lags), by default all
+    sum_components : bool, optional
+        Sum squared displacements over the axes between the first and the
+        last (vectors), by default True
+    chunk_size : int, optional
+        Number of particles processed at once, by default AUTOCORR_CHUNK
+    device : str, optional
+        Torch device of the FFTs, by default 'cpu'
+
+    Returns
+    -------
+    ndarray
+        MSD of every lag (and particle for 'particle')
+    """
+    if average not in MSD_AVERAGES:
+        raise ValueError(
+            f'Unknown MSD average "{average}". Options are {MSD_AVERAGES}.')
+    arr = np.asarray(arr, dtype=np.float64)
+    is_single = arr.ndim == 1
+    if is_single:
+        arr = arr[np.newaxis, :]
+    nsteps = arr.shape[-1]
+    comp_axes = tuple(range(1, arr.ndim - 1)) if sum_components else ()
+
+    msd_list = []
+    for start in range(0, arr.shape[0], chunk_size):
+        # Displacements do not depend on the origin of positions. Removing
+        # the mean keeps S1 and S2 small compared to their difference.
+        chunk = arr[start:start + chunk_size]
+        chunk = chunk - chunk.mean(axis=-1, keepdims=True)
+        if average == 'ensemble':
+            msd_list += [np.sum((chunk - chunk[..., :1])**2, axis=comp_axes)]
+            continue
+        sqr = np.sum(chunk * chunk, axis=comp_axes)
+        cum_sqr = np.zeros(sqr.shape[:-1] + (nsteps + 1,))
+        cum_sqr[..., 1:] = np.cumsum(sqr, axis=-1)
+        m = np.arange(nsteps)
+        s1 = ((cum_sqr[..., nsteps - m] + cum_sqr[..., -1:] - cum_sqr[..., m])
+              / (nsteps - m))
+        s2 = fft_autocorr(torch.from_numpy(chunk), sum_components=sum_components,
+                          chunk_size=chunk_size, device=device).cpu().numpy()
+        chunk_msd = s1 - 2. * s2
+        chunk_msd[..., 0] = 0.
+        msd_list += [chunk_msd]
+
+    msd = np.concatenate(msd_list)
+    if average != 'particle':
+        msd = msd.mean(axis=0)
+    elif is_single:
+        msd = msd[0]
+    return msd if lags is None else msd[..., lags]
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented.")
@@ -0,0 +1,363 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: raw_data_layout.py
+Description: Storage layouts (chunking, filters and dtypes) of the frame
+datasets in raw_data.h5 files and a tool to re-layout existing files.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+RAW_DATA_LAYOUTS = ('contiguous', 'chunked')
+RAW_DATA_COMPRESSIONS = (None, 'gzip', 'lzf')
+# Stored dtype of floating point frame data. aLENS writes about 6 significant
+# digits so float32 loses nothing, float64 keeps results bit-identical to
+# analyses done on the ascii files.
+RAW_FLOAT_DTYPES = ('f4', 'f8')
+
+# Columns of the 10 column protein data that are stored as int32 in
+# raw_data/protein_ids and as floats in raw_data/protein_pos when proteins are
+# stored split instead of in a single raw_data/proteins dataset.
+PROTEIN_ID_COLS = [0, 1, 8, 9]
+PROTEIN_POS_COLS = [2, 3, 4, 5, 6, 7]
+PROTEIN_BIND_COLS = [8, 9]
+
+# Chunks hold this many beads at most so bead windows do not pull in the
+# whole chain.
+MAX_CHUNK_OBJS = 256
+# Target size of a single chunk in bytes
+CHUNK_BYTES = 1 << 20
+
+
+def get_frame_chunk_shape(shape, itemsize=4, chunk_bytes=CHUNK_BYTES,
+                          max_chunk_objs=MAX_CHUNK_OBJS):
+    """Chunk shape for an (objects, columns, frames) dataset.
+
+    Every chunk holds all columns, a window of at most `max_chunk_objs`
+    objects and as many consecutive frames as fit into `chunk_bytes`. Frames
+    are written one chunk of frames at a time, time-window reads only touch
+    the chunks of that window and bead-window reads skip the rest of the
+    chain.
+
+    Parameters
+    ----------
+    shape : tuple of ints
+        (objects, columns, frames) shape of the dataset. The number of frames
+        may be None for datasets that will grow along the frame axis.
+    itemsize : int, optional
+        Size of a stored value in bytes, by default 4 (float32)
+    chunk_bytes : int, optional
+        Target size of a chunk, by default 1 MiB
+    max_chunk_objs : int, optional
+        Maximum number of objects in a chunk, by default 256
+
+    Returns
+    -------
+    tuple of ints
+        Chunk shape
+    """
+    n_obj, ncols, nframes = shape
+    obj_block = max(1, min(n_obj, max_chunk_objs))
+    frame_block = max(1, chunk_bytes // (obj_block * ncols * itemsize))
+    if nframes is not None:
+        frame_block = max(1, min(frame_block, nframes))
+    return (obj_block, ncols, frame_block)
+
+
+def get_raw_dset_kwargs(shape, layout='contiguous', compression=None,
+                        compression_opts=None, shuffle=False, itemsize=4,
+                        resizable=False):
+    """Keyword arguments of h5py create_dataset for a frame dataset.
+
+    Parameters
+    ----------
+    shape : tuple of ints
+        (objects, columns, frames) shape of the dataset
+    layout : str, optional
+        'contiguous' (no chunking) or 'chunked', by default 'contiguous'
+    compression : str, optional
+        Built-in HDF5 filter, 'gzip' or 'lzf', by default None
+    compression_opts : int, optional
+        Compression level for gzip, by default None (h5py default)
+    shuffle : bool, optional
+        Apply the byte shuffle filter before compression, by default False
+    itemsize : int, optional
+        Size of a stored value in bytes, by default 4
+    resizable : bool, optional
+        Allow the dataset to grow along the frame axis, by default False
+
+    Returns
+    -------
+    dict
+        Arguments to pass to create_dataset
+
+    Raises
+    ------
+    ValueError
+        If the layout or compression is unknown or filters are requested for
+        a contiguous or resizable layout.
+    """
+    if layout not in RAW_DATA_LAYOUTS:
+        raise ValueError(f'Unknown raw data layout "{layout}". '
+                         f'Options are {RAW_DATA_LAYOUTS}.')
+    if compression not in RAW_DATA_COMPRESSIONS:
+        raise ValueError(f'Unknown compression "{compression}". '
+                         f'Options are {RAW_DATA_COMPRESSIONS}.')
+    if layout == 'contiguous':
+        if compression is not None or shuffle:
+            raise ValueError('Filters require a chunked layout.')
+        if resizable:
+            raise ValueError('Resizable datasets require a chunked layout.')
+        return {}
+
+    if resizable:
+        # Size chunks for the final run, not the frames collected so far
+        shape = tuple(shape[:-1]) + (None,)
+    dset_kwargs = {'chunks': get_frame_chunk_shape(shape, itemsize),
+                   'shuffle': shuffle}
+    if resizable:
+        dset_kwargs['maxshape'] = shape
+    if compression is not None:
+        dset_kwargs['compression'] = compression
+        if compression_opts is not None:
+            dset_kwargs['compression_opts'] = compression_opts
+    return dset_kwargs
+
+
+def get_dset_layout(dset):
+    """Describe the storage layout of a dataset.
+
+    @param dset h5py dataset
+    @return: Dictionary with the layout, chunk shape and filters
+
+    """
+    return {'layout': 'contiguous' if dset.chunks is None else 'chunked',
+            'chunks': dset.chunks,
+            'compression': dset.compression,
+            'compression_opts': dset.compression_opts,
+            'shuffle': dset.shuffle,
+            'resizable': dset.maxshape[-1] is None}
+
+
+class FrameBlockWriter():
+
+    """Write frames of an (objects, columns, frames) dataset one chunk of
+    frames at a time. Chunks are then written (and compressed) once instead of
+    being re-read and rewritten for every frame. Datasets without chunking
+    are written frame by frame. Frames of float datasets are buffered as
+    float64, those of integer datasets with the dataset dtype."""
+
+    def __init__(self, dset, start_frame=0, dtype=None):
+        if dtype is None:
+            dtype = dset.dtype if dset.dtype.kind in 'iu' else np.float64
+        self.dset = dset
+        self.frame = start_frame
+        self.nblock = 1 if dset.chunks is None else dset.chunks[-1]
+        self.nbuf = 0
+        self.buf = None
+        if self.nblock > 1:
+            self.buf = np.zeros(dset.shape[:-1] + (self.nblock,), dtype=dtype)
+
+    def write(self, arr):
+        """Add the data of the next frame."""
+        if self.buf is None:
+            self.dset[..., self.frame] = arr
+            self.frame += 1
+            return
+        self.buf[..., self.nbuf] = arr
+        self.nbuf += 1
+        if self.nbuf == self.nblock:
+            self.flush()
+
+    def flush(self):
+        """Write any frames that are still buffered."""
+        if self.nbuf:
+            self.dset[..., self.frame:self.frame + self.nbuf] = \
+                self.buf[..., :self.nbuf]
+            self.frame += self.nbuf
+            self.nbuf = 0
+
+
+def is_split_protein_data(h5_data):
+    """Whether protein data of a raw data file is stored split into
+    raw_data/protein_ids and raw_data/protein_pos."""
+    return 'protein_ids' in h5_data['raw_data']
+
+
+def read_protein_frames(h5_data, cols=slice(None), frames=slice(None)):
+    """Read columns of protein data independent of how it is stored.
+
+    Only the datasets holding the requested columns are read, so e.g. bind
+    IDs of split protein data are read without any positions.
+
+    Parameters
+    ----------
+    h5_data : h5py.File
+        Open raw data file
+    cols : slice, int or list of ints, optional
+        Columns of the 10 column protein data (gid, tag, end positions, end
+        bind IDs), by default all
+    frames : slice or int, optional
+        Frames to read, by default all
+
+    Returns
+    -------
+    ndarray
+        (proteins x columns x frames) array with the dtype of the stored
+        data. Columns from int32 and float datasets are combined as float64.
+    """
+    raw_grp = h5_data['raw_data']
+    if is_split_protein_data(h5_data):
+        dset_layout = (('protein_ids', PROTEIN_ID_COLS),
+                       ('protein_pos', PROTEIN_POS_COLS))
+    else:
+        dset_layout = (('proteins', list(range(10))),)
+    col_inds = np.arange(10)[cols]
+    squeeze = col_inds.ndim == 0
+    col_inds = np.atleast_1d(col_inds)
+    parts = []
+    for name, dset_cols in dset_layout:
+        sel = [(i, dset_cols.index(c)) for i, c in enumerate(col_inds)
+               if c in dset_cols]
+        if sel:
+            out_inds, dset_inds = zip(*sel)
+            parts += [(list(out_inds), raw_grp[name], list(dset_inds))]
+
+    dtype = np.result_type(*[dset.dtype for _, dset, _ in parts])
+    n_prot = parts[0][1].shape[0]
+    nframes = len(range(parts[0][1].shape[-1])[frames]) \
+        if isinstance(frames, slice) else None
+    arr = np.empty((n_prot, col_inds.size) +
+                   (() if nframes is None else (nframes,)), dtype=dtype)
+    for out_inds, dset, dset_inds in parts:
+        # h5py only accepts increasing index lists and reads a range of
+        # columns fastest as a slice
+        order = np.argsort(dset_inds)
+        sel = [dset_inds[i] for i in order]
+        if sel == list(range(sel[0], sel[-1] + 1)):
+            sel = slice(sel[0], sel[-1] + 1)
+        arr[:, [out_inds[i] for i in order], ...] = dset[:, sel, frames]
+    return arr[:, 0, ...] if squeeze else arr
+
+
+def read_protein_bind_ids(h5_data, frames=slice(None)):
+    """!Read the IDs of the beads the two ends of every protein are bound to.
+
+    @param h5_data Open raw data file
+    @param frames Frames to read, by default all
+    @return: (proteins x 2 x frames) int array, -1 for unbound ends
+
+    """
+    if is_split_protein_data(h5_data):
+        return h5_data['raw_data/protein_ids'][:, 2:4, frames]
+    return h5_data['raw_data/proteins'][:, 8:10, frames].astype(np.int32)
+
+
+def copy_frame_dset(src_dset, dst_grp, name=None, **layout_kwargs):
+    """Copy a frame dataset and its attributes into a new layout, a block of
+    frames at a time so memory stays bounded.
+
+    @param src_dset Dataset to copy
+    @param dst_grp Group to copy the dataset to
+    @param name Name of new dataset, by default the name of the source
+    @param **layout_kwargs Arguments passed to get_raw_dset_kwargs
+    @return: New dataset
+
+    """
+    name = Path(src_dset.name).name if name is None else name
+    dset_kwargs = get_raw_dset_kwargs(src_dset.shape,
+                                      itemsize=src_dset.dtype.itemsize,
+                                      **layout_kwargs)
+    dst_dset = dst_grp.create_dataset(name, shape=src_dset.shape,
+                                      dtype=src_dset.dtype, **dset_kwargs)
+    for key, val in src_dset.attrs.items():
+        dst_dset.attrs[key] = val
+
+    nframes = src_dset.shape[-1]
+    nblock = max(1, min(nframes, get_frame_chunk_shape(
+        src_dset.shape, src_dset.dtype.itemsize)[-1]))
+    for start in range(0, nframes, nblock):
+        end = min(start + nblock, nframes)
+        dst_dset[..., start:end] = src_dset[..., start:end]
+    return dst_dset
+
+
+def relayout_raw_data(src_path, dst_path, **layout_kwargs):
+    """Write a copy of a raw_data.h5 file with the frame datasets in
+    raw_data stored with a new layout. All other objects and attributes are
+    copied unchanged.
+
+    @param src_path Path to existing raw data file
+    @param dst_path Path to write new raw data file to
+    @param **layout_kwargs Arguments passed to get_raw_dset_kwargs
+    @return: void
+
+    """
+    # Per-frame datasets (time, frame_number) have to grow with the frame
+    # datasets so the file can be appended to.
+    frame_dset_kwargs = ({'maxshape': (None,)}
+                         if layout_kwargs.get('resizable', False) else {})
+    if Path(src_path).resolve() == Path(dst_path).resolve():
+        raise ValueError('Source and destination files must differ.')
+
+    with h5py.File(src_path, 'r') as h5_src, h5py.File(dst_path, 'w') as h5_dst:
+        for key, val in h5_src.attrs.items():
+            h5_dst.attrs[key] = val
+        for key in h5_src.keys():
+            if key in ('time', 'frame_number') and frame_dset_kwargs:
+                h5_dst.create_dataset(key, data=h5_src[key][...],
+                                      **frame_dset_kwargs)
+                continue
+            if key != 'raw_data':
+                h5_src.copy(h5_src[key], h5_dst, name=key)
+                continue
+            raw_grp = h5_dst.create_group('raw_data')
+            for attr_key, val in h5_src['raw_data'].attrs.items():
+                raw_grp.attrs[attr_key] = val
+            for dset in h5_src['raw_data'].values():
+                if isinstance(dset, h5py.Dataset) and dset.ndim == 3:
+                    copy_frame_dset(dset, raw_grp, **layout_kwargs)
+                else:
+                    h5_src.copy(dset, raw_grp)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Re-layout the frame datasets of a raw_data.h5 file.')
+    parser.add_argument('src', type=Path, help='Existing raw data file.')
+    parser.add_argument('dst', type=Path, help='New raw data file.')
+    parser.add_argument('-l', '--layout', choices=RAW_DATA_LAYOUTS,
+                        default='chunked', help='Storage layout.')
+    parser.add_argument('-c', '--compression',
+                        choices=[c for c in RAW_DATA_COMPRESSIONS if c],
+                        default=None, help='Built-in compression filter.')
+    parser.add_argument('--compression_opts', type=int, default=None,
+                        help='Compression level for gzip.')
+    parser.add_argument('--shuffle', action='store_true',
+                        help='Apply the shuffle filter before compression.')
+    parser.add_argument('--resizable', action='store_true',
+                        help='Allow frame datasets to grow so the file can be '
+                        'appended to with "analens -A collect --append".')
+    return parser.parse_args()
+
+
+def main():
+    opts = parse_args()
+    t0 = time.time()
+    relayout_raw_data(opts.src, opts.dst, layout=opts.layout,
+                      compression=opts.compression,
+                      compression_opts=opts.compression_opts,
+                      shuffle=opts.shuffle, resizable=opts.resizable)
+    print(f"Wrote {opts.dst} in {time.time() - t0} seconds "
+          f"({opts.src.stat().st_size / 2**20:.4g} MiB -> "
+          f"{opts.dst.stat().st_size / 2**20:.4g} MiB).")
+
+
+##########################################
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,30 @@ from pathlib import Path
 from tqdm import tqdm
 from .objects import filament, protein, con_block
 from .runlog_funcs import get_walltime
+from .raw_data_layout import (get_raw_dset_kwargs, FrameBlockWriter,
+                              RAW_FLOAT_DTYPES, PROTEIN_ID_COLS,
+                              PROTEIN_POS_COLS, PROTEIN_BIND_COLS)
+from .zip_frames import get_zip_frame_paths, close_zip_handles
+from .bind_events import BindEventWriter, BIND_EVENTS_GRP
+from .frame_manifest import get_frame_files
 import zipfile
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+# Number of numeric columns (everything after the type character) in ascii
+# frame files written by aLENS.
+SYLINDER_ASCII_NCOLS = 9
+PROTEIN_ASCII_NCOLS = 10
+
+PROTEIN_COLUMN_LABELS = ['gid', 'tag',
+                         'end1 pos x', 'end1 pos y', 'end1 pos z',
+                         'end2 pos x', 'end2 pos y', 'end2 pos z',
+                         'end1 bindID', 'end2 bindID']
+
+_NEWLINE = ord('\n')
+_SPACE = ord(' ')
 
 
 def get_file_number(path):
@@ -75,66 +98,205 @@ def read_dat_xlp(fpath):
     return proteins
 
 
-def read_dat_constraint(fpath):
+def parse_ascii_frame(buf, ncols, keep_types=None):
+    """Parse the full contents of an aLENS ascii frame file into an array.
 
-    con_blocks = []
-    # open the file and read the lines
-    # with fpath.open('r') as file1:
+    The first two lines of the file (object count and time) are the header.
+    Every other line starts with a single type character followed by `ncols`
+    numbers. Instead of building a python object per line, the type
+    characters are blanked out of the byte buffer and the numbers are parsed
+    in a single call. Rows are then sorted by gid (first column).
+
+    Parameters
+    ----------
+    buf : bytes or str
+        Contents of a SylinderAscii_*.dat or ProteinAscii_*.dat file
+    ncols : int
+        Number of numeric columns following the type character
+    keep_types : str, optional
+        Type characters of lines to keep (e.g. 'CS'). Lines of any other
+        type are dropped before parsing. By default all lines are kept.
+
+    Returns
+    -------
+    float, (n x ncols) ndarray
+        Time of the frame and float64 data sorted by gid
+
+    Raises
+    ------
+    ValueError
+        If the kept lines do not all contain `ncols` numbers.
+    """
+    if isinstance(buf, str):
+        buf = buf.encode()
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    header_ends = np.flatnonzero(raw == _NEWLINE)[:2]
+    frame_time = float(buf[header_ends[0] + 1:header_ends[1]])
+
+    # Copy so type characters can be overwritten
+    body = raw[header_ends[1] + 1:].copy()
+    if body.size == 0:
+        return frame_time, np.zeros((0, ncols))
+    is_newline = body == _NEWLINE
+    line_starts = np.r_[0, np.flatnonzero(is_newline[:-1]) + 1]
+    type_chars = body[line_starts]
+    body[line_starts] = _SPACE
+
+    if keep_types is not None:
+        keep_line = np.isin(type_chars,
+                            np.frombuffer(keep_types.encode(), dtype=np.uint8))
+        if not keep_line.all():
+            # Index of the line every byte belongs to
+            line_ind = np.cumsum(is_newline) - is_newline
+            body = body[keep_line[line_ind]]
+
+    vals = np.fromstring(body.tobytes(), dtype=np.float64, sep=' ')
+    if vals.size % ncols:
+        raise ValueError(
+            f'Could not split {vals.size} values into rows of {ncols} columns.')
+    data = vals.reshape(-1, ncols)
+    return frame_time, data[np.argsort(data[:, 0], kind='stable')]
+
+
+def parse_sylinder_ascii(buf):
+    """Parse a SylinderAscii_*.dat buffer keeping only sylinder lines ('C'
+    and 'S' types).
+
+    @param buf Contents of the file
+    @return: time, (n_syl x 9) array sorted by gid
+
+    """
+    return parse_ascii_frame(buf, SYLINDER_ASCII_NCOLS, keep_types='CS')
+
+
+def parse_protein_ascii(buf):
+    """Parse a ProteinAscii_*.dat buffer.
+
+    @param buf Contents of the file
+    @return: time, (nproteins x 10) array sorted by gid
+
+    """
+    return parse_ascii_frame(buf, PROTEIN_ASCII_NCOLS)
+
+
+def get_pvtp_nbytes(fpath):
+    """!Number of bytes on disk of a pvtp file and the piece files it lists.
+
+    @param fpath Path of the pvtp file
+    @return: Total size in bytes
+
+    """
+    fpath = Path(fpath)
+    pvtp_text = fpath.read_text()
+    return fpath.stat().st_size + sum(
+        (fpath.parent / source).stat().st_size
+        for source in re.findall(r'<Piece\s+Source="([^"]+)"', pvtp_text))
+
+
+def read_con_block_arrays(fpath, cell_arrays=None, point_arrays=None):
+    """Read a ConBlock_*.pvtp file into a struct of arrays.
+
+    Every array is converted as a whole with vtk_to_numpy instead of
+    visiting constraints one at a time. Constraint i is the line from point
+    2i to point 2i+1.
+
+    Parameters
+    ----------
+    fpath : Path object
+        ConBlock_*.pvtp file path
+    cell_arrays : sequence of str, optional
+        Names of the cell (per constraint) arrays to read. Other arrays are
+        disabled on the reader and never parsed. By default all are read.
+    point_arrays : sequence of str, optional
+        Names of the point (per constraint end) arrays to read, by default
+        all are read.
+
+    Returns
+    -------
+    dict
+        'end0' and 'end1' (n x 3) end positions, every cell array by name
+        (n or n x ncomps) and every point array split into name + '0' and
+        name + '1' for the two ends of the constraints
+    """
     reader = vtk.vtkXMLPPolyDataReader()
     reader.SetFileName(str(fpath))
+    for names, selection in ((cell_arrays, reader.GetCellDataArraySelection()),
+                             (point_arrays, reader.GetPointDataArraySelection())):
+        if names is None:
+            continue
+        reader.UpdateInformation()
+        selection.DisableAllArrays()
+        for name in names:
+            selection.EnableArray(name)
     reader.Update()
     data = reader.GetOutput()
-    # filecontent = file1.readlines()
 
-    nObj = int(data.GetPoints().GetNumberOfPoints() / 2)
-    # print("parsing data for ", nObj, " object(s)")
-    for i in range(nObj):
-        cb = con_block()
-        cb.end0 = data.GetPoints().GetPoint(2 * i)
-        cb.end1 = data.GetPoints().GetPoint(2 * i + 1)
-        con_blocks += [cb]
+    if data.GetPoints() is None:
+        points = np.zeros((0, 3))
+    else:
+        points = vn.vtk_to_numpy(data.GetPoints().GetData())
+    n_obj = points.shape[0] // 2
+    con_arrays = {'end0': points[0:2 * n_obj:2], 'end1': points[1:2 * n_obj:2]}
+
+    cell_data = data.GetCellData()
+    for i in range(cell_data.GetNumberOfArrays()):
+        cdata = cell_data.GetArray(i)
+        if cdata is not None:
+            con_arrays[cdata.GetName()] = vn.vtk_to_numpy(cdata)[:n_obj]
+
+    point_data = data.GetPointData()
+    for i in range(point_data.GetNumberOfArrays()):
+        pdata = point_data.GetArray(i)
+        if pdata is not None:
+            vals = vn.vtk_to_numpy(pdata)
+            con_arrays[pdata.GetName() + "0"] = vals[0:2 * n_obj:2]
+            con_arrays[pdata.GetName() + "1"] = vals[1:2 * n_obj:2]
+    return con_arrays
+
+
+def read_dat_constraint(fpath):
+    """!Read a ConBlock_*.pvtp file into con_block objects. Kept for
+    compatibility, use read_con_block_arrays for anything large.
+
+    @param fpath: ConBlock_*.pvtp file path
+    @return: List of con_block objects with every cell and point array as
+             attributes holding tuples
 
-    # step 2, member cell data
-    numCellData = data.GetCellData().GetNumberOfArrays()
-    # print("Number of CellDataArrays: ", numCellData)
-    for i in range(numCellData):
-        cdata = data.GetCellData().GetArray(i)
-        dataName = cdata.GetName()
-        # print("Parsing Cell Data", dataName)
-        for j in range(len(con_blocks)):
-            setattr(con_blocks[j], dataName, cdata.GetTuple(j))
-
-    # step 3, member point data
-    numPointData = data.GetPointData().GetNumberOfArrays()
-    # print("Number of PointDataArrays: ", numPointData)
-    for i in range(numPointData):
-        pdata = data.GetPointData().GetArray(i)
-        dataName = pdata.GetName()
-        # print("Parsing Point Data", dataName)
-        for j in range(len(con_blocks)):
-            setattr(con_blocks[j], dataName + "0", pdata.GetTuple(2 * j))
-            setattr(con_blocks[j], dataName + "1", pdata.GetTuple(2 * j + 1))
+    """
+    con_arrays = read_con_block_arrays(fpath)
+    n_obj = con_arrays['end0'].shape[0]
+    # Same values as vtkDataArray.GetTuple would give for every constraint
+    tuples = {name: [tuple(row) for row in arr.reshape(n_obj, -1).tolist()]
+              for name, arr in con_arrays.items()}
 
+    con_blocks = []
+    for i in range(n_obj):
+        cb = con_block()
+        for name, vals in tuples.items():
+            setattr(cb, name, vals[i])
+        con_blocks += [cb]
     return con_blocks
 
 
 def read_stress_from_con(fpath):
-    reader = vtk.vtkXMLPPolyDataReader()
-    reader.SetFileName(str(fpath))
-    reader.Update()
-    data = reader.GetOutput()
+    """!Sum the stress of bilateral and collision constraints of a frame. Only
+    the Stress and bilateral arrays of the file are parsed.
+
+    @param fpath: ConBlock_*.pvtp file path
+    @return: Bilateral and collision 3x3 stress of the frame
 
-    stress_arr = vn.vtk_to_numpy(data.GetCellData().GetVectors('Stress'))
-    bilat_flag_arr = vn.vtk_to_numpy(
-        data.GetCellData().GetVectors('bilateral'))
+    """
+    con_arrays = read_con_block_arrays(fpath,
+                                       cell_arrays=('Stress', 'bilateral'),
+                                       point_arrays=())
+    stress_arr = con_arrays['Stress'].reshape(-1, 9)
+    bilat_flag_arr = con_arrays['bilateral'].reshape(-1)
     collision_stress = stress_arr[bilat_flag_arr ==
                                   0, :].sum(axis=0).reshape((3, 3))
     bilat_stress = stress_arr[bilat_flag_arr ==
                               1, :].sum(axis=0).reshape((3, 3))
     return bilat_stress, collision_stress
 
-    # return stress_arr.sum(axis=0).reshape((3, 3))
-
 
 def read_time(fpaths, h5_data):
     """!Read in data from all protein files
@@ -153,6 +315,121 @@ def read_time(fpaths, h5_data):
     return time_dset
 
 
+def create_sylinder_dset(posit_grp, n_syl, nframes, **dset_kwargs):
+    """!Create the dataset that holds sylinder data of every frame
+
+    @param posit_grp: HDF5 position data group
+    @param n_syl: Number of sylinders
+    @param nframes: Number of frames
+    @param **dset_kwargs: Storage layout arguments passed to create_dataset
+    @return: HDF5 data set for sylinder data
+
+    """
+    sy_dset = posit_grp.create_dataset('sylinders',
+                                       shape=(n_syl, 9, nframes),
+                                       **dset_kwargs)
+    sy_dset.attrs['n_yslinders'] = n_syl
+    sy_dset.attrs['axis dimensions'] = ['sylinders', 'state', 'frame']
+    # Set tubule attribute: names of columns
+    sy_dset.attrs['column labels'] = ['gid', 'radius',
+                                      'minus pos x', 'minus pos y', 'minus pos z',
+                                      'plus pos x', 'plus pos y', 'plus pos z',
+                                      'group', ]
+    return sy_dset
+
+
+def create_protein_dset(posit_grp, nproteins, nframes, **dset_kwargs):
+    """!Create the dataset that holds protein data of every frame
+
+    @param posit_grp: HDF5 position data group
+    @param nproteins: Number of proteins
+    @param nframes: Number of frames
+    @param **dset_kwargs: Storage layout arguments passed to create_dataset
+    @return: HDF5 data set for protein data
+
+    """
+    protein_dset = posit_grp.create_dataset('proteins',
+                                            shape=(nproteins, 10, nframes),
+                                            **dset_kwargs)
+    # Set protein attribute: names of columns
+    protein_dset.attrs['nproteins'] = nproteins
+    protein_dset.attrs['axis dimensions'] = ['protein', 'state', 'frame']
+    protein_dset.attrs['column labels'] = PROTEIN_COLUMN_LABELS
+    return protein_dset
+
+
+def create_split_protein_dsets(posit_grp, nproteins, nframes, id_dset_kwargs,
+                               pos_dset_kwargs, float_dtype='f4'):
+    """!Create the datasets that hold protein data of every frame split into
+    int32 ids and bind IDs and float end positions
+
+    @param posit_grp: HDF5 position data group
+    @param nproteins: Number of proteins
+    @param nframes: Number of frames
+    @param id_dset_kwargs: Storage layout arguments of the id dataset
+    @param pos_dset_kwargs: Storage layout arguments of the position dataset
+    @param float_dtype: Stored dtype of positions
+    @return: HDF5 data sets for protein ids and positions
+
+    """
+    id_dset = posit_grp.create_dataset('protein_ids',
+                                       shape=(nproteins, len(PROTEIN_ID_COLS),
+                                              nframes),
+                                       dtype=np.int32, **id_dset_kwargs)
+    pos_dset = posit_grp.create_dataset('protein_pos',
+                                        shape=(nproteins, len(PROTEIN_POS_COLS),
+                                               nframes),
+                                        dtype=float_dtype, **pos_dset_kwargs)
+    for dset, cols in ((id_dset, PROTEIN_ID_COLS), (pos_dset, PROTEIN_POS_COLS)):
+        dset.attrs['nproteins'] = nproteins
+        dset.attrs['axis dimensions'] = ['protein', 'state', 'frame']
+        dset.attrs['column labels'] = [PROTEIN_COLUMN_LABELS[c] for c in cols]
+    return id_dset, pos_dset
+
+
+def create_protein_dsets(posit_grp, nproteins, nframes, float_dtype='f4',
+                         split_proteins=False, **layout_kwargs):
+    """!Create the protein datasets of a raw data file following a dtype
+    policy
+
+    @param posit_grp: HDF5 position data group
+    @param nproteins: Number of proteins
+    @param nframes: Number of frames
+    @param float_dtype: Stored dtype of floating point data
+    @param split_proteins: Store ids and positions in separate datasets
+    @param **layout_kwargs: Storage layout options (see get_raw_dset_kwargs)
+    @return: List of (data set, columns of protein data it holds) pairs
+
+    """
+    itemsize = np.dtype(float_dtype).itemsize
+    if not split_proteins:
+        return [(create_protein_dset(
+            posit_grp, nproteins, nframes, dtype=float_dtype,
+            **get_raw_dset_kwargs((nproteins, 10, nframes), itemsize=itemsize,
+                                  **layout_kwargs)), slice(None))]
+    id_dset, pos_dset = create_split_protein_dsets(
+        posit_grp, nproteins, nframes,
+        get_raw_dset_kwargs((nproteins, len(PROTEIN_ID_COLS), nframes),
+                            **layout_kwargs),
+        get_raw_dset_kwargs((nproteins, len(PROTEIN_POS_COLS), nframes),
+                            itemsize=itemsize, **layout_kwargs),
+        float_dtype)
+    return [(id_dset, PROTEIN_ID_COLS), (pos_dset, PROTEIN_POS_COLS)]
+
+
+def get_protein_dsets(posit_grp):
+    """!Get the protein datasets of an existing raw data file
+
+    @param posit_grp: HDF5 position data group
+    @return: List of (data set, columns of protein data it holds) pairs
+
+    """
+    if 'protein_ids' in posit_grp:
+        return [(posit_grp['protein_ids'], PROTEIN_ID_COLS),
+                (posit_grp['protein_pos'], PROTEIN_POS_COLS)]
+    return [(posit_grp['proteins'], slice(None))]
+
+
 # @profile
 def read_sylinder_data(syl_paths, posit_grp):
     """!Read in data from all tubule files
@@ -167,20 +444,10 @@ def read_sylinder_data(syl_paths, posit_grp):
     with syl_paths[0].open('r') as sp:
         n_syl = int(sp.readline())
     # Create dataset for MT info
-    sy_dset = posit_grp.create_dataset('sylinders',
-                                       shape=(n_syl, 9, nframes))
-    sy_dset.attrs['n_yslinders'] = n_syl
-    sy_dset.attrs['axis dimensions'] = ['sylinders', 'state', 'frame']
-    # Set tubule attribute: names of columns
-    sy_dset.attrs['column labels'] = ['gid', 'radius',
-                                      'minus pos x', 'minus pos y', 'minus pos z',
-                                      'plus pos x', 'plus pos y', 'plus pos z',
-                                      'group', ]
+    sy_dset = create_sylinder_dset(posit_grp, n_syl, nframes)
     for frame, syl_path in tqdm(enumerate(syl_paths), total=len(syl_paths), disable=True):
-        filaments = read_dat_sylinder(syl_path)
-        data_arr = [fil.get_dat()
-                    for fil in filaments if (fil.fil_type == 'C' or fil.fil_type == 'S')]
-        sy_dset[:, :, frame] = np.asarray(data_arr, dtype='f8')
+        with syl_path.open('rb') as sp:
+            _, sy_dset[:, :, frame] = parse_sylinder_ascii(sp.read())
     return sy_dset
 
 
@@ -197,64 +464,348 @@ def read_protein_data(xlp_paths, posit_grp):
         nproteins = int(xp.readline())
 
     # Create dataset for protein info (input shape)
-    protein_dset = posit_grp.create_dataset('proteins',
-                                            shape=(nproteins, 10, nframes),
-                                            )
-    # Set protein attribute: names of columns
-    protein_dset.attrs['nproteins'] = nproteins
-    protein_dset.attrs['axis dimensions'] = ['protein', 'state', 'frame']
-    protein_dset.attrs['column labels'] = ['gid', 'tag',
-                                           'end1 pos x', 'end1 pos y', 'end1 pos z',
-                                           'end2 pos x', 'end2 pos y', 'end2 pos z',
-                                           'end1 bindID', 'end2 bindID']
+    protein_dset = create_protein_dset(posit_grp, nproteins, nframes)
     # Loop over files adding to h5_data
     for frame, xlp_path in tqdm(enumerate(xlp_paths), total=len(xlp_paths), disable=True):
-        # for frame, xlp_path in enumerate(xlp_paths):
-        xlps = read_dat_xlp(xlp_path)
-        data_arr = [p.get_dat() for p in xlps]
-        protein_dset[:, :, frame] = np.asarray(data_arr, dtype='f8')
+        with xlp_path.open('rb') as xp:
+            _, protein_dset[:, :, frame] = parse_protein_ascii(xp.read())
 
     return protein_dset
 
 
-def read_constraint_data(cons_fnames, h5_data):
-    """!Read in data from constraint files
+def read_frame_data(syl_path, xlp_path):
+    """!Read and parse the sylinder and protein files of a single frame. Each
+    file is read exactly once and the time is taken from the sylinder header.
+
+    @param syl_path: SylinderAscii file path
+    @param xlp_path: ProteinAscii file path
+    @return: Time, sylinder and protein data arrays of the frame and the
+             number of bytes read
+
+    """
+    with syl_path.open('rb') as sp:
+        syl_buf = sp.read()
+    with xlp_path.open('rb') as xp:
+        xlp_buf = xp.read()
+    frame_time, syl_arr = parse_sylinder_ascii(syl_buf)
+    _, xlp_arr = parse_protein_ascii(xlp_buf)
+    return frame_time, syl_arr, xlp_arr, len(syl_buf) + len(xlp_buf)
+
+
+def iter_pool_map(func, arg_tuples, workers=1, frame_window=None):
+    """Yield func(*args) for every tuple of arguments in order.
+
+    With more than one worker, calls are run by a process pool. At most
+    `frame_window` calls are submitted but not yet consumed at any time so
+    peak memory stays bounded no matter how slow the consumer is.
+
+    Parameters
+    ----------
+    func : callable
+        Picklable function to call
+    arg_tuples : iterable of tuples
+        Arguments of every call
+    workers : int, optional
+        Number of processes, by default 1 (call in this process)
+    frame_window : int, optional
+        Maximum number of calls in flight, by default 4 * workers
+
+    Yields
+    ------
+    object
+        Return value of every call
+    """
+    arg_tuples = iter(arg_tuples)
+    if workers <= 1:
+        for args in arg_tuples:
+            yield func(*args)
+        return
+
+    if frame_window is None:
+        frame_window = 4 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque(pool.submit(func, *args)
+                        for args in islice(arg_tuples, max(frame_window, 1)))
+        while pending:
+            result = pending.popleft().result()
+            # Keep the window full before handing the result to the consumer
+            for args in islice(arg_tuples, 1):
+                pending.append(pool.submit(func, *args))
+            yield result
+
+
+def iter_frame_data(syl_paths, xlp_paths, workers=1, frame_window=None):
+    """Yield the parsed sylinder and protein data of every frame in order.
+
+    Parameters
+    ----------
+    syl_paths : list of Paths
+        Sorted SylinderAscii file paths
+    xlp_paths : list of Paths
+        Sorted ProteinAscii file paths
+    workers : int, optional
+        Number of parsing processes, by default 1 (parse in this process)
+    frame_window : int, optional
+        Maximum number of frames in flight, by default 4 * workers
+
+    Yields
+    ------
+    (float, ndarray, ndarray, int)
+        Time, sylinder and protein data of a frame and the number of bytes
+        read for it
+    """
+    try:
+        yield from iter_pool_map(read_frame_data, zip(syl_paths, xlp_paths),
+                                 workers, frame_window)
+    finally:
+        # Archive handles of frames read in this process. Those of pool
+        # workers are closed when the workers exit.
+        close_zip_handles()
+
+
+def read_frame_data_to_hdf(syl_paths, xlp_paths, posit_grp, workers=1,
+                           frame_window=None, float_dtype='f4',
+                           split_proteins=False, bind_events=False,
+                           **layout_kwargs):
+    """!Read in sylinder and protein data of all frames, optionally using a
+    pool of parsing processes. This process is the only one writing to the
+    HDF5 file and writes frames in order, so the result does not depend on
+    the number of workers. With a contiguous layout and default dtypes it is
+    identical to read_sylinder_data followed by read_protein_data.
+
+    @param syl_paths: List of sylinder posit file paths
+    @param xlp_paths: List of protein posit file paths
+    @param posit_grp: HDF5 position data group
+    @param workers: Number of parsing processes
+    @param frame_window: Maximum number of parsed frames held in memory
+    @param float_dtype: Stored dtype of floating point data ('f4' or 'f8')
+    @param split_proteins: Store protein ids and bind IDs as int32 separately
+           from protein positions
+    @param bind_events: Also store protein binding as an event log in the
+           bind_events group of the file
+    @param **layout_kwargs: Storage layout options (see get_raw_dset_kwargs)
+    @return: HDF5 data sets containing sylinder data and list of protein data
+             sets, list of frame times and list of bytes read per frame
+
+    """
+    if len(syl_paths) != len(xlp_paths):
+        raise ValueError(
+            f'Number of sylinder ({len(syl_paths)}) and protein '
+            f'({len(xlp_paths)}) files do not match.')
+    nframes = len(syl_paths)
+    frames = iter_frame_data(syl_paths, xlp_paths, workers, frame_window)
+    # Dataset shapes come from the first parsed frame so no file is opened
+    # twice.
+    first_frame = next(frames)
+    n_syl = first_frame[1].shape[0]
+    nproteins = first_frame[2].shape[0]
+
+    sy_dset = create_sylinder_dset(
+        posit_grp, n_syl, nframes, dtype=float_dtype,
+        **get_raw_dset_kwargs((n_syl, 9, nframes),
+                              itemsize=np.dtype(float_dtype).itemsize,
+                              **layout_kwargs))
+    protein_dsets = create_protein_dsets(posit_grp, nproteins, nframes,
+                                         float_dtype, split_proteins,
+                                         **layout_kwargs)
+    sy_writer = FrameBlockWriter(sy_dset)
+    protein_writers = [(FrameBlockWriter(dset), cols)
+                       for dset, cols in protein_dsets]
+    if bind_events:
+        protein_writers += [(BindEventWriter.create(posit_grp.file, nproteins),
+                             PROTEIN_BIND_COLS)]
+    frame_times = []
+    frame_nbytes = []
+    for frame_time, syl_arr, xlp_arr, nbytes in chain([first_frame], frames):
+        sy_writer.write(syl_arr)
+        for writer, cols in protein_writers:
+            writer.write(xlp_arr[:, cols])
+        frame_times += [frame_time]
+        frame_nbytes += [nbytes]
+    sy_writer.flush()
+    for writer, _ in protein_writers:
+        writer.flush()
+
+    return (sy_dset, [dset for dset, _ in protein_dsets], frame_times,
+            frame_nbytes)
+
+
+def print_read_stats(frame_nbytes, seconds):
+    """!Report how much frame data was read and how fast
+
+    @param frame_nbytes: List of bytes read per frame
+    @param seconds: Time spent reading and writing the frames
+    @return: void
+
+    """
+    nframes = max(len(frame_nbytes), 1)
+    total = sum(frame_nbytes)
+    print(f"Read {total / 2**20:.4g} MiB from {len(frame_nbytes)} frames "
+          f"({total / nframes / 2**10:.4g} KiB per frame, "
+          f"{total / 2**20 / max(seconds, 1e-9):.4g} MiB/s).")
+
+
+def read_constraint_data(cons_fnames, h5_data, workers=1, frame_window=None,
+                         float_dtype='f8'):
+    """!Read in data from constraint files, optionally using a pool of
+    parsing processes. Stress of every frame is stored in chunked
+    (3 x 3 x frames) datasets written a chunk of frames at a time.
 
     @param cons_fnames: List constraint file names
     @param h5_data: HDF5 data file to add stress
-    @return: HDF5 data set containing tubule data
+    @param workers: Number of parsing processes
+    @param frame_window: Maximum number of parsed frames held in memory
+    @param float_dtype: Stored dtype of the stress, 'f4' or 'f8'
+    @return: HDF5 data sets containing bilateral and collision stress
 
     """
+    if float_dtype not in RAW_FLOAT_DTYPES:
+        raise ValueError(f'Unknown float dtype "{float_dtype}". '
+                         f'Options are {RAW_FLOAT_DTYPES}.')
     nframes = len(cons_fnames)
-    bi_dset = h5_data.create_dataset('bilateral_stress',
-                                     shape=(3, 3, nframes))
-    col_dset = h5_data.create_dataset('collision_stress',
-                                      shape=(3, 3, nframes))
+    dset_kwargs = get_raw_dset_kwargs(
+        (3, 3, nframes), layout='chunked',
+        itemsize=np.dtype(float_dtype).itemsize)
+    bi_dset = h5_data.create_dataset('bilateral_stress', shape=(3, 3, nframes),
+                                     dtype=float_dtype, **dset_kwargs)
+    col_dset = h5_data.create_dataset('collision_stress', shape=(3, 3, nframes),
+                                      dtype=float_dtype, **dset_kwargs)
     bi_dset.attrs['axis labels'] = ['dim', 'dim', 'frame']
     col_dset.attrs['axis labels'] = ['dim', 'dim', 'frame']
-    for frame, tfname in enumerate(cons_fnames):
-        collision_stress, bilateral_stress = read_stress_from_con(tfname)
-        # print(f'Step {frame}: {collision_stress.flatten()}')
-        col_dset[:, :, frame] = collision_stress
-        bi_dset[:, :, frame] = bilateral_stress
+    h5_data.create_dataset('frame_number', data=get_frame_numbers(cons_fnames),
+                           dtype='i8')
+
+    bi_writer = FrameBlockWriter(bi_dset)
+    col_writer = FrameBlockWriter(col_dset)
+    for bilateral_stress, collision_stress in iter_pool_map(
+            read_stress_from_con, ((fp,) for fp in cons_fnames),
+            workers, frame_window):
+        col_writer.write(collision_stress)
+        bi_writer.write(bilateral_stress)
+    col_writer.flush()
+    bi_writer.flush()
 
     return bi_dset, col_dset
 
 
-def collect_stress_from_con_pvtp(fname="stress.h5", path=Path('.')):
+def collect_stress_from_con_pvtp(fname="stress.h5", path=Path('.'), workers=1,
+                                 frame_window=None, float_dtype='f8'):
+    """Collect the bilateral and collision stress of every frame from the
+    ConBlock files of a simulation.
+
+    Parameters
+    ----------
+    fname : str, optional
+        Name of the stress HDF5 file, by default "stress.h5"
+    path : Path object, optional
+        The seed directory of the simulation, by default Path('.')
+    workers : int, optional
+        Number of processes parsing ConBlock files, by default 1
+    frame_window : int, optional
+        Maximum number of parsed frames waiting to be written, by default
+        4 * workers
+    float_dtype : str, optional
+        Stored dtype of the stress, 'f4' or 'f8', by default 'f8'
+
+    Raises
+    ------
+    FileNotFoundError
+        If the simulation has no result directory.
+    """
     result_dir = path / 'result'
     if not result_dir.exists():
         raise FileNotFoundError(
             f'Result directory {str(result_dir)} does not exist.')
 
     with h5py.File(fname, 'w') as h5_data:
-        con_dat_paths = sorted(result_dir.glob("**/ConBlock*.pvtp"),
-                               key=get_file_number)
-        bi_dset, col_dset = read_constraint_data(con_dat_paths, h5_data)
-        t4 = time.time()
+        con_dat_paths = get_frame_files(result_dir, 'ConBlock', 'pvtp')
+        bi_dset, col_dset = read_constraint_data(con_dat_paths, h5_data,
+                                                 workers, frame_window,
+                                                 float_dtype)
+
+
+def get_result_frame_paths(path):
+    """Find the sorted SylinderAscii and ProteinAscii files of a simulation
+    in either its result directory or result.zip archive.
+
+    Parameters
+    ----------
+    path : Path object
+        The seed directory of the simulation
 
+    Returns
+    -------
+    (list, list, bool)
+        Sylinder file paths, protein file paths and whether the paths point
+        into a zip archive
 
-def convert_dat_to_hdf(fname="raw_data.h5", path=Path('.'), store_stress=False):
+    Raises
+    ------
+    OSError
+        If neither result.zip file or result directory do not exist, raise error.
+    """
+    if (path / 'result').exists():
+        result_dir = path / 'result'
+        sy_dat_paths = get_frame_files(result_dir, 'SylinderAscii')
+        xlp_dat_paths = get_frame_files(result_dir, 'ProteinAscii')
+        return sy_dat_paths, xlp_dat_paths, False
+
+    if (path / 'result.zip').exists():
+        # Members are read by each parsing process with its own handle
+        sy_dat_paths, xlp_dat_paths = get_zip_frame_paths(path / 'result.zip')
+        return sy_dat_paths, xlp_dat_paths, True
+
+    raise OSError(f'Could not find result directory or zipfile in {path}.')
+
+
+def get_frame_numbers(frame_paths):
+    """!Get frame numbers from file names of directory or zip archive paths
+
+    @param frame_paths: List of frame file paths
+    @return: List of frame numbers
+
+    """
+    return [get_file_number(fp.name) for fp in frame_paths]
+
+
+def check_run_config(h5_data, path):
+    """Make sure the RunConfig.yaml of a simulation matches the one stored in
+    a raw data file.
+
+    @param h5_data Raw data HDF5 file
+    @param path Seed directory of the simulation
+    @return: void
+
+    """
+    with (path / 'RunConfig.yaml').open('r') as rc_file:
+        rc_params = yaml.safe_load(rc_file)
+    if yaml.safe_load(h5_data.attrs['RunConfig']) != rc_params:
+        raise ValueError(
+            f'RunConfig.yaml in {path} differs from the one stored in '
+            f'{h5_data.filename}. Not appending.')
+
+
+@contextmanager
+def create_hdf_atomic(fname):
+    """Create an hdf5 file under a temporary name that is renamed to fname
+    only when the block finishes. On an error the temporary file is removed,
+    so no partial file is left for later appends to trip over."""
+    fname = Path(fname)
+    tmp_path = fname.with_name(f'.{fname.name}.tmp')
+    try:
+        with h5py.File(tmp_path, 'w') as h5_data:
+            yield h5_data
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    tmp_path.replace(fname)
+
+
+def convert_dat_to_hdf(fname="raw_data.h5", path=Path('.'), store_stress=False,
+                       workers=1, frame_window=None, layout='contiguous',
+                       compression=None, compression_opts=None, shuffle=False,
+                       resizable=False, float_dtype='f4', split_proteins=False,
+                       bind_events=False, frame_paths=None):
     """Convert separate ascii and vtk data files into a single hdf5 file
 
     Parameters
@@ -265,40 +816,63 @@ def convert_dat_to_hdf(fname="raw_data.h5", path=Path('.'), store_stress=False):
         The seed directory of the simulation, by default Path('.')
     store_stress : bool, optional
         Should you spend the space to store the stress calculated in the system, by default False
+    workers : int, optional
+        Number of processes parsing frames, by default 1. Frames are always
+        written in order by this process so the file does not depend on the
+        number of workers.
+    frame_window : int, optional
+        Maximum number of parsed frames waiting to be written when using more
+        than one worker, by default 4 * workers
+    layout : str, optional
+        Storage layout of the raw_data datasets, 'contiguous' or 'chunked'
+        (chunks of consecutive frames and bead windows), by default
+        'contiguous'
+    compression : str, optional
+        Built-in HDF5 compression filter ('gzip' or 'lzf') for a chunked
+        layout, by default None
+    compression_opts : int, optional
+        Compression level for gzip, by default None
+    shuffle : bool, optional
+        Apply the shuffle filter for a chunked layout, by default False
+    resizable : bool, optional
+        Create the frame datasets so they can grow along the frame axis and
+        be appended to with append_dat_to_hdf. Requires a chunked layout.
+        By default False
+    float_dtype : str, optional
+        Stored dtype of sylinder data and protein positions, 'f4' or 'f8',
+        by default 'f4'
+    split_proteins : bool, optional
+        Store protein gids, tags and bind IDs as int32 in raw_data/protein_ids
+        and end positions in raw_data/protein_pos instead of everything in
+        raw_data/proteins. Bind ID reads (e.g. connectivity analysis) then
+        only touch a fifth of the protein data. By default False
+    bind_events : bool, optional
+        Also store protein binding as an event log of bind ID changes with
+        periodic checkpoints (see bind_events.BindEventLog), by default False
+    frame_paths : (list, list), optional
+        Sylinder and protein paths of the frames to collect (e.g. the complete
+        frames of a running simulation), by default all frames of path
 
     Raises
     ------
     OSError
         If neither result.zip file or result directory do not exist, raise error.
     """
-    if (path / 'result').exists():
-        result_dir = path / 'result'
-        is_zip = False
-    elif (path / 'result.zip').exists():
-        result_zip = zipfile.ZipFile(path / 'result.zip')
-        result_path = zipfile.Path(path / 'result.zip')
-        is_zip = True
-    else:
-        raise OSError(f'Could not find result directory or zipfile in {path}.')
+    # Get paths (depends on if you are using zip archive or not)
+    if frame_paths is None:
+        frame_paths = get_result_frame_paths(path)[:2]
+    sy_dat_paths, xlp_dat_paths = frame_paths
+    # Fail before any work is done if the layout is not possible
+    _ = get_raw_dset_kwargs((1, 1, 1), layout=layout, compression=compression,
+                            compression_opts=compression_opts,
+                            shuffle=shuffle, resizable=resizable)
+    if float_dtype not in RAW_FLOAT_DTYPES:
+        raise ValueError(f'Unknown float dtype "{float_dtype}". '
+                         f'Options are {RAW_FLOAT_DTYPES}.')
+    frame_dset_kwargs = {'maxshape': (None,)} if resizable else {}
 
     # Open raw h5 data objec to write to
-    with h5py.File(fname, 'w') as h5_data:
-        # Get paths (depends on if you are using zip archive or not)
-        if is_zip:
-            sy_reg = re.compile(r'.*SylinderAscii.*.dat')
-            sy_dat_paths = sorted(list(filter(sy_reg.search, result_zip.namelist())),
-                                  key=get_file_number)
-            sy_dat_paths = [result_path / f for f in sy_dat_paths]
-
-            xlp_reg = re.compile(r'.*ProteinAscii.*.dat')
-            xlp_dat_paths = sorted(list(filter(xlp_reg.search, result_zip.namelist())),
-                                   key=get_file_number)
-            xlp_dat_paths = [result_path / f for f in xlp_dat_paths]
-        else:
-            sy_dat_paths = sorted(result_dir.glob("**/SylinderAscii*.dat"),
-                                  key=get_file_number)
-            xlp_dat_paths = sorted(result_dir.glob("**/ProteinAscii*.dat"),
-                                   key=get_file_number)
+    with create_hdf_atomic(fname) as h5_data:
 
         # assert(len(protein_fnames) == len(tubule_fnames))
         with (path / 'RunConfig.yaml').open('r') as rc_file:
@@ -309,24 +883,28 @@ def convert_dat_to_hdf(fname="raw_data.h5", path=Path('.'), store_stress=False):
             xlp_params = yaml.safe_load(xlp_file)
             h5_data.attrs['ProteinConfig'] = yaml.dump(xlp_params)
 
-        # Make time array
         t0 = time.time()
-        time_dset = read_time(sy_dat_paths, h5_data)
-        t1 = time.time()
-        print(f"Made time data set in {t1-t0} seconds.")
+        frame_num_dset = h5_data.create_dataset(
+            'frame_number', data=get_frame_numbers(sy_dat_paths), dtype='i8',
+            **frame_dset_kwargs)
 
         # Create group of position data
         posit_grp = h5_data.create_group('raw_data')
 
-        # Make sylinder data
-        sy_dset = read_sylinder_data(sy_dat_paths, posit_grp)
-        t2 = time.time()
-        print(f"Made sylinder data set in {t2-t1} seconds.")
-
-        # Make protein data
-        xlp_dset = read_protein_data(xlp_dat_paths, posit_grp)
+        # Make sylinder and protein data and time array from a single read
+        # of every frame
+        sy_dset, xlp_dsets, frame_times, frame_nbytes = read_frame_data_to_hdf(
+            sy_dat_paths, xlp_dat_paths, posit_grp, workers, frame_window,
+            float_dtype=float_dtype, split_proteins=split_proteins,
+            bind_events=bind_events, layout=layout, compression=compression,
+            compression_opts=compression_opts, shuffle=shuffle,
+            resizable=resizable)
+        time_dset = h5_data.create_dataset('time', data=frame_times,
+                                           **frame_dset_kwargs)
         t3 = time.time()
-        print(f"Made protin data set in {t3-t2} seconds.")
+        print(f"Made time, sylinder and protein data sets with {workers} "
+              f"worker(s) in {t3-t0} seconds.")
+        print_read_stats(frame_nbytes, t3 - t0)
 
         # Make stress data
         # if not is_zip:
@@ -354,6 +932,179 @@ def convert_dat_to_hdf(fname="raw_data.h5", path=Path('.'), store_stress=False):
         print(f"Made raw data file in a total of {t-t0} seconds.")
 
 
+def append_frames_to_hdf(h5_data, syl_paths, xlp_paths, frame_nums,
+                         workers=1, frame_window=None):
+    """Append the given frames to the resizable datasets of an open raw data
+    file.
+
+    Parameters
+    ----------
+    h5_data : h5py.File
+        Raw data file opened for writing
+    syl_paths : list of Paths
+        SylinderAscii file paths of the new frames in order
+    xlp_paths : list of Paths
+        ProteinAscii file paths of the new frames in order
+    frame_nums : list of ints
+        Frame numbers of the new frames
+    workers : int, optional
+        Number of processes parsing frames, by default 1
+    frame_window : int, optional
+        Maximum number of parsed frames waiting to be written, by default
+        4 * workers
+
+    Returns
+    -------
+    (int, list)
+        Number of appended frames and bytes read per frame
+
+    Raises
+    ------
+    ValueError
+        If the datasets can not be resized or the gids of a new frame do not
+        match the stored ones. Frames before the offending one are kept.
+    """
+    time_dset = h5_data['time']
+    frame_num_dset = h5_data['frame_number']
+    sy_dset = h5_data['raw_data/sylinders']
+    xlp_dsets = get_protein_dsets(h5_data['raw_data'])
+    frame_dsets = [time_dset, frame_num_dset, sy_dset] + \
+        [dset for dset, _ in xlp_dsets]
+    for dset in frame_dsets:
+        if dset.maxshape[-1] is not None:
+            raise ValueError(
+                f'Dataset {dset.name} of {h5_data.filename} can not be '
+                'resized. Collect again with --append or re-layout the file '
+                'with raw_data_layout --resizable.')
+
+    n_old = sy_dset.shape[-1]
+    sy_gids = sy_dset[:, 0, n_old - 1]
+    # Gids are the first column of both unsplit and split protein data
+    xlp_gids = xlp_dsets[0][0][:, 0, n_old - 1]
+
+    for dset in frame_dsets:
+        dset.resize(n_old + len(frame_nums), axis=dset.ndim - 1)
+    sy_writer = FrameBlockWriter(sy_dset, start_frame=n_old)
+    xlp_writers = [(FrameBlockWriter(dset, start_frame=n_old), cols)
+                   for dset, cols in xlp_dsets]
+    if BIND_EVENTS_GRP in h5_data:
+        xlp_writers += [(BindEventWriter(h5_data[BIND_EVENTS_GRP]),
+                         PROTEIN_BIND_COLS)]
+    frame_times = []
+    frame_nbytes = []
+    try:
+        for i, (frame_time, syl_arr, xlp_arr, nbytes) in enumerate(
+                iter_frame_data(syl_paths, xlp_paths, workers, frame_window)):
+            if not (np.array_equal(syl_arr[:, 0], sy_gids)
+                    and np.array_equal(xlp_arr[:, 0], xlp_gids)):
+                raise ValueError(
+                    f'Gids of frame {frame_nums[i]} differ from those stored '
+                    f'in {h5_data.filename}. Not appending.')
+            sy_writer.write(syl_arr)
+            for writer, cols in xlp_writers:
+                writer.write(xlp_arr[:, cols])
+            frame_times += [frame_time]
+            frame_nbytes += [nbytes]
+    finally:
+        # Keep every frame that was parsed and checked, drop the rest
+        sy_writer.flush()
+        for writer, _ in xlp_writers:
+            writer.flush()
+        n_total = sy_writer.frame
+        for dset in frame_dsets:
+            dset.resize(n_total, axis=dset.ndim - 1)
+        n_new = n_total - n_old
+        if n_new:
+            time_dset[n_old:] = frame_times[:n_new]
+            frame_num_dset[n_old:] = frame_nums[:n_new]
+    return n_new, frame_nbytes
+
+
+def append_dat_to_hdf(fname="raw_data.h5", path=Path('.'), workers=1,
+                      frame_window=None, frame_paths=None, **layout_kwargs):
+    """Append frames written since the last collection to a raw data file.
+
+    The frame number of the last ingested frame is read from the file and only
+    SylinderAscii/ProteinAscii files with larger frame numbers are parsed.
+    If the raw data file does not exist yet, all frames are collected into a
+    file with resizable (chunked) datasets.
+
+    Parameters
+    ----------
+    fname : str, optional
+        Name of the raw data file, by default "raw_data.h5"
+    path : Path object, optional
+        The seed directory of the simulation, by default Path('.')
+    workers : int, optional
+        Number of processes parsing frames, by default 1
+    frame_window : int, optional
+        Maximum number of parsed frames waiting to be written, by default
+        4 * workers
+    frame_paths : (list, list), optional
+        Sylinder and protein paths of the frames to consider (e.g. the
+        complete frames found by follow_funcs.ResultDirWatcher), by default
+        all frames of path
+    **layout_kwargs
+        Layout options used when the raw data file is created (see
+        convert_dat_to_hdf). A chunked layout is used by default.
+
+    Returns
+    -------
+    int
+        Number of appended frames
+
+    Raises
+    ------
+    ValueError
+        If the datasets can not be resized, the RunConfig.yaml of the
+        simulation differs from the stored one or the gids of new frames do
+        not match the stored ones.
+    """
+    if not Path(fname).exists():
+        print(f"{fname} does not exist yet. Collecting all frames.")
+        layout_kwargs.setdefault('layout', 'chunked')
+        convert_dat_to_hdf(fname, path, workers=workers,
+                           frame_window=frame_window, resizable=True,
+                           frame_paths=frame_paths, **layout_kwargs)
+        with h5py.File(fname, 'r') as h5_data:
+            return h5_data['time'].size
+
+    t0 = time.time()
+    if frame_paths is None:
+        frame_paths = get_result_frame_paths(path)[:2]
+    sy_dat_paths, xlp_dat_paths = frame_paths
+    frame_nums = get_frame_numbers(sy_dat_paths)
+    if frame_nums != get_frame_numbers(xlp_dat_paths):
+        raise ValueError('Sylinder and protein frame numbers do not match.')
+
+    with h5py.File(fname, 'a') as h5_data:
+        check_run_config(h5_data, path)
+        n_old = h5_data['raw_data/sylinders'].shape[-1]
+        if 'frame_number' not in h5_data:
+            # Files collected before frame numbers were stored hold the first
+            # frames in sorted order.
+            stored_nums = get_frame_numbers(
+                get_result_frame_paths(path)[0])[:n_old]
+            h5_data.create_dataset('frame_number', data=stored_nums,
+                                   dtype='i8', maxshape=(None,))
+        frame_num_dset = h5_data['frame_number']
+
+        new_inds = [i for i, num in enumerate(frame_nums)
+                    if num > frame_num_dset[-1]]
+        if not new_inds:
+            print(f"No new frames to append to {fname}.")
+            return 0
+        n_new, frame_nbytes = append_frames_to_hdf(
+            h5_data, [sy_dat_paths[i] for i in new_inds],
+            [xlp_dat_paths[i] for i in new_inds],
+            [frame_nums[i] for i in new_inds], workers, frame_window)
+
+    t1 = time.time()
+    print(f"Appended {n_new} frames to {fname} in {t1 - t0} seconds.")
+    print_read_stats(frame_nbytes, t1 - t0)
+    return n_new
+
+
 ##########################################
 if __name__ == "__main__":
     print("Not implemented.")
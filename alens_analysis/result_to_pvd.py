@@ -2,15 +2,16 @@ import re
 import os
 from pathlib import Path
 
+from .frame_manifest import get_frame_files
+
 
 def getFrameNumber_lambda(filename): return int(
     re.search('_([^_.]+)(?:\.[^_]*)?$', str(filename)).group(1))
 
 
 def result_to_pvd(path, name, ext):
-    FileList = list(path.glob(f'./result*/{name}_*.{ext}'))
-    # sort as numerical order
-    FileList.sort(key=getFrameNumber_lambda)
+    # Sorted in numerical order by the frame manifest
+    FileList = get_frame_files(path, name, ext)
     with open(path / f'{name}{ext}.pvd', "w") as fpvd:
         fpvd.write(
             '<VTKFile type="Collection" version="1.0" byte_order="LittleEndian" header_type="UInt64"> \n')
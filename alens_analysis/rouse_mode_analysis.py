@@ -11,6 +11,8 @@ Description:
 import numpy as np
 import torch
 
+from .autocorr import fft_autocorr
+
 
 def get_rouse_modes_at_t(pos_arr, n_modes=20):
     """TODO: Docstring for get_rouse_modes.
@@ -62,18 +64,7 @@ def get_rouse_mode_corr(mode_mat):
     @return: TODO
 
     """
-    nsteps = mode_mat.shape[-1]
-    nmodes = mode_mat.shape[0]
-    mode_corr = np.zeros((nmodes, nsteps))
-    print(mode_corr.shape)
-
-    for t in range(nsteps):
-        for j in range(nsteps - t):
-            mode_corr[:, t] += np.einsum('ij,ij->i', mode_mat[:, :, t + j],
-                                         mode_mat[:, :, j])
-        mode_corr[:, t] /= (nsteps - t)
-
-    return mode_corr
+    return fft_autocorr(mode_mat)
 
 
 def next_pow_two(n):
@@ -103,22 +94,17 @@ def next_pow_two(n):
 #     return mode_corr
 
 def get_rouse_mode_corr_fast(mode_mat, device='cpu'):
-    """Get the autocorrelation function of rouse modes using fftw.
+    """Get the autocorrelation function of rouse modes using a zero padded
+    FFT (see fft_autocorr). Only the first half of the lags, which are
+    averaged over at least half of the time origins, is returned.
 
     @param mode_mat TODO
     @return: TODO
 
     """
-    tmode_mat = torch.from_numpy(mode_mat).to(device)
-    nsteps = tmode_mat.shape[-1]
-    # n = next_pow_two(nsteps)
-
-    # Compute the FFT and then (from that) the auto-correlation function
-    f = torch.fft.fftn(tmode_mat, dim=[-1], norm='forward')
-    power_spec = torch.einsum('ijk,ijk->ik', f, torch.conj(f))
-    n_pos_vals = int(power_spec.size(-1)/2)
-    mode_corr = torch.fft.ifftn(
-        power_spec, norm='forward', dim=[-1])[:, :nsteps].real
+    tmode_mat = torch.from_numpy(mode_mat)
+    n_pos_vals = int(tmode_mat.shape[-1] / 2)
+    mode_corr = fft_autocorr(tmode_mat, device=device)
 
     return mode_corr[:, :n_pos_vals]
 
@@ -4,10 +4,11 @@ import matplotlib.pyplot as plt
 import scipy.special as ss
 
 import os
-import glob
 import argparse
 import re
 
+import Util.aLENS as am
+
 outputName = 'AsciiOrientOrder'
 
 parser = argparse.ArgumentParser(
@@ -20,10 +21,6 @@ meanWindow = args.window
 print('mean window: ', meanWindow)
 
 
-def getFrameNumber_lambda(filename): return int(
-    re.search('_([^_.]+)(?:\.[^_]*)?$', filename).group(1))
-
-
 class Tubule:
     def __init__(self, linestring):
         data = linestring.split()
@@ -87,10 +84,7 @@ def orientOrder(frame):
     return np.hstack([S, polarOrder, nematicOrder.flatten()])
 
 
-files = glob.glob('./result/result*/SylinderAscii_*.dat')
-# sort as numerical order
-files.sort(key=getFrameNumber_lambda)
-print(files)
+files = am.getFileListSorted('./result/result*/SylinderAscii_*.dat')
 
 
 data = []
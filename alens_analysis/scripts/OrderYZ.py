@@ -1,7 +1,6 @@
 import yaml
 import sys
 import vtk
-import glob
 import re
 import os
 import argparse
@@ -14,6 +13,8 @@ import matplotlib as mpl
 import matplotlib.pyplot as plt
 import h5py
 
+import Util.aLENS as am
+
 parser = argparse.ArgumentParser()
 # parser.add_argument('pbcX', type=float, help='periodic bc length along X')
 # parser.add_argument('pbcY', type=float, help='periodic bc length along Y')
@@ -312,15 +313,8 @@ class Frame:
             print('*************************************')
 
 
-def getFrameNumber_lambda(filename): return int(
-    re.search('_([^_.]+)(?:\.[^_]*)?$', filename).group(1))
-
-
 def genEndHistory():
-    SylinderFileList = glob.glob('./result*/Sylinder_*.pvtp')
-    # sort as numerical order
-    SylinderFileList.sort(key=getFrameNumber_lambda)
-    print(SylinderFileList)
+    SylinderFileList = am.getFileListSorted('./result*/Sylinder_*.pvtp')
 
     endHistory = []
     frame = Frame(SylinderFileList[0])
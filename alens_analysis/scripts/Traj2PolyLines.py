@@ -5,7 +5,6 @@ import scipy.optimize as so
 import matplotlib.pyplot as plt
 from numpy.lib.recfunctions import structured_to_unstructured
 import h5py
-import glob
 import pyvista as pv
 import vtk
 import Util.aLENS as am
@@ -76,8 +75,9 @@ def mergePolyline():
     '''merge all vtk polylines into a single file'''
     reader = vtk.vtkXMLPolyDataReader()
     append = vtk.vtkAppendPolyData()
-    filenames = glob.glob(
-        foldername+'/TrajVTK_*_{:d}_{:d}.vtp'.format(args.start, args.end))
+    filenames = am.getFileListSorted(
+        foldername+'/TrajVTK_*_{:d}_{:d}.vtp'.format(args.start, args.end),
+        info=False)
     for file in filenames:
         reader.SetFileName(file)
         reader.Update()
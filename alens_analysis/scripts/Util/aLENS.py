@@ -158,8 +158,18 @@ def getFrameNumber_lambda(filename): return int(
 
 
 def getFileListSorted(files, info=True):
-    files = glob.glob(files)
-    files.sort(key=getFrameNumber_lambda)
+    # Frame file patterns are answered from the frame manifest in
+    # ../analysis if the alens_analysis package is available
+    try:
+        from alens_analysis.frame_manifest import glob_frame_files
+        manifest_files = glob_frame_files(files)
+    except (ImportError, OSError):
+        manifest_files = None
+    if manifest_files is not None:
+        files = manifest_files
+    else:
+        files = glob.glob(files)
+        files.sort(key=getFrameNumber_lambda)
     if info:
         print(files)
     return files
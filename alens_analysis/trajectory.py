@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: trajectory.py
+Description: Lazy accessor of the sylinder trajectory stored in raw_data.h5
+files with memoized derived arrays.
+"""
+
+from pathlib import Path
+
+import h5py
+import numpy as np
+import yaml
+
+# Columns of raw_data/sylinders
+GID_COL = 0
+RADIUS_COL = 1
+MINUS_COLS = slice(2, 5)
+PLUS_COLS = slice(5, 8)
+
+
+class Trajectory():
+
+    """Read-only view of a window of beads and frames of raw_data.h5.
+
+    Arrays are only read from the file when first used and then kept, so
+    every analysis working on the same Trajectory shares one read. Bead and
+    frame windows are read as HDF5 hyperslabs containing only the columns a
+    quantity needs. Windows made with `window` share the cache of the
+    trajectory they came from and are sliced out of already loaded arrays
+    when possible.
+
+    Trajectory also forwards item access and `attrs` to the HDF5 file, so it
+    can be passed to functions written for an open raw data file.
+    """
+
+    def __init__(self, h5_data, ts_range=(0, None), bead_range=(0, None)):
+        """Open a trajectory of a raw data file.
+
+        @param h5_data Open raw data h5py.File or path to one
+        @param ts_range (start, end) frame indices of the window
+        @param bead_range (start, end) bead indices of the window
+
+        """
+        self._owns_file = not isinstance(h5_data, (h5py.File, h5py.Group))
+        if self._owns_file:
+            h5_data = h5py.File(Path(h5_data), 'r')
+        self.h5_data = h5_data
+        self._sy_dset = h5_data['raw_data/sylinders']
+        n_beads, _, n_frames = self._sy_dset.shape
+        self.frames = slice(*slice(*ts_range).indices(n_frames)[:2])
+        self.beads = slice(*slice(*bead_range).indices(n_beads)[:2])
+        # Cache shared by all windows of the same file, keyed by quantity
+        # name with (bead slice, frame slice) absolute index ranges
+        self._cache = {}
+        self._params = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close the file if this trajectory opened it."""
+        if self._owns_file:
+            self.h5_data.close()
+
+    def clear_cache(self):
+        """Drop all loaded arrays of this trajectory and its windows."""
+        self._cache.clear()
+
+    def __getitem__(self, key):
+        return self.h5_data[key]
+
+    @property
+    def attrs(self):
+        return self.h5_data.attrs
+
+    @property
+    def params(self):
+        """RunConfig parameters of the simulation."""
+        if self._params is None:
+            self._params = yaml.safe_load(self.h5_data.attrs['RunConfig'])
+        return self._params
+
+    @property
+    def shape(self):
+        """(number of beads, number of frames) of the window."""
+        return (self.beads.stop - self.beads.start,
+                self.frames.stop - self.frames.start)
+
+    def window(self, ts_range=(0, None), bead_range=(0, None)):
+        """Sub-window of this trajectory with indices relative to it.
+
+        @param ts_range (start, end) frame indices
+        @param bead_range (start, end) bead indices
+        @return: Trajectory sharing the file and cache of this one
+
+        """
+        sub = object.__new__(Trajectory)
+        sub.__dict__.update(self.__dict__)
+        sub._owns_file = False
+        n_beads, n_frames = self.shape
+        f0, f1 = slice(*ts_range).indices(n_frames)[:2]
+        b0, b1 = slice(*bead_range).indices(n_beads)[:2]
+        sub.frames = slice(self.frames.start + f0, self.frames.start + f1)
+        sub.beads = slice(self.beads.start + b0, self.beads.start + b1)
+        return sub
+
+    def _get(self, name, read_func, per_bead=True):
+        """Get a memoized quantity of this window, reading it only if no
+        window of a loaded array of the same quantity covers it. Quantities
+        that are not per bead (e.g. per link) are only reused for the same
+        window."""
+        key = (self.beads.start, self.beads.stop,
+               self.frames.start, self.frames.stop)
+        entries = self._cache.setdefault(name, {})
+        if key in entries:
+            return entries[key]
+        for (b0, b1, f0, f1), arr in (entries.items() if per_bead else ()):
+            if (b0 <= key[0] and key[1] <= b1
+                    and f0 <= key[2] and key[3] <= f1):
+                return arr[key[0] - b0:key[1] - b0, ...,
+                           key[2] - f0:key[3] - f0]
+        arr = entries[key] = read_func()
+        return arr
+
+    def _read_cols(self, cols):
+        return self._sy_dset[self.beads, cols, self.frames]
+
+    def read_beads(self, bead_inds, cols=slice(None)):
+        """!Read columns of selected beads over the frames of the window in
+        one hyperslab selection. Results are not cached.
+
+        @param bead_inds Increasing bead indices relative to the window
+        @param cols Column index or slice of raw_data/sylinders
+        @return: (len(bead_inds) x columns x frames) array
+
+        """
+        bead_inds = np.asarray(bead_inds) + self.beads.start
+        return self._sy_dset[bead_inds.tolist(), cols, self.frames]
+
+    def iter_com(self, frame_chunk):
+        """!Yield the center of mass of consecutive chunks of frames of the
+        window without caching them, so memory stays bounded by one chunk.
+
+        @param frame_chunk Number of frames per chunk
+        @return: Generator of (first frame relative to the window,
+                 beads x 3 x chunk frames array)
+
+        """
+        for start in range(0, self.shape[1], frame_chunk):
+            chunk = self.window(ts_range=(start, start + frame_chunk))
+            ends = chunk._read_cols(slice(MINUS_COLS.start, PLUS_COLS.stop))
+            yield start, 0.5 * (ends[:, 0:3, :] + ends[:, 3:6, :])
+
+    @property
+    def sylinders(self):
+        """All columns of raw_data/sylinders (beads x 9 x frames)."""
+        return self._get('sylinders', lambda: self._read_cols(slice(None)))
+
+    @property
+    def time(self):
+        """Time of every frame."""
+        key = (self.frames.start, self.frames.stop)
+        entries = self._cache.setdefault('time', {})
+        if key not in entries:
+            entries[key] = self.h5_data['time'][self.frames]
+        return entries[key]
+
+    @property
+    def gids(self):
+        """Gid of every bead (taken from the first frame of the window)."""
+        key = (self.beads.start, self.beads.stop)
+        entries = self._cache.setdefault('gids', {})
+        if key not in entries:
+            entries[key] = self._sy_dset[self.beads, GID_COL, self.frames.start]
+        return entries[key]
+
+    @property
+    def radii(self):
+        """Radius of every bead and frame (beads x frames)."""
+        return self._get('radii', lambda: self._read_cols(RADIUS_COL))
+
+    @property
+    def ends(self):
+        """Minus and plus end positions (beads x 6 x frames)."""
+        return self._get('ends', lambda: self._read_cols(
+            slice(MINUS_COLS.start, PLUS_COLS.stop)))
+
+    @property
+    def com(self):
+        """Center of mass of every bead (beads x 3 x frames)."""
+        def read_com():
+            ends = self.ends
+            return 0.5 * (ends[:, 0:3, :] + ends[:, 3:6, :])
+        return self._get('com', read_com)
+
+    @property
+    def bond_vecs(self):
+        """Vectors between the centers of consecutive beads
+        (beads - 1 x 3 x frames)."""
+        return self._get('bond_vecs', lambda: np.diff(self.com, axis=0),
+                         per_bead=False)
+
+    @property
+    def link_vecs(self):
+        """Vectors from the plus end of a bead to the minus end of the next
+        one, i.e. the stretch of the links between beads
+        (beads - 1 x 3 x frames)."""
+        def read_link_vecs():
+            ends = self.ends
+            return ends[1:, 0:3, :] - ends[:-1, 3:6, :]
+        return self._get('link_vecs', read_link_vecs, per_bead=False)
+
+
+def as_trajectory(h5_data, ts_range=(0, None), bead_range=(0, None)):
+    """!Get a trajectory window from either a raw data file or a Trajectory.
+
+    @param h5_data Open raw data h5py.File, path to one or Trajectory
+    @param ts_range (start, end) frame indices of the window
+    @param bead_range (start, end) bead indices of the window
+    @return: Trajectory
+
+    """
+    if isinstance(h5_data, Trajectory):
+        return h5_data.window(ts_range, bead_range)
+    return Trajectory(h5_data, ts_range, bead_range)
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented.")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+"""@package docstring
+File: zip_frames.py
+Description: Frame index of result.zip archives and picklable member paths
+that can be read in parallel by worker processes.
+"""
+
+import io
+import os
+import re
+import zipfile
+from multiprocessing.util import Finalize
+from pathlib import Path
+
+# Open archives of this process, keyed by (archive path, process id). Forked
+# workers inherit the parent's entries, but a ZipFile shares its file offset
+# with every process holding it, so each process opens its own handle and
+# closes the inherited ones.
+_ZIP_HANDLES = {}
+
+FRAME_FILE_REG = re.compile(r'(?:^|/)([A-Za-z]+)_(\d+)\.(dat|pvtp|vtp)$')
+
+
+def get_zip_handle(zip_path):
+    """!Get the archive handle of this process, opening it on first use.
+
+    @param zip_path Path to zip archive
+    @return: zipfile.ZipFile
+
+    """
+    pid = os.getpid()
+    key = (str(zip_path), pid)
+    handle = _ZIP_HANDLES.get(key)
+    if handle is None:
+        if not any(handle_pid == pid for _, handle_pid in _ZIP_HANDLES):
+            # First handle of this process. Inherited handles are closed now
+            # and own handles when a worker process exits.
+            close_zip_handles()
+            Finalize(None, close_zip_handles, exitpriority=0)
+        handle = _ZIP_HANDLES[key] = zipfile.ZipFile(zip_path)
+    return handle
+
+
+def close_zip_handles():
+    """Close all archive handles of this process, e.g. after a collection.
+    Handles inherited from a forked parent only close this process' copy."""
+    while _ZIP_HANDLES:
+        _, handle = _ZIP_HANDLES.popitem()
+        handle.close()
+
+
+class ZipFramePath():
+
+    """Path of a member of a zip archive. Unlike zipfile.Path it only stores
+    the archive and member names, so it can be sent to worker processes,
+    which then read it with their own archive handle. Handles stay open for
+    the following members of the archive until close_zip_handles is called
+    or the worker process exits."""
+
+    __slots__ = ('zip_path', 'member', 'file_size')
+
+    def __init__(self, zip_path, member, file_size=None):
+        self.zip_path = str(zip_path)
+        self.member = member
+        self.file_size = file_size
+
+    @property
+    def name(self):
+        return self.member.rsplit('/', 1)[-1]
+
+    def open(self, mode='r'):
+        """Open the member for reading in text ('r') or binary ('rb') mode."""
+        fp = get_zip_handle(self.zip_path).open(self.member)
+        if mode == 'rb':
+            return fp
+        if mode == 'r':
+            return io.TextIOWrapper(fp)
+        raise ValueError(f'Zip members can only be opened for reading, not "{mode}".')
+
+    def read_bytes(self):
+        with self.open('rb') as fp:
+            return fp.read()
+
+    def read_text(self):
+        return self.read_bytes().decode()
+
+    def __fspath__(self):
+        return str(Path(self.zip_path) / self.member)
+
+    def __repr__(self):
+        return f'ZipFramePath({self.zip_path!r}, {self.member!r})'
+
+
+def index_zip_frames(zip_path):
+    """Index the frame files of an archive from a single read of its central
+    directory.
+
+    Parameters
+    ----------
+    zip_path : Path object
+        Path to result.zip archive
+
+    Returns
+    -------
+    dict
+        Dictionary of file prefix (e.g. 'SylinderAscii') to a dictionary of
+        frame number to ZipFramePath
+    """
+    index = {}
+    with zipfile.ZipFile(zip_path) as result_zip:
+        for info in result_zip.infolist():
+            match = FRAME_FILE_REG.search(info.filename)
+            if match is None or info.is_dir():
+                continue
+            index.setdefault(match.group(1), {})[int(match.group(2))] = \
+                ZipFramePath(zip_path, info.filename, info.file_size)
+    return index
+
+
+def get_zip_frame_paths(zip_path, prefixes=('SylinderAscii', 'ProteinAscii')):
+    """Get the frame-number sorted member paths of frame files in an archive.
+
+    @param zip_path Path to result.zip archive
+    @param prefixes File prefixes to collect
+    @return: List of ZipFramePath lists, one for every prefix
+
+    """
+    index = index_zip_frames(zip_path)
+    return [[frames[num] for num in sorted(frames)]
+            for frames in (index.get(prefix, {}) for prefix in prefixes)]
+
+
+##########################################
+if __name__ == "__main__":
+    print("Not implemented.")
@@ -45,6 +45,7 @@ import alens_analysis.chromatin.chrom_analysis as ca
 import alens_analysis.chromatin.chrom_condensate_analysis as cca
 import alens_analysis.chromatin.chrom_graph_funcs as cgf
 from alens_analysis import cluster_analysis as cla
+from alens_analysis.msd import fft_msd
 
 from alens_analysis.colormaps import register_cmaps
 
@@ -109,14 +110,7 @@ def plot_confidence_int(
 
 
 def cluster_msd(com_arr, device="cpu"):
-    tcom_arr = torch.from_numpy(com_arr).to(device)
-    Ttot = com_arr.shape[-1]
-    msd = torch.zeros(com_arr.shape, device=device)
-    for i in range(1, Ttot):
-        diff = tcom_arr[i:] - tcom_arr[:-i]
-        msd[i] = torch.pow(diff, 2).mean(dim=-1)
-
-    return msd.cpu().numpy()
+    return fft_msd(com_arr, device=device)
 
 
 def cluster_analysis_graph(sim_path, part_min=40):
@@ -649,14 +643,7 @@ def calc_regular_interval_kmc_array(time_arr, arr, tmax, interval):
 
 
 def condensate_msd(com_arr, device="cpu"):
-    tcom_arr = torch.from_numpy(com_arr).to(device)
-    Ttot = com_arr.shape[-1]
-    msd = torch.zeros(com_arr.shape, device=device)
-    for i in range(1, Ttot):
-        diff = tcom_arr[:, i:] - tcom_arr[:, :-i]
-        msd[:, i] = torch.pow(diff, 2).mean(dim=-1)
-
-    return msd
+    return torch.from_numpy(fft_msd(com_arr, average="particle", device=device))
 
 
 def mean_of_arrays(arrays):